@@ -0,0 +1,133 @@
+"""Initial schema
+
+The schema as created by Base.metadata.create_all before migrations were
+introduced. Databases created that way can be adopted with
+`alembic stamp 0001` followed by `alembic upgrade head`.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('doctor_patient_association',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('doctor_id', 'patient_id')
+    )
+    op.create_index('ix_doctor_patient_association_doctor_id', 'doctor_patient_association', ['doctor_id'], unique=False)
+    op.create_index('ix_doctor_patient_association_patient_id', 'doctor_patient_association', ['patient_id'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('role', sa.Enum('PATIENT', 'DOCTOR', 'ADMIN', name='userrole'), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table('devices',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('firmware_version', sa.String(), nullable=True),
+    sa.Column('last_connected', sa.DateTime(), nullable=True),
+    sa.Column('battery_level', sa.Float(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('medications',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('dosage', sa.Float(), nullable=True),
+    sa.Column('unit', sa.Enum('PILL', 'ML', 'MG', 'PUFF', 'DROP', 'UNIT', name='dosageunit'), nullable=True),
+    sa.Column('current_quantity', sa.Integer(), nullable=True),
+    sa.Column('refill_threshold', sa.Integer(), nullable=True),
+    sa.Column('frequency', sa.Enum('DAILY', 'WEEKLY', 'AS_NEEDED', 'CUSTOM', name='medicationfrequency'), nullable=True),
+    sa.Column('scheduled_times', sa.JSON(), nullable=True),
+    sa.Column('weekdays', sa.JSON(), nullable=True),
+    sa.Column('last_refill_date', sa.DateTime(), nullable=True),
+    sa.Column('refill_amount', sa.Integer(), nullable=True),
+    sa.Column('color', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_medications_name', 'medications', ['name'], unique=False)
+
+    op.create_table('adherence_logs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('medication_id', sa.String(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('taken', sa.Boolean(), nullable=True),
+    sa.Column('scheduled_time', sa.String(), nullable=True),
+    sa.Column('dosage_taken', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['medication_id'], ['medications.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_adherence_logs_id', 'adherence_logs', ['id'], unique=False)
+
+    op.create_table('device_usage_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.String(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('pressure_reading', sa.Float(), nullable=True),
+    sa.Column('flow_rate', sa.Float(), nullable=True),
+    sa.Column('duration_ms', sa.Integer(), nullable=True),
+    sa.Column('acceleration', sa.JSON(), nullable=True),
+    sa.Column('temperature', sa.Float(), nullable=True),
+    sa.Column('humidity', sa.Float(), nullable=True),
+    sa.Column('air_quality', sa.Float(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('medication_id', sa.String(), nullable=True),
+    sa.Column('dose_delivered', sa.Float(), nullable=True),
+    sa.Column('technique_score', sa.Float(), nullable=True),
+    sa.Column('is_valid', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+    sa.ForeignKeyConstraint(['medication_id'], ['medications.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_device_usage_events_id', 'device_usage_events', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_device_usage_events_id', table_name='device_usage_events')
+    op.drop_table('device_usage_events')
+    op.drop_index('ix_adherence_logs_id', table_name='adherence_logs')
+    op.drop_table('adherence_logs')
+    op.drop_index('ix_medications_name', table_name='medications')
+    op.drop_table('medications')
+    op.drop_table('devices')
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
+    op.drop_index('ix_doctor_patient_association_patient_id', table_name='doctor_patient_association')
+    op.drop_index('ix_doctor_patient_association_doctor_id', table_name='doctor_patient_association')
+    op.drop_table('doctor_patient_association')
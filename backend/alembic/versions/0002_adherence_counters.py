@@ -0,0 +1,53 @@
+"""Add denormalized adherence counters to medications
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 09:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('medications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_logs', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('taken_logs', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('last_taken_at', sa.DateTime(), nullable=True))
+
+    # Backfill the counters from the existing logs
+    op.execute("""
+        UPDATE medications SET
+            total_logs = (
+                SELECT COUNT(*) FROM adherence_logs
+                WHERE adherence_logs.medication_id = medications.id
+            ),
+            taken_logs = (
+                SELECT COUNT(*) FROM adherence_logs
+                WHERE adherence_logs.medication_id = medications.id
+                AND adherence_logs.taken
+            ),
+            last_taken_at = (
+                SELECT MAX(adherence_logs.timestamp) FROM adherence_logs
+                WHERE adherence_logs.medication_id = medications.id
+                AND adherence_logs.taken
+            )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('medications', schema=None) as batch_op:
+        batch_op.drop_column('last_taken_at')
+        batch_op.drop_column('taken_logs')
+        batch_op.drop_column('total_logs')
@@ -0,0 +1,35 @@
+"""Add indexes for hot query paths
+
+Every router filters medications by user_id, adherence logs by
+medication_id and device events by device_id, ordering by timestamp.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 09:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_medications_user_id', 'medications', ['user_id'], unique=False)
+    op.create_index('ix_adherence_logs_medication_id_timestamp', 'adherence_logs', ['medication_id', 'timestamp'], unique=False)
+    op.create_index('ix_device_usage_events_device_id_timestamp', 'device_usage_events', ['device_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_device_usage_events_device_id_timestamp', table_name='device_usage_events')
+    op.drop_index('ix_adherence_logs_medication_id_timestamp', table_name='adherence_logs')
+    op.drop_index('ix_medications_user_id', table_name='medications')
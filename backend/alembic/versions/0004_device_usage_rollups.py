@@ -0,0 +1,82 @@
+"""Add device usage rollups
+
+Hourly and daily per-device aggregates of device_usage_events. Existing
+events are rolled up during the upgrade.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('device_usage_rollups',
+    sa.Column('device_id', sa.String(), nullable=False),
+    sa.Column('granularity', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('event_count', sa.Integer(), nullable=False),
+    sa.Column('technique_score_sum', sa.Float(), nullable=False),
+    sa.Column('technique_score_count', sa.Integer(), nullable=False),
+    sa.Column('dose_delivered_sum', sa.Float(), nullable=False),
+    sa.Column('dose_delivered_count', sa.Integer(), nullable=False),
+    sa.Column('temperature_sum', sa.Float(), nullable=False),
+    sa.Column('temperature_count', sa.Integer(), nullable=False),
+    sa.Column('humidity_sum', sa.Float(), nullable=False),
+    sa.Column('humidity_count', sa.Integer(), nullable=False),
+    sa.Column('flow_rate_min', sa.Float(), nullable=True),
+    sa.Column('flow_rate_max', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+    sa.PrimaryKeyConstraint('device_id', 'granularity', 'bucket_start')
+    )
+
+    # Backfill both granularities from the existing events
+    if op.get_bind().dialect.name == "sqlite":
+        # Match the "YYYY-MM-DD HH:MM:SS.ffffff" format SQLAlchemy stores
+        buckets = {
+            "hour": "strftime('%Y-%m-%d %H:00:00.000000', timestamp)",
+            "day": "strftime('%Y-%m-%d 00:00:00.000000', timestamp)",
+        }
+    else:
+        buckets = {
+            "hour": "date_trunc('hour', timestamp)",
+            "day": "date_trunc('day', timestamp)",
+        }
+    for granularity, bucket in buckets.items():
+        op.execute(f"""
+            INSERT INTO device_usage_rollups (
+                device_id, granularity, bucket_start, event_count,
+                technique_score_sum, technique_score_count,
+                dose_delivered_sum, dose_delivered_count,
+                temperature_sum, temperature_count,
+                humidity_sum, humidity_count,
+                flow_rate_min, flow_rate_max
+            )
+            SELECT
+                device_id, '{granularity}', {bucket}, COUNT(*),
+                COALESCE(SUM(technique_score), 0.0), COUNT(technique_score),
+                COALESCE(SUM(dose_delivered), 0.0), COUNT(dose_delivered),
+                COALESCE(SUM(temperature), 0.0), COUNT(temperature),
+                COALESCE(SUM(humidity), 0.0), COUNT(humidity),
+                MIN(flow_rate), MAX(flow_rate)
+            FROM device_usage_events
+            WHERE device_id IS NOT NULL AND timestamp IS NOT NULL
+            GROUP BY device_id, {bucket}
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('device_usage_rollups')
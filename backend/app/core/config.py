@@ -17,6 +17,15 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "temporarysecretkey")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100_000  # Revoked tokens before the filter is rebuilt
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001  # False positives cost one DB lookup
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 30  # How often revocations from other processes are loaded
+    AUTH_USER_CACHE_SIZE: int = 4096  # Cached authenticated users (0 disables)
+    AUTH_USER_CACHE_TTL_SECONDS: float = 60  # Max staleness for changes made elsewhere
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt cost factor for new hashes
+    PASSWORD_HASH_WORKERS: int = 4  # Max concurrent bcrypt calls
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
     
     # CORS
     CORS_ORIGINS: List[str] = [
@@ -30,9 +39,40 @@ class Settings(BaseSettings):
         "DATABASE_URL", "sqlite:///./aetherbloom.db"
     )
     
+    # Connection pool (PostgreSQL)
+    DB_POOL_SIZE: int = 5  # Connections kept open per engine
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load
+    DB_POOL_TIMEOUT: float = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # Test connections before use
+    
+    # SQLite pragmas (file databases)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait for locks instead of "database is locked"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL, far fewer fsyncs than FULL
+    
+    # Adherence Settings
+    ADHERENCE_BATCH_MAX_SIZE: int = 1000  # Max logs per /api/adherence/batch call
+    
+    # Analytics Settings
+    ANALYTICS_CACHE_SIZE: int = 1024  # Cached (user, window) dashboards
+    ANALYTICS_CACHE_TTL_SECONDS: float = 30  # Max staleness for writes made elsewhere
+    
+    # Device Ingestion Settings
+    DEVICE_EVENT_BATCH_MAX_SIZE: int = 5000  # Max events per /api/devices/events/batch call
+    
+    # Event Streaming Settings
+    STREAM_MAX_SUBSCRIBERS: int = 10000  # Concurrent SSE/WebSocket clients
+    STREAM_QUEUE_SIZE: int = 256  # Queued events per client before the oldest are dropped
+    STREAM_MAX_FRAME_EVENTS: int = 500  # Max events coalesced into one frame
+    STREAM_HEARTBEAT_SECONDS: float = 15  # Keep-alive interval for idle streams
+    
     # Device Simulator Settings
     SIMULATOR_ENABLED: bool = True
     SIMULATOR_INTERVAL_SECONDS: int = 10
+    SIMULATOR_BATCH_WINDOW_SECONDS: float = 0.05  # Devices due this close together share a tick
+    SIMULATOR_MAX_WRITE_FAILURES: int = 5  # Consecutive failed writes before a device is dropped
+    SIMULATOR_PROFILES: List[str] = []  # Extra profiles as "name=module:Class"
     
     class Config:
         env_file = ".env"
@@ -1,36 +1,68 @@
 """
 Database connection and session management
 
-This module sets up the SQLAlchemy database engine and session.
+This module sets up the SQLAlchemy database engines and sessions. API
+routes use the asyncio engine (aiosqlite/asyncpg) so database I/O never
+blocks the event loop; the synchronous engine serves the simulator,
+management commands and migrations.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from ..core.config import settings
+from .pool import configure_engine, engine_options
+
+# asyncio drivers used for each database backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    """
+    Return the asyncio-driver equivalent of a database URL.
+
+    Args:
+        url: Database URL, e.g. sqlite:///./aetherbloom.db
+
+    Returns:
+        URL using the backend's asyncio driver (unchanged if unknown)
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
 
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
-)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+configure_engine(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create asyncio engine and session factory for API requests. Objects stay
+# loaded after commit, since lazy reloads are not possible outside await.
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    **engine_options(settings.DATABASE_URL, asyncio=True)
+)
+configure_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
 # Dependency for database session injection
-def get_db():
+async def get_db():
     """
-    Dependency function to get a database session.
-    
+    Dependency function to get an asyncio database session.
+
     Yields:
-        Session: A SQLAlchemy database session
+        AsyncSession: A SQLAlchemy asyncio database session
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
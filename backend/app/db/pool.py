@@ -0,0 +1,163 @@
+"""
+Connection pool configuration and metrics
+
+This module builds the engine options for the configured database:
+settings-driven pool sizing for PostgreSQL, WAL and related pragmas for
+SQLite, and connection pools that record how long each checkout waited
+for a connection.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from ..core.config import settings
+
+class PoolMetrics:
+    """Thread-safe counters of connection pool checkout wait times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        """Record one checkout that waited `wait` seconds."""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the counters, with wait times in milliseconds."""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "average_wait_ms": self.total_wait / attempts * 1000 if attempts else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+class TimedPoolMixin:
+    """
+    Pool mixin timing each checkout.
+
+    The wait covers queueing for a free connection and, when the pool
+    grows, opening the new connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # Keep the counters when the engine is disposed and the pool rebuilt
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool recording checkout wait times."""
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording checkout wait times."""
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+def engine_options(url: str, asyncio: bool = False) -> Dict[str, Any]:
+    """
+    Return create_engine keyword arguments for a database URL.
+
+    Args:
+        url: Database URL
+        asyncio: Whether the options are for create_async_engine
+
+    Returns:
+        Keyword arguments for create_engine/create_async_engine
+    """
+    parsed = make_url(url)
+    options: Dict[str, Any] = {}
+    if parsed.get_backend_name() == "sqlite":
+        if not asyncio:
+            options["connect_args"] = {"check_same_thread": False}
+        # In-memory databases need the dialect's single-connection pools
+        if _is_memory_sqlite(url):
+            return options
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    options["poolclass"] = TimedAsyncAdaptedQueuePool if asyncio else TimedQueuePool
+    return options
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Connect hook applying the configured SQLite pragmas.
+
+    WAL lets readers run alongside a writer, and busy_timeout makes a
+    writer wait for the lock instead of failing with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.close()
+
+def configure_engine(engine: Engine) -> None:
+    """
+    Register connection hooks on an engine (the sync_engine of an AsyncEngine).
+
+    Args:
+        engine: Synchronous engine to configure
+    """
+    if engine.dialect.name == "sqlite" and not _is_memory_sqlite(str(engine.url)):
+        event.listen(engine, "connect", set_sqlite_pragmas)
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """
+    Return the current state and checkout metrics of an engine's pool.
+
+    Args:
+        engine: Engine whose pool to describe
+
+    Returns:
+        Dictionary with the pool class, occupancy and checkout metrics
+    """
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,124 @@
+"""
+Query plan checks for hot query paths
+
+This module runs EXPLAIN on the queries issued by the medications and
+simulator routers and verifies that each one is served by the expected
+index, on both SQLite and PostgreSQL.
+"""
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.engine import Connection, Engine
+
+from ..models.medication import Medication, AdherenceLog
+from ..models.device import DeviceUsageEvent
+from ..services.device_stats import usage_by_hour_statement
+
+class QueryPlanResult(NamedTuple):
+    """Outcome of checking one query's plan."""
+    name: str
+    expected_index: str
+    plan: str
+    uses_index: bool
+
+def hot_queries(dialect: str) -> Dict[str, Tuple[object, str]]:
+    """
+    Build the hot queries together with the index each should use.
+
+    Args:
+        dialect: Database dialect name
+
+    Returns:
+        Mapping of query name to (statement, expected index name)
+    """
+    window_start = datetime(2024, 1, 1)
+    taken_sum = func.sum(case((AdherenceLog.taken.is_(True), 1), else_=0))
+    return {
+        "medications.get_medications": (
+            select(Medication)
+            .where(Medication.user_id == 1)
+            .order_by(Medication.id)
+            .limit(100),
+            "ix_medications_user_id",
+        ),
+        "medications.get_medication (adherence log page)": (
+            select(AdherenceLog.id, AdherenceLog.timestamp, AdherenceLog.taken)
+            .where(AdherenceLog.medication_id == "medication")
+            .order_by(AdherenceLog.timestamp.desc(), AdherenceLog.id.desc())
+            .limit(50),
+            "ix_adherence_logs_medication_id_timestamp",
+        ),
+        "medications.stream_adherence_history": (
+            select(AdherenceLog)
+            .where(AdherenceLog.medication_id == "medication")
+            .order_by(AdherenceLog.timestamp, AdherenceLog.id),
+            "ix_adherence_logs_medication_id_timestamp",
+        ),
+        "medications.get_adherence_stats (windowed)": (
+            select(Medication.id, Medication.name, func.count(AdherenceLog.id), taken_sum)
+            .join(AdherenceLog, AdherenceLog.medication_id == Medication.id)
+            .where(Medication.user_id == 1, AdherenceLog.timestamp >= window_start)
+            .group_by(Medication.id, Medication.name),
+            "ix_adherence_logs_medication_id_timestamp",
+        ),
+        "simulator.get_device_events": (
+            select(DeviceUsageEvent)
+            .where(DeviceUsageEvent.device_id == "device")
+            .order_by(DeviceUsageEvent.timestamp.desc(), DeviceUsageEvent.id.desc())
+            .limit(50),
+            "ix_device_usage_events_device_id_timestamp",
+        ),
+        "simulator.get_device_statistics": (
+            usage_by_hour_statement(dialect, "device"),
+            "ix_device_usage_events_device_id_timestamp",
+        ),
+    }
+
+def explain(connection: Connection, statement) -> str:
+    """
+    Return the query plan for a statement as text.
+
+    Args:
+        connection: Open database connection
+        statement: SQLAlchemy statement to explain
+
+    Returns:
+        The plan, one line per plan node
+
+    Raises:
+        ValueError: If the database dialect is not supported
+    """
+    sql = str(statement.compile(
+        dialect=connection.dialect,
+        compile_kwargs={"literal_binds": True}
+    ))
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return "\n".join(str(row[-1]) for row in rows)
+    if dialect == "postgresql":
+        # Small tables are cheaper to scan sequentially; disable that so the
+        # planner shows whether an index is usable at all
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+        return "\n".join(str(row[0]) for row in rows)
+    raise ValueError(f"Query plan checks are not supported on {dialect}")
+
+def check_query_plans(engine: Engine) -> List[QueryPlanResult]:
+    """
+    Check that every hot query is served by its expected index.
+
+    Args:
+        engine: Engine bound to a migrated database
+
+    Returns:
+        One result per hot query
+    """
+    results = []
+    with engine.connect() as connection:
+        for name, (statement, index_name) in hot_queries(connection.dialect.name).items():
+            with connection.begin():
+                plan = explain(connection, statement)
+            results.append(QueryPlanResult(name, index_name, plan, index_name in plan))
+    return results
@@ -5,22 +5,49 @@ This is the main entry point for the AetherBloom backend API,
 which provides medication management, adherence tracking,
 and analytics for the smart inhaler system.
 """
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .db.database import engine, Base
 from .core.config import settings
+from .db.database import engine, async_engine
+from .db.pool import pool_status
+from .services.auth import password_hasher, user_cache
+from .services.revocation import revocation_store
+from .services.simulator import get_simulator
+from .services.streaming import event_broker
+from .services.pagination import NEXT_CURSOR_HEADER
 
 # Import routers (to be created)
-from .routers import auth, medications, adherence, analytics, simulator
+from .routers import auth, medications, adherence, analytics, devices, simulator
+
+# The schema is managed by Alembic migrations: run `alembic upgrade head`
+# from the backend directory before starting the server.
 
-# Create tables if they don't exist (in development mode)
-# In production, use Alembic migrations instead
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers on startup and release resources on shutdown."""
+    # Streams are served from this loop; simulated events are pushed to them
+    event_broker.bind(asyncio.get_running_loop())
+    simulator = get_simulator()
+    if event_broker.publish_one not in simulator.callbacks:
+        simulator.register_callback(event_broker.publish_one)
+    if settings.SIMULATOR_ENABLED:
+        simulator.start()
+    yield
+    event_broker.close()
+    await simulator.shutdown()
+    password_hasher.shutdown()
+    # Close pooled connections so their driver threads can exit
+    await async_engine.dispose()
+    engine.dispose()
 
 app = FastAPI(
     title="AetherBloom API",
     description="Backend API for the AetherBloom Smart Inhaler System",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Set up CORS to allow requests from Flutter app
@@ -30,6 +57,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -37,6 +65,7 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(medications.router, prefix="/api/medications", tags=["Medications"])
 app.include_router(adherence.router, prefix="/api/adherence", tags=["Adherence"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(devices.router, prefix="/api/devices", tags=["Devices"])
 app.include_router(simulator.router, prefix="/api/simulator", tags=["Device Simulator"])
 
 @app.get("/", tags=["Root"])
@@ -46,4 +75,31 @@ async def root():
         "message": "Welcome to the AetherBloom API",
         "version": "0.1.0",
         "status": "online",
-    } 
\ No newline at end of file
+    }
+
+@app.get("/health/database", tags=["Root"])
+async def database_health():
+    """Report connection pool occupancy and checkout wait metrics."""
+    return {
+        "api": pool_status(async_engine.sync_engine),
+        "background": pool_status(engine),
+    }
+
+@app.get("/health/auth", tags=["Root"])
+async def auth_health():
+    """Report user cache, password hashing and token revocation metrics."""
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "token_revocation": revocation_store.stats(),
+    }
+
+@app.get("/health/simulator", tags=["Root"])
+async def simulator_health():
+    """Report the simulator worker's state and tick metrics."""
+    return get_simulator().stats()
+
+@app.get("/health/streaming", tags=["Root"])
+async def streaming_health():
+    """Report event stream subscriber and delivery metrics."""
+    return event_broker.stats()
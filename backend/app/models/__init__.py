@@ -5,7 +5,8 @@ Import all models to make them available for SQLAlchemy.
 """
 from .user import User, UserRole, DoctorPatientAssociation
 from .medication import Medication, AdherenceLog, DosageUnit, MedicationFrequency
-from .device import Device, DeviceUsageEvent
+from .device import Device, DeviceUsageEvent, DeviceUsageRollup
+from .token import RevokedToken
 
 # Define exported models
 __all__ = [
@@ -17,5 +18,7 @@ __all__ = [
     "DosageUnit", 
     "MedicationFrequency",
     "Device", 
-    "DeviceUsageEvent"
+    "DeviceUsageEvent",
+    "DeviceUsageRollup",
+    "RevokedToken"
 ] 
\ No newline at end of file
@@ -4,7 +4,8 @@ Device models for Smart Inhaler connectivity
 This module defines models for tracking device connections,
 usage events, and inhaler data.
 """
-from sqlalchemy import Column, ForeignKey, Integer, String, Float, DateTime, JSON, Boolean
+from sqlalchemy import Column, ForeignKey, Integer, String, Float, DateTime, JSON, Boolean, Index
+from typing import Optional
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -31,6 +32,10 @@ class Device(Base):
 class DeviceUsageEvent(Base):
     """Records of inhaler usage captured by the device."""
     __tablename__ = "device_usage_events"
+    __table_args__ = (
+        # Serves per-device filters and timestamp ordering/windows
+        Index("ix_device_usage_events_device_id_timestamp", "device_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     device_id = Column(String, ForeignKey("devices.id"))
@@ -63,4 +68,50 @@ class DeviceUsageEvent(Base):
     
     # Relationships
     device = relationship("Device", back_populates="usage_events")
-    medication = relationship("Medication") 
\ No newline at end of file
+    medication = relationship("Medication") 
+
+class DeviceUsageRollup(Base):
+    """
+    Pre-aggregated usage statistics for one device over one time bucket.
+    
+    Sums and non-null counts are stored instead of means so that buckets
+    can be updated incrementally and merged. Rows are maintained by
+    services.rollups as events are inserted.
+    """
+    __tablename__ = "device_usage_rollups"
+    
+    device_id = Column(String, ForeignKey("devices.id"), primary_key=True)
+    granularity = Column(String, primary_key=True)  # "hour" or "day"
+    bucket_start = Column(DateTime, primary_key=True)
+    
+    event_count = Column(Integer, default=0, nullable=False)
+    technique_score_sum = Column(Float, default=0.0, nullable=False)
+    technique_score_count = Column(Integer, default=0, nullable=False)
+    dose_delivered_sum = Column(Float, default=0.0, nullable=False)
+    dose_delivered_count = Column(Integer, default=0, nullable=False)
+    temperature_sum = Column(Float, default=0.0, nullable=False)
+    temperature_count = Column(Integer, default=0, nullable=False)
+    humidity_sum = Column(Float, default=0.0, nullable=False)
+    humidity_count = Column(Integer, default=0, nullable=False)
+    flow_rate_min = Column(Float, nullable=True)
+    flow_rate_max = Column(Float, nullable=True)
+    
+    @staticmethod
+    def _mean(total: float, count: int) -> Optional[float]:
+        return total / count if count else None
+    
+    @property
+    def average_technique_score(self) -> Optional[float]:
+        return self._mean(self.technique_score_sum, self.technique_score_count)
+    
+    @property
+    def average_dose_delivered(self) -> Optional[float]:
+        return self._mean(self.dose_delivered_sum, self.dose_delivered_count)
+    
+    @property
+    def average_temperature(self) -> Optional[float]:
+        return self._mean(self.temperature_sum, self.temperature_count)
+    
+    @property
+    def average_humidity(self) -> Optional[float]:
+        return self._mean(self.humidity_sum, self.humidity_count)
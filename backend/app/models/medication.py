@@ -4,7 +4,7 @@ Medication model
 This module defines the Medication model and related models for storing
 medication data, schedules, and adherence tracking.
 """
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, JSON, Enum, Table
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, JSON, Enum, Table, Index
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -56,15 +56,25 @@ class Medication(Base):
     color = Column(Integer)
     
     # Foreign key to user
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     user = relationship("User", back_populates="medications")
     
+    # Denormalized adherence counters, maintained by record_adherence and
+    # rebuilt from the raw logs with `python manage.py rebuild-counters`
+    total_logs = Column(Integer, default=0, nullable=False)
+    taken_logs = Column(Integer, default=0, nullable=False)
+    last_taken_at = Column(DateTime, nullable=True)
+    
     # Relationships
     adherence_logs = relationship("AdherenceLog", back_populates="medication")
 
 class AdherenceLog(Base):
     """Log of medication adherence events (taken or skipped)."""
     __tablename__ = "adherence_logs"
+    __table_args__ = (
+        # Serves per-medication filters and timestamp ordering/windows
+        Index("ix_adherence_logs_medication_id_timestamp", "medication_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     medication_id = Column(String, ForeignKey("medications.id"))
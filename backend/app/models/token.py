@@ -0,0 +1,19 @@
+"""
+Revoked token model for the token deny list
+
+This module defines the persisted list of revoked JWTs. Entries are
+kept until the token would have expired anyway.
+"""
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime
+from datetime import datetime
+
+from ..db.database import Base
+
+class RevokedToken(Base):
+    """Model for a revoked access or refresh token, keyed by its JWT ID."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Prunable after this time
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,77 @@
+"""
+Adherence router
+
+This module provides endpoints for recording medication adherence,
+including bulk upload of events queued while the app was offline.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Annotated
+
+from ..core.config import settings
+from ..db.database import get_db
+from ..schemas.medication import AdherenceLogCreate, AdherenceBatchResult
+from ..models.medication import Medication as MedicationModel
+from ..services.adherence import bulk_record_adherence
+from ..services.analytics import invalidate_user_analytics
+from ..routers.auth import get_current_user
+from ..models.user import User
+
+router = APIRouter()
+
+@router.post("/batch", response_model=AdherenceBatchResult, status_code=status.HTTP_201_CREATED)
+async def record_adherence_batch(
+    logs: List[AdherenceLogCreate],
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Record a batch of medication adherence events in one transaction.
+
+    Intended for replaying events queued while the app was offline. Either
+    every log is recorded or none is.
+
+    Args:
+        logs: Adherence log entries to record
+        current_user: Current authenticated user
+        db: Database session
+
+    Returns:
+        Summary of the recorded batch
+
+    Raises:
+        HTTPException: If the batch is empty or too large, or any
+            medication is not found or not owned by the user
+    """
+    if not logs:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Batch must contain at least one adherence log"
+        )
+    if len(logs) > settings.ADHERENCE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch may contain at most {settings.ADHERENCE_BATCH_MAX_SIZE} adherence logs"
+        )
+
+    # Verify ownership of every referenced medication with one query
+    medication_ids = {log.medication_id for log in logs}
+    owned_ids = {
+        medication_id for medication_id in await db.scalars(select(MedicationModel.id).where(
+            MedicationModel.user_id == current_user.id,
+            MedicationModel.id.in_(medication_ids)
+        ))
+    }
+    missing = sorted(medication_ids - owned_ids)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Medication not found: {', '.join(missing)}"
+        )
+
+    result = await db.run_sync(bulk_record_adherence, logs)
+    await db.commit()
+    invalidate_user_analytics(current_user.id)
+
+    return result
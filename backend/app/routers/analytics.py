@@ -0,0 +1,64 @@
+"""
+Analytics router
+
+This module provides the patient analytics dashboard: rolling adherence,
+streaks, time-of-day distributions and inhaler technique trends.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Annotated
+
+from ..db.database import get_db
+from ..schemas.analytics import AnalyticsDashboard
+from ..services.analytics import get_dashboard
+from ..models.user import User, UserRole, DoctorPatientAssociation
+from ..routers.auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/dashboard", response_model=AnalyticsDashboard)
+async def get_analytics_dashboard(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db),
+    days: int = Query(30, ge=1, le=730),
+    patient_id: Optional[int] = None
+):
+    """
+    Get the analytics dashboard for the current user or one of a doctor's patients.
+
+    Results are cached per (user, window) until new adherence or usage
+    data is recorded for the user.
+
+    Args:
+        current_user: Current authenticated user
+        db: Database session
+        days: Number of days in the window, ending today
+        patient_id: Optional ID of a patient (doctors and admins only)
+
+    Returns:
+        Analytics dashboard
+
+    Raises:
+        HTTPException: If the user may not view the patient's data
+    """
+    user_id = current_user.id
+    if patient_id is not None and patient_id != current_user.id:
+        if current_user.role == UserRole.DOCTOR:
+            association = await db.scalar(select(DoctorPatientAssociation).where(
+                DoctorPatientAssociation.doctor_id == current_user.id,
+                DoctorPatientAssociation.patient_id == patient_id
+            ))
+            if association is None:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Access denied to this patient's data"
+                )
+        elif current_user.role != UserRole.ADMIN:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied to this patient's data"
+            )
+        user_id = patient_id
+
+    return await db.run_sync(get_dashboard, user_id, days)
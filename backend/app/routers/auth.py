@@ -2,18 +2,27 @@
 Authentication router
 
 This module provides endpoints for user authentication,
-registration, and password management.
+registration, token refresh/revocation, and password management.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
-from typing import Annotated
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from jose import JWTError
+from datetime import datetime
+from typing import Annotated, Any, Dict, Optional
 
-from ..core.config import settings
-from ..schemas.auth import Token, TokenPayload, LoginRequest, PasswordReset, PasswordChange
+from ..schemas.auth import (
+    Token, TokenPayload, LoginRequest, PasswordReset, PasswordChange,
+    RefreshRequest, LogoutRequest
+)
 from ..schemas.user import User, UserCreate
-from ..services.auth import authenticate_user, create_access_token, create_user
+from ..services.auth import (
+    authenticate_user, create_access_token, create_refresh_token, create_user,
+    decode_token, detached_user, password_fingerprint, password_hasher, user_cache
+)
+from ..services.revocation import revocation_store
 from ..db.database import get_db
 from ..models.user import User as UserModel
 
@@ -24,11 +33,17 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> UserModel:
     """
     Dependency to get the current authenticated user from token.
     
+    Users are served from the user cache when possible and revocation is
+    checked against an in-memory Bloom filter, so a warm request costs
+    only the token signature check. The returned user is a detached
+    copy without the password hash; load the row from the session to
+    modify it.
+    
     Args:
         token: JWT token from Authorization header
         db: Database session
@@ -37,7 +52,7 @@ async def get_current_user(
         Current authenticated user
         
     Raises:
-        HTTPException: If token is invalid or user not found
+        HTTPException: If token is invalid, revoked or user not found
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,17 +60,28 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenPayload(sub=int(user_id))
+        token_data = TokenPayload(
+            sub=int(user_id), jti=payload.get("jti"), type=payload.get("type", "access")
+        )
     except JWTError:
         raise credentials_exception
+    if token_data.type != "access":
+        raise credentials_exception
+    if await revocation_store.is_revoked(db, token_data.jti):
+        raise credentials_exception
     
-    user = db.query(UserModel).filter(UserModel.id == token_data.sub).first()
+    user = user_cache.get(token_data.sub)
     if user is None:
-        raise credentials_exception
+        version = user_cache.version(token_data.sub)
+        db_user = await db.scalar(select(UserModel).where(UserModel.id == token_data.sub))
+        if db_user is None:
+            raise credentials_exception
+        user = detached_user(db_user)
+        user_cache.set(token_data.sub, user, version)
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,10 +89,18 @@ async def get_current_user(
         )
     return user
 
+def _issue_tokens(user: UserModel) -> Dict[str, Any]:
+    """Create a new access/refresh token pair for a user."""
+    return {
+        "access_token": create_access_token(subject=user.id),
+        "refresh_token": create_refresh_token(subject=user.id, hashed_password=user.hashed_password),
+        "token_type": "bearer"
+    }
+
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
@@ -76,12 +110,12 @@ async def login_for_access_token(
         db: Database session
         
     Returns:
-        JWT access token
+        JWT access token and refresh token
         
     Raises:
         HTTPException: If login fails
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,16 +123,103 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(subject=user.id)
+    return _issue_tokens(user)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    refresh_data: RefreshRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access/refresh token pair.
+    
+    The refresh token is single-use: it is revoked once exchanged. Tokens
+    issued before the user's last password change are rejected.
+    
+    Args:
+        refresh_data: Refresh token to exchange
+        db: Database session
+        
+    Returns:
+        New JWT access token and refresh token
+        
+    Raises:
+        HTTPException: If the refresh token is invalid, revoked or stale
+    """
+    invalid_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_token(refresh_data.refresh_token)
+    except JWTError:
+        raise invalid_exception
+    if payload.get("type") != "refresh" or payload.get("sub") is None:
+        raise invalid_exception
+    if await revocation_store.is_revoked(db, payload.get("jti")):
+        raise invalid_exception
+    
+    user = await db.get(UserModel, int(payload["sub"]))
+    if user is None or not user.is_active:
+        raise invalid_exception
+    if payload.get("pwd") != password_fingerprint(user.hashed_password):
+        raise invalid_exception
+    
+    await revocation_store.revoke(
+        db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]), user_id=user.id
+    )
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Exchanged concurrently by another request
+        await db.rollback()
+        raise invalid_exception
+    
+    return _issue_tokens(user)
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    current_user: Annotated[UserModel, Depends(get_current_user)],
+    logout_data: Optional[LogoutRequest] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Revoke the current access token and, if given, a refresh token.
+    
+    Args:
+        token: JWT token from Authorization header
+        current_user: Current authenticated user
+        logout_data: Optional refresh token to revoke as well
+        db: Database session
+        
+    Returns:
+        Success message
+    """
+    tokens = [token]
+    if logout_data and logout_data.refresh_token:
+        tokens.append(logout_data.refresh_token)
+    
+    for raw_token in tokens:
+        try:
+            payload = decode_token(raw_token)
+        except JWTError:
+            continue  # Invalid or expired tokens need no revocation
+        if payload.get("jti") and payload.get("sub") == str(current_user.id):
+            await revocation_store.revoke(
+                db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]), user_id=current_user.id
+            )
+    await db.commit()
+    
     return {
-        "access_token": access_token,
-        "token_type": "bearer"
+        "message": "Logged out successfully"
     }
 
 @router.post("/register", response_model=User)
 async def register_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Register a new user.
@@ -114,10 +235,10 @@ async def register_user(
         HTTPException: If user already exists
     """
     # Check if user already exists
-    existing_user = db.query(UserModel).filter(
+    existing_user = await db.scalar(select(UserModel).where(
         (UserModel.email == user_data.email) | 
         (UserModel.username == user_data.username)
-    ).first()
+    ))
     
     if existing_user:
         field = "email" if existing_user.email == user_data.email else "username"
@@ -127,7 +248,7 @@ async def register_user(
         )
     
     # Create the user
-    user = create_user(
+    user = await create_user(
         db=db,
         email=user_data.email,
         username=user_data.username,
@@ -156,7 +277,7 @@ async def get_current_user_info(
 @router.post("/password/reset", status_code=status.HTTP_202_ACCEPTED)
 async def request_password_reset(
     reset_data: PasswordReset,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Request a password reset link.
@@ -169,7 +290,7 @@ async def request_password_reset(
         Success message
     """
     # Check if user exists
-    user = db.query(UserModel).filter(UserModel.email == reset_data.email).first()
+    user = await db.scalar(select(UserModel).where(UserModel.email == reset_data.email))
     
     # We always return 202 even if user doesn't exist for security reasons
     # In a real implementation, send an email with reset link
@@ -182,7 +303,7 @@ async def request_password_reset(
 async def change_password(
     password_data: PasswordChange,
     current_user: Annotated[UserModel, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Change the password for the current user.
@@ -198,15 +319,16 @@ async def change_password(
     Raises:
         HTTPException: If current password is incorrect
     """
-    if not authenticate_user(db, current_user.username, password_data.current_password):
+    user = await authenticate_user(db, current_user.username, password_data.current_password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
-    # Update password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    # Update password (the commit invalidates the cached user)
+    user.hashed_password = await password_hasher.hash(password_data.new_password)
+    await db.commit()
     
     return {
         "message": "Password changed successfully"
@@ -0,0 +1,232 @@
+"""
+Devices router
+
+This module provides endpoints for physical Smart Inhaler devices,
+including batch upload of buffered sensor events from BLE gateways and
+live streams of new usage events over Server-Sent Events or WebSocket.
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, List, Optional
+
+from ..core.config import settings
+from ..db.database import get_db
+from ..schemas.device import DeviceEventBatchResult
+from ..services.analytics import invalidate_user_analytics
+from ..services.ingestion import ingest_device_events, is_ndjson, parse_event_batch
+from ..services.streaming import Subscription, event_broker
+from ..routers.auth import get_current_user
+from ..models.device import Device as DeviceModel
+from ..models.user import User, UserRole
+
+router = APIRouter()
+
+@router.post(
+    "/events/batch",
+    response_model=DeviceEventBatchResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {
+                    "type": "array",
+                    "items": {"$ref": "#/components/schemas/DeviceUsageEventCreate"}
+                }},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def upload_device_events(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload a batch of device usage events.
+
+    The body is either a JSON array of events or NDJSON (one event per
+    line, Content-Type application/x-ndjson). Each record is accepted or
+    rejected individually; accepted events are stored in one transaction.
+
+    Args:
+        request: Incoming request carrying the batch
+        current_user: Current authenticated user
+        db: Database session
+
+    Returns:
+        Per-record acceptance results
+
+    Raises:
+        HTTPException: If the body cannot be parsed or the batch is too large
+    """
+    try:
+        records = parse_event_batch(await request.body(), is_ndjson(request.headers.get("content-type")))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if len(records) > settings.DEVICE_EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch may contain at most {settings.DEVICE_EVENT_BATCH_MAX_SIZE} events"
+        )
+
+    result, owners, rows = await db.run_sync(ingest_device_events, current_user, records)
+    await db.commit()
+    for owner in owners:
+        invalidate_user_analytics(owner)
+    event_broker.publish(rows)
+
+    return result
+
+async def _subscribe(db: AsyncSession, user: User, device_ids: Optional[List[str]]) -> Subscription:
+    """
+    Subscribe a user to the events of some devices (default: all their own).
+
+    The session's connection is released before returning, so open
+    streams do not hold database connections.
+
+    Raises:
+        HTTPException: If a device is missing or not accessible, or the
+            subscriber limit is reached
+    """
+    if not device_ids:
+        device_ids = list(await db.scalars(select(DeviceModel.id).where(DeviceModel.user_id == user.id)))
+    else:
+        owners = dict((await db.execute(
+            select(DeviceModel.id, DeviceModel.user_id).where(DeviceModel.id.in_(device_ids))
+        )).all())
+        missing = [device_id for device_id in device_ids if device_id not in owners]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Devices not found: {', '.join(missing)}"
+            )
+        if user.role != UserRole.ADMIN and any(owner != user.id for owner in owners.values()):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied to this device"
+            )
+    await db.close()
+
+    try:
+        return event_broker.subscribe(device_ids)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+@router.get("/events/stream")
+async def stream_device_events(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db),
+    device_id: Annotated[Optional[List[str]], Query()] = None
+):
+    """
+    Stream new usage events as Server-Sent Events.
+
+    Each "usage" event carries a JSON frame {"events": [...], "dropped": n};
+    events queued while the client was busy are coalesced into one frame,
+    and `dropped` counts events lost because the client fell too far
+    behind. Idle streams receive a keep-alive comment.
+
+    Args:
+        current_user: Current authenticated user
+        db: Database session
+        device_id: Devices to follow (repeatable; default: all own devices)
+
+    Returns:
+        text/event-stream response
+
+    Raises:
+        HTTPException: If a device is missing or not accessible, or the
+            server is at its subscriber limit
+    """
+    subscription = await _subscribe(db, current_user, device_id)
+
+    async def frames():
+        try:
+            while True:
+                frame = await subscription.next_frame(timeout=settings.STREAM_HEARTBEAT_SECONDS)
+                if frame is not None:
+                    yield f"event: usage\ndata: {frame}\n\n"
+                elif subscription.closed:
+                    break
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/events/ws")
+async def device_events_websocket(
+    websocket: WebSocket,
+    db: AsyncSession = Depends(get_db),
+    token: Optional[str] = None,
+    device_id: Annotated[Optional[List[str]], Query()] = None
+):
+    """
+    Stream new usage events over a WebSocket.
+
+    Browsers cannot set headers on WebSocket requests, so the access token
+    may be passed as the `token` query parameter instead of a Bearer
+    Authorization header. Frames have the same format as the SSE stream;
+    messages from the client are ignored.
+
+    Args:
+        websocket: WebSocket connection
+        db: Database session
+        token: Access token (default: from the Authorization header)
+        device_id: Devices to follow (repeatable; default: all own devices)
+    """
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    try:
+        if token is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+        user = await get_current_user(token, db)
+        subscription = await _subscribe(db, user, device_id)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    async def wait_for_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    await websocket.accept()
+    disconnected = asyncio.create_task(wait_for_disconnect())
+    try:
+        while not disconnected.done():
+            next_frame = asyncio.create_task(subscription.next_frame())
+            await asyncio.wait({next_frame, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_frame.cancel()
+                break
+            frame = next_frame.result()
+            if frame is None:
+                # The broker is shutting down
+                await websocket.close()
+                break
+            await websocket.send_text(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        event_broker.unsubscribe(subscription)
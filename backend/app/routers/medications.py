@@ -4,8 +4,10 @@ Medications router
 This module provides endpoints for medication management,
 including CRUD operations and adherence tracking.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Annotated
 from uuid import uuid4
 from datetime import datetime
@@ -19,32 +21,66 @@ from ..schemas.medication import (
 from ..models.medication import Medication as MedicationModel
 from ..models.medication import AdherenceLog as AdherenceLogModel
 from ..routers.auth import get_current_user
+from ..services.adherence import compute_adherence_stats, increment_adherence_counters
+from ..services.analytics import invalidate_user_analytics
+from ..services.pagination import NEXT_CURSOR_HEADER, decode_cursor, keyset_filter, next_cursor
 from ..models.user import User
 
 router = APIRouter()
 
+# Number of rows fetched per round trip when streaming adherence history
+HISTORY_BATCH_SIZE = 1000
+
 @router.get("/", response_model=List[Medication])
 async def get_medications(
+    response: Response,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
 ):
     """
     Get all medications for the current user.
     
+    Results are ordered by ID. When more results may follow, the cursor
+    for the next page is returned in the X-Next-Cursor response header.
+    
     Args:
+        response: Outgoing response (for the pagination header)
         current_user: Current authenticated user
         db: Database session
-        skip: Number of records to skip (pagination)
+        skip: Number of records to skip (legacy offset pagination)
         limit: Maximum number of records to return
+        cursor: Cursor from a previous X-Next-Cursor header
         
     Returns:
         List of medications
+        
+    Raises:
+        HTTPException: If the cursor is invalid
     """
-    medications = db.query(MedicationModel).filter(
+    query = select(MedicationModel).where(
         MedicationModel.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ).order_by(MedicationModel.id)
+    
+    if cursor:
+        try:
+            cursor_values = decode_cursor(cursor, 1)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(keyset_filter((MedicationModel.id,), cursor_values))
+    elif skip:
+        query = query.offset(skip)
+    
+    medications = (await db.scalars(query.limit(limit))).all()
+    
+    cursor_token = next_cursor(medications, limit, "id")
+    if cursor_token:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_token
     
     return medications
 
@@ -52,7 +88,7 @@ async def get_medications(
 async def create_medication(
     medication: MedicationCreate,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new medication for the current user.
@@ -90,8 +126,8 @@ async def create_medication(
     )
     
     db.add(db_medication)
-    db.commit()
-    db.refresh(db_medication)
+    await db.commit()
+    await db.refresh(db_medication)
     
     return db_medication
 
@@ -99,26 +135,39 @@ async def create_medication(
 async def get_medication(
     medication_id: str,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    log_from: Optional[datetime] = None,
+    log_to: Optional[datetime] = None,
+    log_cursor: Optional[str] = None,
+    log_limit: int = Query(50, ge=1, le=500)
 ):
     """
     Get a specific medication by ID.
     
+    Only one page of the adherence log is returned, newest first. Use
+    adherence_log_next_cursor to fetch older entries, or the
+    /{medication_id}/adherence/history endpoint for the full history.
+    
     Args:
         medication_id: ID of the medication to retrieve
         current_user: Current authenticated user
         db: Database session
+        log_from: Optional start of the adherence log window
+        log_to: Optional end of the adherence log window
+        log_cursor: Cursor from a previous adherence_log_next_cursor
+        log_limit: Maximum number of adherence log entries to return
         
     Returns:
         Medication details with adherence data
         
     Raises:
-        HTTPException: If medication not found or not owned by user
+        HTTPException: If medication not found or not owned by user,
+            or if the cursor is invalid
     """
-    medication = db.query(MedicationModel).filter(
+    medication = await db.scalar(select(MedicationModel).where(
         MedicationModel.id == medication_id,
         MedicationModel.user_id == current_user.id
-    ).first()
+    ))
     
     if medication is None:
         raise HTTPException(
@@ -126,14 +175,9 @@ async def get_medication(
             detail="Medication not found"
         )
     
-    # Calculate adherence rate and other derived fields
-    adherence_logs = db.query(AdherenceLogModel).filter(
-        AdherenceLogModel.medication_id == medication_id
-    ).all()
-    
-    total_logs = len(adherence_logs)
-    taken_count = sum(1 for log in adherence_logs if log.taken)
-    adherence_rate = taken_count / total_logs if total_logs > 0 else 0.0
+    # Adherence rate comes from the denormalized counters
+    total_logs = medication.total_logs or 0
+    adherence_rate = medication.taken_logs / total_logs if total_logs > 0 else 0.0
     
     # Calculate days until refill needed
     days_until_refill = -1  # Default for as-needed medications
@@ -146,6 +190,33 @@ async def get_medication(
         if doses_per_week > 0:
             days_until_refill = int((remaining_doses / (doses_per_week / 7)))
     
+    # Fetch one page of the adherence log, newest first
+    log_query = select(
+        AdherenceLogModel.id, AdherenceLogModel.timestamp, AdherenceLogModel.taken
+    ).where(
+        AdherenceLogModel.medication_id == medication_id
+    )
+    if log_from:
+        log_query = log_query.where(AdherenceLogModel.timestamp >= log_from)
+    if log_to:
+        log_query = log_query.where(AdherenceLogModel.timestamp <= log_to)
+    if log_cursor:
+        try:
+            cursor_values = decode_cursor(log_cursor, 2)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid log_cursor"
+            )
+        log_query = log_query.where(keyset_filter(
+            (AdherenceLogModel.timestamp, AdherenceLogModel.id),
+            cursor_values,
+            descending=True
+        ))
+    adherence_logs = (await db.execute(log_query.order_by(
+        AdherenceLogModel.timestamp.desc(), AdherenceLogModel.id.desc()
+    ).limit(log_limit))).all()
+    
     # Convert adherence logs to dictionary for response
     adherence_log_dict = {
         log.timestamp.isoformat(): log.taken
@@ -158,17 +229,63 @@ async def get_medication(
         "adherence_rate": adherence_rate,
         "days_until_refill_needed": days_until_refill,
         "needs_refill": medication.current_quantity <= medication.refill_threshold,
-        "adherence_log": adherence_log_dict
+        "adherence_log": adherence_log_dict,
+        "adherence_log_next_cursor": next_cursor(adherence_logs, log_limit, "timestamp", "id")
     }
     
     return medication_with_adherence
 
+@router.get("/{medication_id}/adherence/history")
+async def stream_adherence_history(
+    medication_id: str,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream the full adherence history of a medication as NDJSON.
+    
+    Entries are written oldest first, one AdherenceLog object per line,
+    and are read from the database in batches rather than all at once.
+    
+    Args:
+        medication_id: ID of the medication
+        current_user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        Streaming NDJSON response
+        
+    Raises:
+        HTTPException: If medication not found or not owned by user
+    """
+    medication = await db.scalar(select(MedicationModel.id).where(
+        MedicationModel.id == medication_id,
+        MedicationModel.user_id == current_user.id
+    ))
+    
+    if medication is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Medication not found"
+        )
+    
+    async def generate_lines():
+        logs = await db.stream_scalars(select(AdherenceLogModel).where(
+            AdherenceLogModel.medication_id == medication_id
+        ).order_by(
+            AdherenceLogModel.timestamp, AdherenceLogModel.id
+        ).execution_options(yield_per=HISTORY_BATCH_SIZE))
+        async for log in logs:
+            yield AdherenceLog.model_validate(log).model_dump_json() + "\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
 @router.put("/{medication_id}", response_model=Medication)
 async def update_medication(
     medication_id: str,
     medication_update: MedicationUpdate,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a medication's details.
@@ -185,10 +302,10 @@ async def update_medication(
     Raises:
         HTTPException: If medication not found or not owned by user
     """
-    db_medication = db.query(MedicationModel).filter(
+    db_medication = await db.scalar(select(MedicationModel).where(
         MedicationModel.id == medication_id,
         MedicationModel.user_id == current_user.id
-    ).first()
+    ))
     
     if db_medication is None:
         raise HTTPException(
@@ -209,8 +326,8 @@ async def update_medication(
     for key, value in update_data.items():
         setattr(db_medication, key, value)
     
-    db.commit()
-    db.refresh(db_medication)
+    await db.commit()
+    await db.refresh(db_medication)
     
     return db_medication
 
@@ -218,7 +335,7 @@ async def update_medication(
 async def delete_medication(
     medication_id: str,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a medication.
@@ -231,10 +348,10 @@ async def delete_medication(
     Raises:
         HTTPException: If medication not found or not owned by user
     """
-    db_medication = db.query(MedicationModel).filter(
+    db_medication = await db.scalar(select(MedicationModel).where(
         MedicationModel.id == medication_id,
         MedicationModel.user_id == current_user.id
-    ).first()
+    ))
     
     if db_medication is None:
         raise HTTPException(
@@ -242,14 +359,16 @@ async def delete_medication(
             detail="Medication not found"
         )
     
-    # Delete associated adherence logs
-    db.query(AdherenceLogModel).filter(
+    # Delete associated adherence logs (the medication's counters go with it,
+    # in the same transaction)
+    await db.execute(delete(AdherenceLogModel).where(
         AdherenceLogModel.medication_id == medication_id
-    ).delete()
+    ))
     
     # Delete the medication
-    db.delete(db_medication)
-    db.commit()
+    await db.delete(db_medication)
+    await db.commit()
+    invalidate_user_analytics(current_user.id)
     
     return None
 
@@ -257,7 +376,7 @@ async def delete_medication(
 async def record_refill(
     medication_id: str,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Record a medication refill.
@@ -273,10 +392,10 @@ async def record_refill(
     Raises:
         HTTPException: If medication not found or not owned by user
     """
-    db_medication = db.query(MedicationModel).filter(
+    db_medication = await db.scalar(select(MedicationModel).where(
         MedicationModel.id == medication_id,
         MedicationModel.user_id == current_user.id
-    ).first()
+    ))
     
     if db_medication is None:
         raise HTTPException(
@@ -288,8 +407,8 @@ async def record_refill(
     db_medication.current_quantity += db_medication.refill_amount
     db_medication.last_refill_date = datetime.utcnow()
     
-    db.commit()
-    db.refresh(db_medication)
+    await db.commit()
+    await db.refresh(db_medication)
     
     return db_medication
 
@@ -298,7 +417,7 @@ async def record_adherence(
     medication_id: str,
     adherence: AdherenceLogCreate,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Record a medication adherence event (taken or missed).
@@ -316,10 +435,10 @@ async def record_adherence(
         HTTPException: If medication not found or not owned by user
     """
     # Ensure medication exists and belongs to user
-    db_medication = db.query(MedicationModel).filter(
+    db_medication = await db.scalar(select(MedicationModel).where(
         MedicationModel.id == medication_id,
         MedicationModel.user_id == current_user.id
-    ).first()
+    ))
     
     if db_medication is None:
         raise HTTPException(
@@ -337,20 +456,22 @@ async def record_adherence(
     )
     
     db.add(db_adherence)
+    increment_adherence_counters(db_medication, adherence.taken, adherence.timestamp)
     
     # If taken, reduce medication quantity
     if adherence.taken:
         db_medication.current_quantity = max(0, db_medication.current_quantity - 1)
     
-    db.commit()
-    db.refresh(db_adherence)
+    await db.commit()
+    await db.refresh(db_adherence)
+    invalidate_user_analytics(current_user.id)
     
     return db_adherence
 
 @router.get("/adherence/stats", response_model=AdherenceStats)
 async def get_adherence_stats(
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     medication_id: Optional[str] = None,
     from_date: Optional[datetime] = None,
     to_date: Optional[datetime] = None
@@ -368,50 +489,10 @@ async def get_adherence_stats(
     Returns:
         Adherence statistics
     """
-    # Build base query for user's medications
-    medication_query = db.query(MedicationModel).filter(
-        MedicationModel.user_id == current_user.id
+    return await db.run_sync(
+        compute_adherence_stats,
+        user_id=current_user.id,
+        medication_id=medication_id,
+        from_date=from_date,
+        to_date=to_date
     )
-    
-    # Filter by medication ID if provided
-    if medication_id:
-        medication_query = medication_query.filter(MedicationModel.id == medication_id)
-    
-    medications = medication_query.all()
-    
-    # Initialize stats
-    total_doses = 0
-    taken_doses = 0
-    medication_rates = {}
-    
-    # Calculate stats for each medication
-    for medication in medications:
-        # Build adherence log query
-        log_query = db.query(AdherenceLogModel).filter(
-            AdherenceLogModel.medication_id == medication.id
-        )
-        
-        # Apply date filters if provided
-        if from_date:
-            log_query = log_query.filter(AdherenceLogModel.timestamp >= from_date)
-        if to_date:
-            log_query = log_query.filter(AdherenceLogModel.timestamp <= to_date)
-        
-        logs = log_query.all()
-        
-        if logs:
-            med_taken = sum(1 for log in logs if log.taken)
-            med_total = len(logs)
-            total_doses += med_total
-            taken_doses += med_taken
-            medication_rates[medication.name] = med_taken / med_total
-    
-    # Calculate overall rate
-    overall_rate = taken_doses / total_doses if total_doses > 0 else 0.0
-    
-    return {
-        "overall_rate": overall_rate,
-        "total_doses": total_doses,
-        "taken_doses": taken_doses,
-        "medication_rates": medication_rates
-    } 
\ No newline at end of file
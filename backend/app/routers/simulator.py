@@ -4,30 +4,79 @@ Device Simulator Router
 This module provides endpoints for controlling the Smart Inhaler simulator,
 which generates synthetic usage data for development and testing.
 """
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional, Annotated
 from uuid import uuid4
+from datetime import datetime, timedelta
 
+from ..core.config import settings
 from ..db.database import get_db
 from ..services.simulator import get_simulator
+from ..services.streaming import event_broker
+from ..services.device_stats import compute_device_usage
+from ..services.analytics import invalidate_user_analytics
+from ..services.rollups import add_events_to_rollups, bucket_start, choose_granularity
+from ..services.pagination import NEXT_CURSOR_HEADER, decode_cursor, keyset_filter, next_cursor
 from ..schemas.device import (
     DeviceSimulatorConfig, Device, DeviceCreate, 
-    DeviceUsageEvent, DeviceStats
+    DeviceUsageEvent, DeviceUsageRollup, DeviceStats, SimulationProfileInfo
 )
 from ..models.device import Device as DeviceModel
 from ..models.device import DeviceUsageEvent as DeviceUsageEventModel
+from ..models.device import DeviceUsageRollup as DeviceUsageRollupModel
+from ..models.medication import Medication as MedicationModel
 from ..routers.auth import get_current_user
 from ..models.user import User, UserRole
 
 router = APIRouter()
 
+async def _check_medication(
+    db: AsyncSession, medication_id: str, owner_id: int, current_user: User
+) -> None:
+    """
+    Check that a medication exists and belongs to a device's owner.
+
+    Simulated usage is recorded against the medication (adherence logs,
+    remaining quantity), so it must belong to the same patient as the
+    device; admins may pair any device and medication.
+
+    Args:
+        db: Database session
+        medication_id: ID of the medication to check
+        owner_id: ID of the user owning (or about to own) the device
+        current_user: Current authenticated user
+
+    Raises:
+        HTTPException: If the medication does not exist or belongs to
+            another user
+    """
+    medication = await db.get(MedicationModel, medication_id)
+    if medication is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Medication not found"
+        )
+    if current_user.role != UserRole.ADMIN and medication.user_id != owner_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Medication does not belong to the device owner"
+        )
+
+def _unknown_profile(simulator) -> HTTPException:
+    """Build the 400 error for a simulation profile that is not registered."""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Unknown simulation profile; available: {', '.join(sorted(simulator.profiles))}"
+    )
+
 @router.post("/start", status_code=status.HTTP_202_ACCEPTED)
 async def start_simulation(
     config: DeviceSimulatorConfig,
     background_tasks: BackgroundTasks,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Start a Smart Inhaler simulation.
@@ -40,6 +89,10 @@ async def start_simulation(
         
     Returns:
         Status message
+        
+    Raises:
+        HTTPException: If the profile is unknown, or the medication does not
+            exist or belongs to someone other than the device owner
     """
     # Check if user has permission
     if current_user.role != UserRole.ADMIN and current_user.role != UserRole.DOCTOR:
@@ -47,9 +100,34 @@ async def start_simulation(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins and doctors can control the simulator"
         )
+    if not settings.SIMULATOR_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The device simulator is disabled"
+        )
+    
+    # Get simulator and check the profile before starting anything
+    simulator = get_simulator()
+    profile_class = simulator.profiles.get(config.simulation_profile)
+    if profile_class is None:
+        raise _unknown_profile(simulator)
+    device = await db.scalar(select(DeviceModel).where(DeviceModel.id == config.device_id))
+    if config.medication_id is not None:
+        owner_id = device.user_id if device is not None else current_user.id
+        await _check_medication(db, config.medication_id, owner_id, current_user)
+    elif profile_class.requires_schedule:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Simulation profile {config.simulation_profile!r} follows a medication schedule; "
+                   "medication_id is required"
+        )
+    profile_options = {
+        key: value
+        for key, value in (("miss_rate", config.miss_rate), ("max_delay_minutes", config.max_delay_minutes))
+        if value is not None
+    }
     
     # Register device with user if not already registered
-    device = db.query(DeviceModel).filter(DeviceModel.id == config.device_id).first()
     if device is None:
         device = DeviceModel(
             id=config.device_id,
@@ -61,10 +139,7 @@ async def start_simulation(
             user_id=current_user.id
         )
         db.add(device)
-        db.commit()
-    
-    # Get simulator and start simulation in background
-    simulator = get_simulator(db)
+        await db.commit()
     
     # Add to background tasks (will run after response is sent)
     background_tasks.add_task(
@@ -72,7 +147,8 @@ async def start_simulation(
         device_id=config.device_id,
         medication_id=config.medication_id,
         interval_seconds=config.interval_seconds,
-        profile_name=config.simulation_profile
+        profile_name=config.simulation_profile,
+        profile_options=profile_options
     )
     
     return {
@@ -86,7 +162,7 @@ async def stop_simulation(
     device_id: str,
     background_tasks: BackgroundTasks,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Stop a Smart Inhaler simulation.
@@ -108,7 +184,7 @@ async def stop_simulation(
         )
     
     # Get simulator and stop simulation in background
-    simulator = get_simulator(db)
+    simulator = get_simulator()
     
     # Add to background tasks
     background_tasks.add_task(simulator.stop_simulation, device_id)
@@ -117,10 +193,33 @@ async def stop_simulation(
         "message": f"Simulation for device {device_id} stopped"
     }
 
+@router.get("/profiles", response_model=List[SimulationProfileInfo])
+async def get_simulation_profiles(
+    current_user: Annotated[User, Depends(get_current_user)]
+):
+    """
+    List the registered simulation profiles.
+    
+    Args:
+        current_user: Current authenticated user
+        
+    Returns:
+        Profile names, descriptions and whether each needs a medication
+    """
+    profiles = []
+    for name, profile_class in sorted(get_simulator().profiles.items()):
+        doc = (profile_class.__doc__ or "").strip()
+        profiles.append({
+            "name": name,
+            "description": doc.splitlines()[0] if doc else None,
+            "requires_schedule": profile_class.requires_schedule,
+        })
+    return profiles
+
 @router.get("/devices", response_model=List[Device])
 async def get_simulated_devices(
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get all simulated devices.
@@ -134,36 +233,43 @@ async def get_simulated_devices(
     """
     if current_user.role == UserRole.ADMIN:
         # Admins can see all devices
-        devices = db.query(DeviceModel).all()
+        devices = (await db.scalars(select(DeviceModel))).all()
     else:
         # Regular users only see their own devices
-        devices = db.query(DeviceModel).filter(
+        devices = (await db.scalars(select(DeviceModel).where(
             DeviceModel.user_id == current_user.id
-        ).all()
+        ))).all()
     
     return devices
 
 @router.get("/events/{device_id}", response_model=List[DeviceUsageEvent])
 async def get_device_events(
     device_id: str,
+    response: Response,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
-    limit: int = 50
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
 ):
     """
     Get simulated usage events for a device.
     
+    Events are returned newest first. When more events may follow, the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    
     Args:
         device_id: ID of the device to get events for
+        response: Outgoing response (for the pagination header)
         current_user: Current authenticated user
         db: Database session
         limit: Maximum number of events to return
+        cursor: Cursor from a previous X-Next-Cursor header
         
     Returns:
         List of device usage events
     """
     # Check device ownership or admin status
-    device = db.query(DeviceModel).filter(DeviceModel.id == device_id).first()
+    device = await db.scalar(select(DeviceModel).where(DeviceModel.id == device_id))
     if device is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -177,9 +283,31 @@ async def get_device_events(
         )
     
     # Get events
-    events = db.query(DeviceUsageEventModel).filter(
+    query = select(DeviceUsageEventModel).where(
         DeviceUsageEventModel.device_id == device_id
-    ).order_by(DeviceUsageEventModel.timestamp.desc()).limit(limit).all()
+    )
+    
+    if cursor:
+        try:
+            cursor_values = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(keyset_filter(
+            (DeviceUsageEventModel.timestamp, DeviceUsageEventModel.id),
+            cursor_values,
+            descending=True
+        ))
+    
+    events = (await db.scalars(query.order_by(
+        DeviceUsageEventModel.timestamp.desc(), DeviceUsageEventModel.id.desc()
+    ).limit(limit))).all()
+    
+    cursor_token = next_cursor(events, limit, "timestamp", "id")
+    if cursor_token:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_token
     
     return events
 
@@ -187,7 +315,9 @@ async def get_device_events(
 async def get_device_statistics(
     device_id: str,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
 ):
     """
     Get usage statistics for a simulated device.
@@ -196,12 +326,14 @@ async def get_device_statistics(
         device_id: ID of the device to get stats for
         current_user: Current authenticated user
         db: Database session
+        from_date: Optional start date for filtering
+        to_date: Optional end date for filtering
         
     Returns:
         Device usage statistics
     """
     # Check device ownership or admin status
-    device = db.query(DeviceModel).filter(DeviceModel.id == device_id).first()
+    device = await db.scalar(select(DeviceModel).where(DeviceModel.id == device_id))
     if device is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -214,87 +346,78 @@ async def get_device_statistics(
             detail="Access denied to this device's data"
         )
     
-    # Get all events for this device
-    events = db.query(DeviceUsageEventModel).filter(
-        DeviceUsageEventModel.device_id == device_id
-    ).all()
-    
-    # Calculate statistics
-    total_uses = len(events)
-    
-    # Default values if no events
-    if total_uses == 0:
-        return {
-            "total_uses": 0,
-            "average_technique_score": 0.0,
-            "average_dose_delivered": 0.0,
-            "usage_by_time_of_day": {},
-            "usage_by_day_of_week": {},
-            "battery_history": []
-        }
-    
-    # Calculate averages
-    avg_technique = sum(e.technique_score or 0 for e in events) / total_uses
-    avg_dose = sum(e.dose_delivered or 0 for e in events) / total_uses
-    
-    # Categorize by time of day
-    time_categories = {
-        "morning": 0,   # 6:00-11:59
-        "afternoon": 0, # 12:00-17:59
-        "evening": 0,   # 18:00-21:59
-        "night": 0      # 22:00-5:59
-    }
-    
-    for event in events:
-        hour = event.timestamp.hour
-        if 6 <= hour < 12:
-            time_categories["morning"] += 1
-        elif 12 <= hour < 18:
-            time_categories["afternoon"] += 1
-        elif 18 <= hour < 22:
-            time_categories["evening"] += 1
-        else:
-            time_categories["night"] += 1
-    
-    # Categorize by day of week
-    days_of_week = {
-        "Monday": 0,
-        "Tuesday": 0,
-        "Wednesday": 0,
-        "Thursday": 0,
-        "Friday": 0,
-        "Saturday": 0,
-        "Sunday": 0
-    }
-    
-    day_names = list(days_of_week.keys())
-    for event in events:
-        day_idx = event.timestamp.weekday()  # 0 = Monday
-        days_of_week[day_names[day_idx]] += 1
+    # Aggregate usage from the rollups and raw events
+    stats = await db.run_sync(compute_device_usage, device_id, from_date=from_date, to_date=to_date)
     
     # Get battery history (from device updates)
     # In a real implementation, this would have more granularity
-    battery_history = [
-        {
+    battery_history = []
+    if stats["total_uses"] > 0:
+        battery_history.append({
             "timestamp": device.last_connected.isoformat() if device.last_connected else datetime.utcnow().isoformat(),
             "level": device.battery_level
-        }
-    ]
+        })
     
     return {
-        "total_uses": total_uses,
-        "average_technique_score": avg_technique,
-        "average_dose_delivered": avg_dose,
-        "usage_by_time_of_day": time_categories,
-        "usage_by_day_of_week": days_of_week,
+        **stats,
         "battery_history": battery_history
     }
 
+@router.get("/rollups/{device_id}", response_model=List[DeviceUsageRollup])
+async def get_device_rollups(
+    device_id: str,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db),
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    granularity: Optional[str] = Query(None, pattern="^(hour|day)$")
+):
+    """
+    Get pre-aggregated usage buckets for a device as a time series.
+    
+    Args:
+        device_id: ID of the device
+        current_user: Current authenticated user
+        db: Database session
+        from_date: Start of the window (default: 30 days before to_date)
+        to_date: End of the window (default: now)
+        granularity: "hour" or "day" (default: chosen from the window length)
+        
+    Returns:
+        List of usage rollups, oldest first
+    """
+    # Check device ownership or admin status
+    device = await db.scalar(select(DeviceModel).where(DeviceModel.id == device_id))
+    if device is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Device not found"
+        )
+    
+    if device.user_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this device's data"
+        )
+    
+    to_date = to_date or datetime.utcnow()
+    from_date = from_date or to_date - timedelta(days=30)
+    granularity = granularity or choose_granularity(from_date, to_date)
+    
+    rollups = (await db.scalars(select(DeviceUsageRollupModel).where(
+        DeviceUsageRollupModel.device_id == device_id,
+        DeviceUsageRollupModel.granularity == granularity,
+        DeviceUsageRollupModel.bucket_start >= bucket_start(from_date, granularity),
+        DeviceUsageRollupModel.bucket_start <= to_date
+    ).order_by(DeviceUsageRollupModel.bucket_start))).all()
+    
+    return rollups
+
 @router.post("/generate_event", response_model=DeviceUsageEvent, status_code=status.HTTP_201_CREATED)
 async def generate_single_event(
     device_id: str,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     medication_id: Optional[str] = None,
     profile_name: str = "default"
 ):
@@ -310,6 +433,10 @@ async def generate_single_event(
         
     Returns:
         Generated device usage event
+        
+    Raises:
+        HTTPException: If the profile is unknown, or the device or the
+            medication belongs to another user
     """
     # Check permission
     if current_user.role != UserRole.ADMIN and current_user.role != UserRole.DOCTOR:
@@ -318,8 +445,22 @@ async def generate_single_event(
             detail="Only admins and doctors can generate events"
         )
     
+    # Check the profile before creating anything
+    simulator = get_simulator()
+    profile_class = simulator.profiles.get(profile_name)
+    if profile_class is None:
+        raise _unknown_profile(simulator)
+    
     # Check device ownership or admin status
-    device = db.query(DeviceModel).filter(DeviceModel.id == device_id).first()
+    device = await db.scalar(select(DeviceModel).where(DeviceModel.id == device_id))
+    if device is not None and device.user_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this device"
+        )
+    if medication_id is not None:
+        owner_id = device.user_id if device is not None else current_user.id
+        await _check_medication(db, medication_id, owner_id, current_user)
     if device is None:
         # Create device if it doesn't exist
         device = DeviceModel(
@@ -332,26 +473,20 @@ async def generate_single_event(
             user_id=current_user.id
         )
         db.add(device)
-        db.commit()
-        db.refresh(device)
-    elif device.user_id != current_user.id and current_user.role != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied to this device"
-        )
-    
-    # Get simulator
-    simulator = get_simulator(db)
+        await db.commit()
+        await db.refresh(device)
     
     # Create profile and generate event
-    profile_class = simulator.profiles.get(profile_name, simulator.profiles["default"])
     profile = profile_class(device_id, medication_id)
     event_data = profile.generate_usage_event()
     
     # Create event in database
     event = DeviceUsageEventModel(**event_data)
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    await db.run_sync(add_events_to_rollups, [event_data])
+    await db.commit()
+    await db.refresh(event)
+    invalidate_user_analytics(device.user_id)
+    event_broker.publish_one(event_data)
     
     return event 
\ No newline at end of file
@@ -10,11 +10,18 @@ from .user import (
 from .medication import (
     Medication, MedicationCreate, MedicationUpdate,
     MedicationWithAdherence, AdherenceLog, AdherenceLogCreate,
-    AdherenceStats, ScheduledTime
+    AdherenceStats, AdherenceBatchResult, ScheduledTime
 )
 from .device import (
     Device, DeviceCreate, DeviceUpdate,
     DeviceUsageEvent, DeviceUsageEventCreate, DeviceUsageEventBase,
-    DeviceSimulatorConfig, DeviceStats
+    DeviceUsageRollup, DeviceEventRecordResult, DeviceEventBatchResult,
+    DeviceSimulatorConfig, SimulationProfileInfo, DeviceStats
+)
+from .auth import (
+    Token, TokenPayload, LoginRequest, PasswordReset, PasswordChange,
+    RefreshRequest, LogoutRequest
+)
+from .analytics import (
+    AnalyticsDashboard, DailyAdherence, AdherenceStreaks, TechniqueTrend
 )
-from .auth import Token, TokenPayload, LoginRequest, PasswordReset, PasswordChange 
\ No newline at end of file
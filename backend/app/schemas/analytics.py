@@ -0,0 +1,44 @@
+"""
+Analytics schemas for response validation
+
+These Pydantic models define the structure of the patient
+analytics dashboard returned by the analytics API.
+"""
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from datetime import date
+
+class DailyAdherence(BaseModel):
+    """Schema for one day of adherence data."""
+    date: date
+    total_doses: int
+    taken_doses: int
+    rate: Optional[float] = None
+    rolling_7_day_rate: Optional[float] = None
+    rolling_30_day_rate: Optional[float] = None
+
+class AdherenceStreaks(BaseModel):
+    """Schema for runs of consecutive days with every logged dose taken."""
+    current: int
+    longest: int
+
+class TechniqueTrend(BaseModel):
+    """Schema for inhaler technique score trend."""
+    average: Optional[float] = None
+    slope_per_day: Optional[float] = None
+    daily_average: List[Optional[float]]
+
+class AnalyticsDashboard(BaseModel):
+    """Schema for a patient's analytics dashboard."""
+    user_id: int
+    days: int
+    from_date: date
+    to_date: date
+    adherence_rate: float
+    total_doses: int
+    taken_doses: int
+    daily_adherence: List[DailyAdherence]
+    streaks: AdherenceStreaks
+    dose_time_distribution: Dict[str, int]  # "morning", "afternoon", "evening", "night"
+    usage_time_distribution: Dict[str, int]
+    technique_trend: TechniqueTrend
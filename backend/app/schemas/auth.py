@@ -11,10 +11,21 @@ class Token(BaseModel):
     """Schema for authentication token response."""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
     
 class TokenPayload(BaseModel):
     """Schema for token payload (JWT claims)."""
     sub: Optional[int] = None  # Subject (user ID)
+    jti: Optional[str] = None  # Token ID (for revocation)
+    type: str = "access"  # "access" or "refresh"
+    
+class RefreshRequest(BaseModel):
+    """Schema for exchanging a refresh token for new tokens."""
+    refresh_token: str
+    
+class LogoutRequest(BaseModel):
+    """Schema for logout request (optionally revoking a refresh token too)."""
+    refresh_token: Optional[str] = None
     
 class LoginRequest(BaseModel):
     """Schema for login request (username/email + password)."""
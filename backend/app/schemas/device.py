@@ -67,6 +67,34 @@ class DeviceUsageEvent(DeviceUsageEventBase):
     class Config:
         from_attributes = True
 
+class DeviceEventRecordResult(BaseModel):
+    """Schema for the outcome of one record in a batch event upload."""
+    index: int  # Position of the record in the uploaded batch
+    accepted: bool
+    error: Optional[str] = None
+
+class DeviceEventBatchResult(BaseModel):
+    """Schema for the result of a batch event upload."""
+    accepted: int
+    rejected: int
+    results: List[DeviceEventRecordResult]
+
+class DeviceUsageRollup(BaseModel):
+    """Schema for one pre-aggregated usage bucket of a device."""
+    device_id: str
+    granularity: str  # "hour" or "day"
+    bucket_start: datetime
+    event_count: int
+    average_technique_score: Optional[float] = None
+    average_dose_delivered: Optional[float] = None
+    average_temperature: Optional[float] = None
+    average_humidity: Optional[float] = None
+    flow_rate_min: Optional[float] = None
+    flow_rate_max: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
+
 class DeviceSimulatorConfig(BaseModel):
     """Schema for device simulator configuration."""
     enabled: bool = True
@@ -74,7 +102,15 @@ class DeviceSimulatorConfig(BaseModel):
     device_id: str
     medication_id: Optional[str] = None
     generate_random_data: bool = True
-    simulation_profile: str = "default"  # default, regular, random, poor_technique
+    simulation_profile: str = "default"  # default, regular, random, poor_technique or a plugin
+    miss_rate: Optional[float] = Field(None, ge=0, le=1)  # Scheduled profiles only
+    max_delay_minutes: Optional[float] = Field(None, ge=0)  # Scheduled profiles only
+
+class SimulationProfileInfo(BaseModel):
+    """Schema for a registered simulation profile."""
+    name: str
+    description: Optional[str] = None
+    requires_schedule: bool
     
 class DeviceStats(BaseModel):
     """Schema for device usage statistics."""
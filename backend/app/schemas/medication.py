@@ -5,8 +5,8 @@ These Pydantic models define the structure and validation rules
 for medication-related API requests and responses.
 """
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
-from datetime import datetime, time
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, time, timezone
 
 from ..models.medication import DosageUnit, MedicationFrequency
 
@@ -61,7 +61,9 @@ class MedicationWithAdherence(Medication):
     adherence_rate: float
     days_until_refill_needed: int
     needs_refill: bool
+    last_taken_at: Optional[datetime] = None
     adherence_log: Dict[str, bool]
+    adherence_log_next_cursor: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -73,6 +75,14 @@ class AdherenceLogBase(BaseModel):
     scheduled_time: Optional[str] = None
     dosage_taken: Optional[float] = None
 
+    @field_validator("timestamp")
+    @classmethod
+    def to_naive_utc(cls, value: datetime) -> datetime:
+        """Store timestamps as naive UTC, like every other writer."""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
 class AdherenceLogCreate(AdherenceLogBase):
     """Schema for creating adherence log entries."""
     medication_id: str
@@ -85,6 +95,12 @@ class AdherenceLog(AdherenceLogBase):
     class Config:
         from_attributes = True
 
+class AdherenceBatchResult(BaseModel):
+    """Schema for the result of a batch adherence upload."""
+    inserted: int
+    taken: int
+    medication_counts: Dict[str, int]  # Logs inserted per medication ID
+
 class AdherenceStats(BaseModel):
     """Schema for adherence statistics."""
     overall_rate: float
@@ -0,0 +1,226 @@
+"""
+Adherence statistics service
+
+This module computes medication adherence statistics directly in the
+database, so callers never have to load raw adherence logs into Python,
+and maintains the denormalized adherence counters on each medication.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, case, func, insert, or_, update
+from sqlalchemy.orm import Session
+
+from ..models.medication import Medication, AdherenceLog
+from ..schemas.medication import AdherenceLogCreate
+
+def compute_adherence_stats(
+    db: Session,
+    user_id: int,
+    medication_id: Optional[str] = None,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Compute adherence statistics for a user's medications in one query.
+
+    Without a date window the denormalized counters on each medication are
+    read directly. With a window, total and taken dose counts are
+    aggregated per medication with a single GROUP BY on medication_id.
+
+    Args:
+        db: Database session
+        user_id: ID of the user owning the medications
+        medication_id: Optional ID of specific medication to get stats for
+        from_date: Optional start date for filtering
+        to_date: Optional end date for filtering
+
+    Returns:
+        Dictionary matching the AdherenceStats schema
+    """
+    if from_date is None and to_date is None:
+        query = db.query(
+            Medication.id,
+            Medication.name,
+            Medication.total_logs,
+            Medication.taken_logs,
+        ).filter(
+            Medication.user_id == user_id,
+            Medication.total_logs > 0
+        )
+        if medication_id:
+            query = query.filter(Medication.id == medication_id)
+        return _build_stats(query.all())
+
+    taken_sum = func.sum(case((AdherenceLog.taken.is_(True), 1), else_=0))
+    query = db.query(
+        Medication.id,
+        Medication.name,
+        func.count(AdherenceLog.id).label("total"),
+        taken_sum.label("taken"),
+    ).join(
+        AdherenceLog, AdherenceLog.medication_id == Medication.id
+    ).filter(
+        Medication.user_id == user_id
+    )
+
+    # Filter by medication ID if provided
+    if medication_id:
+        query = query.filter(Medication.id == medication_id)
+
+    # Apply date filters if provided
+    if from_date:
+        query = query.filter(AdherenceLog.timestamp >= from_date)
+    if to_date:
+        query = query.filter(AdherenceLog.timestamp <= to_date)
+
+    return _build_stats(query.group_by(Medication.id, Medication.name).all())
+
+def _build_stats(rows) -> Dict[str, Any]:
+    """Fold (id, name, total, taken) rows into an AdherenceStats dictionary."""
+    total_doses = 0
+    taken_doses = 0
+    medication_rates = {}
+    for _, name, med_total, med_taken in rows:
+        med_taken = int(med_taken or 0)
+        total_doses += med_total
+        taken_doses += med_taken
+        medication_rates[name] = med_taken / med_total
+
+    # Calculate overall rate
+    overall_rate = taken_doses / total_doses if total_doses > 0 else 0.0
+
+    return {
+        "overall_rate": overall_rate,
+        "total_doses": total_doses,
+        "taken_doses": taken_doses,
+        "medication_rates": medication_rates
+    }
+
+def increment_adherence_counters(
+    medication: Medication,
+    taken: bool,
+    timestamp: datetime
+) -> None:
+    """
+    Update a medication's adherence counters for one new log entry.
+
+    The counters are assigned as SQL expressions, so the increment happens
+    atomically in the UPDATE emitted by the caller's commit.
+
+    Args:
+        medication: Medication the log entry belongs to
+        taken: Whether the dose was taken
+        timestamp: When the dose was taken or missed
+    """
+    medication.total_logs = Medication.total_logs + 1
+    if taken:
+        medication.taken_logs = Medication.taken_logs + 1
+        medication.last_taken_at = case(
+            (or_(Medication.last_taken_at.is_(None), Medication.last_taken_at < timestamp), timestamp),
+            else_=Medication.last_taken_at
+        )
+
+def bulk_record_adherence(db: Session, logs: List[AdherenceLogCreate]) -> Dict[str, Any]:
+    """
+    Insert a batch of adherence logs and update their medications.
+
+    The logs are written with one bulk INSERT. Quantities and adherence
+    counters of all affected medications are updated with one UPDATE using
+    per-medication CASE expressions. Ownership must be checked by the caller,
+    which also commits, so the whole batch is one transaction.
+
+    Args:
+        db: Database session
+        logs: Adherence log entries to record
+
+    Returns:
+        Dictionary matching the AdherenceBatchResult schema
+    """
+    total_counts: Dict[str, int] = {}
+    taken_counts: Dict[str, int] = {}
+    last_taken: Dict[str, datetime] = {}
+    for log in logs:
+        total_counts[log.medication_id] = total_counts.get(log.medication_id, 0) + 1
+        if log.taken:
+            taken_counts[log.medication_id] = taken_counts.get(log.medication_id, 0) + 1
+            if log.medication_id not in last_taken or last_taken[log.medication_id] < log.timestamp:
+                last_taken[log.medication_id] = log.timestamp
+
+    db.execute(insert(AdherenceLog), [
+        {
+            "medication_id": log.medication_id,
+            "timestamp": log.timestamp,
+            "taken": log.taken,
+            "scheduled_time": log.scheduled_time,
+            "dosage_taken": log.dosage_taken,
+        }
+        for log in logs
+    ])
+
+    taken_delta = case(taken_counts, value=Medication.id, else_=0) if taken_counts else 0
+    total_delta = case(total_counts, value=Medication.id, else_=0)
+    new_quantity = Medication.current_quantity - taken_delta
+    values = {
+        "current_quantity": case((new_quantity < 0, 0), else_=new_quantity),
+        "total_logs": Medication.total_logs + total_delta,
+        "taken_logs": Medication.taken_logs + taken_delta,
+    }
+    if last_taken:
+        batch_last = case(last_taken, value=Medication.id, else_=None)
+        values["last_taken_at"] = case(
+            (and_(
+                batch_last.is_not(None),
+                or_(Medication.last_taken_at.is_(None), Medication.last_taken_at < batch_last)
+            ), batch_last),
+            else_=Medication.last_taken_at
+        )
+    db.execute(
+        update(Medication).where(Medication.id.in_(total_counts)).values(**values),
+        execution_options={"synchronize_session": False}
+    )
+
+    return {
+        "inserted": len(logs),
+        "taken": sum(taken_counts.values()),
+        "medication_counts": total_counts,
+    }
+
+def rebuild_adherence_counters(db: Session, medication_id: Optional[str] = None) -> int:
+    """
+    Rebuild the denormalized adherence counters from the raw logs.
+
+    Args:
+        db: Database session
+        medication_id: Optional ID of a single medication to repair
+
+    Returns:
+        Number of medications updated
+    """
+    taken_sum = func.sum(case((AdherenceLog.taken.is_(True), 1), else_=0))
+    last_taken = func.max(case((AdherenceLog.taken.is_(True), AdherenceLog.timestamp)))
+    log_query = db.query(
+        AdherenceLog.medication_id,
+        func.count(AdherenceLog.id),
+        taken_sum,
+        last_taken,
+    )
+    medication_query = db.query(Medication)
+    if medication_id:
+        log_query = log_query.filter(AdherenceLog.medication_id == medication_id)
+        medication_query = medication_query.filter(Medication.id == medication_id)
+
+    counts = {
+        med_id: (total, int(taken or 0), last)
+        for med_id, total, taken, last in log_query.group_by(AdherenceLog.medication_id)
+    }
+
+    updated = 0
+    for medication in medication_query.all():
+        total, taken, last = counts.get(medication.id, (0, 0, None))
+        medication.total_logs = total
+        medication.taken_logs = taken
+        medication.last_taken_at = last
+        updated += 1
+
+    db.commit()
+    return updated
@@ -0,0 +1,346 @@
+"""
+Analytics service
+
+This module computes the patient analytics dashboard. A patient's
+adherence logs and device usage events are loaded into columnar NumPy
+arrays, and every metric is computed with vectorized array operations.
+Results are memoized per (user, window) and invalidated whenever new
+adherence or usage data is written for that user.
+
+Invalidation only reaches the cache of the process that made the write.
+Writes from other uvicorn workers or from manage.py commands (simulate,
+backfill-events) are picked up once an entry expires, so dashboards can
+be up to ANALYTICS_CACHE_TTL_SECONDS stale.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.device import Device, DeviceUsageEvent
+from ..models.medication import Medication, AdherenceLog
+from .device_stats import time_of_day
+
+# Longest rolling adherence window; this much history is loaded before the
+# requested window so the first days have complete rolling rates
+ROLLING_WINDOWS = (7, 30)
+HISTORY_PADDING_DAYS = max(ROLLING_WINDOWS) - 1
+
+TIME_OF_DAY_NAMES = ["morning", "afternoon", "evening", "night"]
+# Lookup table from hour of day to index in TIME_OF_DAY_NAMES
+_HOUR_TO_TIME_OF_DAY = np.array(
+    [TIME_OF_DAY_NAMES.index(time_of_day(hour)) for hour in range(24)]
+)
+
+class AnalyticsCache:
+    """
+    Bounded LRU cache of computed dashboards with a time-to-live.
+
+    Each user has a version counter. Entries remember the version they
+    were computed at, so invalidating a user is O(1): bumping the counter
+    makes every cached window for that user stale. The TTL bounds how
+    long writes that bypass invalidate_user (other processes) go unseen.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, key: Hashable) -> Optional[Any]:
+        """Return the cached value for a user's key, or None if missing, expired or stale."""
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if (
+                entry is None
+                or entry[0] < monotonic()
+                or entry[1] != self._versions.get(user_id, 0)
+            ):
+                return None
+            self._entries.move_to_end((user_id, key))
+            return entry[2]
+
+    def version(self, user_id: int) -> int:
+        """Return a user's current version (read before computing a value)."""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def set(self, user_id: int, key: Hashable, value: Any, version: int) -> None:
+        """
+        Store a value computed at the given user version.
+
+        A value computed before a concurrent invalidation is stored with the
+        old version and therefore never served.
+        """
+        if self.maxsize <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[(user_id, key)] = (monotonic() + self.ttl_seconds, version, value)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Mark every cached entry for a user as stale."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+# Global dashboard cache
+analytics_cache = AnalyticsCache(
+    maxsize=settings.ANALYTICS_CACHE_SIZE,
+    ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS
+)
+
+def invalidate_user_analytics(user_id: Optional[int]) -> None:
+    """
+    Invalidate cached analytics after new data is written for a user.
+
+    Args:
+        user_id: ID of the user whose data changed (ignored if None)
+    """
+    if user_id is not None:
+        analytics_cache.invalidate_user(user_id)
+
+def load_adherence_columns(
+    db: Session, user_id: int, start: datetime, end: datetime
+) -> Dict[str, np.ndarray]:
+    """
+    Load a user's adherence logs in a time range as columnar arrays.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+        start: Start of the range (inclusive)
+        end: End of the range (exclusive)
+
+    Returns:
+        Dictionary with "timestamp" (datetime64[us]) and "taken" (bool) arrays
+    """
+    rows = db.query(AdherenceLog.timestamp, AdherenceLog.taken).join(
+        Medication, Medication.id == AdherenceLog.medication_id
+    ).filter(
+        Medication.user_id == user_id,
+        AdherenceLog.timestamp >= start,
+        AdherenceLog.timestamp < end
+    ).all()
+    timestamps, taken = zip(*rows) if rows else ((), ())
+    return {
+        "timestamp": np.array(timestamps, dtype="datetime64[us]"),
+        "taken": np.array([bool(value) for value in taken], dtype=bool),
+    }
+
+def load_usage_columns(
+    db: Session, user_id: int, start: datetime, end: datetime
+) -> Dict[str, np.ndarray]:
+    """
+    Load usage events from a user's devices in a time range as columnar arrays.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+        start: Start of the range (inclusive)
+        end: End of the range (exclusive)
+
+    Returns:
+        Dictionary with "timestamp" (datetime64[us]) and "technique_score"
+        (float, NaN where missing) arrays
+    """
+    rows = db.query(DeviceUsageEvent.timestamp, DeviceUsageEvent.technique_score).join(
+        Device, Device.id == DeviceUsageEvent.device_id
+    ).filter(
+        Device.user_id == user_id,
+        DeviceUsageEvent.timestamp >= start,
+        DeviceUsageEvent.timestamp < end
+    ).all()
+    timestamps, scores = zip(*rows) if rows else ((), ())
+    return {
+        "timestamp": np.array(timestamps, dtype="datetime64[us]"),
+        "technique_score": np.array(
+            [np.nan if score is None else score for score in scores], dtype=float
+        ),
+    }
+
+def day_index(timestamps: np.ndarray, first_day: date) -> np.ndarray:
+    """Return each timestamp's day offset from first_day."""
+    return (timestamps.astype("datetime64[D]") - np.datetime64(first_day, "D")).astype(int)
+
+def rolling_rate(taken: np.ndarray, total: np.ndarray, window: int) -> np.ndarray:
+    """
+    Compute a trailing rolling adherence rate from daily counts.
+
+    Args:
+        taken: Taken doses per day
+        total: Logged doses per day
+        window: Window length in days
+
+    Returns:
+        Rate per day, NaN where no doses were logged within the window
+    """
+    taken_cum = np.concatenate(([0], np.cumsum(taken)))
+    total_cum = np.concatenate(([0], np.cumsum(total)))
+    lower = np.maximum(np.arange(1, len(taken) + 1) - window, 0)
+    taken_window = taken_cum[1:] - taken_cum[lower]
+    total_window = total_cum[1:] - total_cum[lower]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total_window > 0, taken_window / total_window, np.nan)
+
+def streaks(taken: np.ndarray, total: np.ndarray) -> Tuple[int, int]:
+    """
+    Compute current and longest runs of days with every logged dose taken.
+
+    Days without any logged doses break a streak. If the last day has no
+    logs yet (e.g. today), the current streak ends at the day before.
+
+    Args:
+        taken: Taken doses per day
+        total: Logged doses per day
+
+    Returns:
+        Tuple of (current streak, longest streak) in days
+    """
+    perfect = (total > 0) & (taken == total)
+    if len(perfect) == 0:
+        return 0, 0
+    padded = np.concatenate(([False], perfect, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    longest = int(lengths.max()) if len(lengths) else 0
+
+    last = len(perfect) - 1
+    if total[last] == 0 and last > 0:
+        last -= 1
+    current = int(lengths[ends == last + 1][0]) if perfect[last] else 0
+    return current, longest
+
+def time_of_day_distribution(timestamps: np.ndarray) -> Dict[str, int]:
+    """Count timestamps per time-of-day bucket."""
+    hours = (timestamps.astype("datetime64[h]") - timestamps.astype("datetime64[D]")).astype(int)
+    counts = np.bincount(_HOUR_TO_TIME_OF_DAY[hours], minlength=len(TIME_OF_DAY_NAMES))
+    return dict(zip(TIME_OF_DAY_NAMES, counts.tolist()))
+
+def _nan_to_none(values: np.ndarray) -> list:
+    return [None if np.isnan(value) else float(value) for value in values]
+
+def compute_dashboard(db: Session, user_id: int, days: int, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Compute a user's analytics dashboard for the last `days` days.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+        days: Window length in days, ending today (inclusive)
+        today: Last day of the window (default: current UTC date)
+
+    Returns:
+        Dictionary matching the AnalyticsDashboard schema
+    """
+    today = today or datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    history_start = first_day - timedelta(days=HISTORY_PADDING_DAYS)
+    end = datetime.combine(today + timedelta(days=1), time.min)
+    n_days = days + HISTORY_PADDING_DAYS
+
+    # Daily adherence counts, including the padding used by rolling windows
+    adherence = load_adherence_columns(db, user_id, datetime.combine(history_start, time.min), end)
+    log_days = day_index(adherence["timestamp"], history_start)
+    daily_total = np.bincount(log_days, minlength=n_days)
+    daily_taken = np.bincount(log_days, weights=adherence["taken"], minlength=n_days).astype(int)
+    rolling = {window: rolling_rate(daily_taken, daily_total, window) for window in ROLLING_WINDOWS}
+
+    window = slice(HISTORY_PADDING_DAYS, None)
+    total, taken = daily_total[window], daily_taken[window]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_rate = np.where(total > 0, taken / total, np.nan)
+    current_streak, longest_streak = streaks(taken, total)
+
+    in_window = log_days >= HISTORY_PADDING_DAYS
+    taken_times = adherence["timestamp"][in_window & adherence["taken"]]
+
+    # Device usage within the window
+    usage = load_usage_columns(db, user_id, datetime.combine(first_day, time.min), end)
+    usage_days = day_index(usage["timestamp"], first_day)
+    scores = usage["technique_score"]
+    scored = ~np.isnan(scores)
+    score_sums = np.bincount(usage_days[scored], weights=scores[scored], minlength=days)
+    score_counts = np.bincount(usage_days[scored], minlength=days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_technique = np.where(score_counts > 0, score_sums / score_counts, np.nan)
+
+    slope = None
+    has_score = score_counts > 0
+    if np.count_nonzero(has_score) >= 2:
+        slope = float(np.polyfit(np.flatnonzero(has_score), daily_technique[has_score], 1)[0])
+
+    total_doses = int(total.sum())
+    taken_doses = int(taken.sum())
+    dates = [first_day + timedelta(days=offset) for offset in range(days)]
+
+    return {
+        "user_id": user_id,
+        "days": days,
+        "from_date": first_day,
+        "to_date": today,
+        "adherence_rate": taken_doses / total_doses if total_doses > 0 else 0.0,
+        "total_doses": total_doses,
+        "taken_doses": taken_doses,
+        "daily_adherence": [
+            {
+                "date": day,
+                "total_doses": int(day_total),
+                "taken_doses": int(day_taken),
+                "rate": rate,
+                "rolling_7_day_rate": rate_7,
+                "rolling_30_day_rate": rate_30,
+            }
+            for day, day_total, day_taken, rate, rate_7, rate_30 in zip(
+                dates, total, taken,
+                _nan_to_none(daily_rate),
+                _nan_to_none(rolling[7][window]),
+                _nan_to_none(rolling[30][window]),
+            )
+        ],
+        "streaks": {"current": current_streak, "longest": longest_streak},
+        "dose_time_distribution": time_of_day_distribution(taken_times),
+        "usage_time_distribution": time_of_day_distribution(usage["timestamp"]),
+        "technique_trend": {
+            "average": float(scores[scored].mean()) if scored.any() else None,
+            "slope_per_day": slope,
+            "daily_average": _nan_to_none(daily_technique),
+        },
+    }
+
+def get_dashboard(db: Session, user_id: int, days: int) -> Dict[str, Any]:
+    """
+    Return a user's dashboard, computing it only on a cache miss.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+        days: Window length in days, ending today
+
+    Returns:
+        Dictionary matching the AnalyticsDashboard schema
+    """
+    today = datetime.utcnow().date()
+    key = (days, today)
+    dashboard = analytics_cache.get(user_id, key)
+    if dashboard is None:
+        version = analytics_cache.version(user_id)
+        dashboard = compute_dashboard(db, user_id, days, today=today)
+        analytics_cache.set(user_id, key, dashboard, version)
+    return dashboard
@@ -2,20 +2,155 @@
 Authentication service
 
 This module provides functions for user authentication, 
-password hashing, and JWT token generation/verification.
+password hashing, and JWT token generation/verification, and caches
+authenticated users so requests do not look them up on every call.
+Request handlers hash and verify passwords through password_hasher,
+which runs bcrypt in a bounded worker pool off the event loop.
 """
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
 from jose import jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 
 from ..core.config import settings
 from ..models.user import User, UserRole
 from ..schemas.auth import TokenPayload
 
 # Setup password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS
+)
+
+# Session.info key collecting IDs of users changed in the current transaction
+_CHANGED_USERS_KEY = "changed_user_ids"
+
+class UserCache:
+    """
+    Bounded LRU cache of authenticated users with a time-to-live.
+
+    Entries are detached copies of User rows without the password hash.
+    As with the analytics cache, each user has a version counter so a
+    lookup racing with an invalidation is never stored as current.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Tuple[float, int, User]]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether caching is enabled (size and TTL both positive)."""
+        return self.maxsize > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: int) -> Optional[User]:
+        """Return the cached user, or None if missing, expired or stale."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if (
+                entry is None
+                or entry[0] < time.monotonic()
+                or entry[1] != self._versions.get(user_id, 0)
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[2]
+
+    def version(self, user_id: int) -> int:
+        """Return a user's current version (read before loading the user)."""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def set(self, user_id: int, user: User, version: int) -> None:
+        """Store a user loaded at the given version."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, version, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user's cached entry."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# Global authenticated user cache
+user_cache = UserCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS
+)
+
+def detached_user(user: User) -> User:
+    """
+    Copy a User row into an object owned by no session.
+
+    The copy carries every column except the password hash, so it can be
+    shared between requests without lazy loads or leaking the hash.
+    """
+    values = {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key != "hashed_password"
+    }
+    return User(**values)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _record_changed_user(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session) -> None:
+    # Invalidate once the change is visible to other sessions, e.g. after
+    # a user is deactivated or changes their password
+    for user_id in session.info.pop(_CHANGED_USERS_KEY, ()):
+        user_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_users(session, previous_transaction) -> None:
+    session.info.pop(_CHANGED_USERS_KEY, None)
 
 def create_access_token(subject: int, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -34,12 +169,53 @@ def create_access_token(subject: int, expires_delta: Optional[timedelta] = None)
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "jti": uuid4().hex, "type": "access"}
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
 
+def password_fingerprint(hashed_password: str) -> str:
+    """
+    Return a short fingerprint of a password hash.
+
+    Refresh tokens carry the fingerprint of the hash they were issued
+    under, so changing the password invalidates them without a deny list
+    entry per token.
+    """
+    return hashlib.sha256(hashed_password.encode()).hexdigest()[:16]
+
+def create_refresh_token(subject: int, hashed_password: str, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create a new JWT refresh token.
+    
+    Args:
+        subject: User ID to encode in the token
+        hashed_password: The user's current password hash (fingerprinted)
+        expires_delta: Optional custom expiration time
+        
+    Returns:
+        JWT refresh token as string
+    """
+    expire = datetime.utcnow() + (expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "jti": uuid4().hex,
+        "type": "refresh",
+        "pwd": password_fingerprint(hashed_password),
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a JWT's signature and expiry and return its claims.
+    
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a password against a hash.
@@ -65,7 +241,90 @@ def get_password_hash(password: str) -> str:
     """
     return pwd_context.hash(password)
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded worker pool.
+
+    Each bcrypt call takes hundreds of milliseconds of CPU; running it in
+    a pool keeps the event loop free, and the pool size caps how many
+    hashes run at once. Calls beyond that wait in the pool's queue, whose
+    depth is tracked for the health endpoint.
+    """
+
+    def __init__(self, workers: int, executor: str = "thread"):
+        self.workers = workers
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.executor_kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hasher"
+                    )
+            return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        executor = self._get_executor()
+        started = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.pending - self.workers)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the worker pool."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash in the worker pool."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool occupancy, queue depth and call durations (including queueing)."""
+        with self._lock:
+            return {
+                "executor": self.executor_kind,
+                "workers": self.workers,
+                "pending": self.pending,
+                "queue_depth": max(0, self.pending - self.workers),
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "average_ms": self.total_time / self.completed * 1000 if self.completed else 0.0,
+                "max_ms": self.max_time * 1000,
+            }
+
+    def shutdown(self) -> None:
+        """Shut down the worker pool (it is recreated on next use)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Global password hashing pool
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    executor=settings.PASSWORD_HASH_EXECUTOR
+)
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     """
     Authenticate a user with username/email and password.
     
@@ -79,18 +338,18 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     """
     # Check if username is an email
     if "@" in username:
-        user = db.query(User).filter(User.email == username).first()
+        user = await db.scalar(select(User).where(User.email == username))
     else:
-        user = db.query(User).filter(User.username == username).first()
+        user = await db.scalar(select(User).where(User.username == username))
         
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return None
     return user
 
-def create_user(
-    db: Session, 
+async def create_user(
+    db: AsyncSession, 
     email: str,
     username: str,
     password: str,
@@ -111,7 +370,7 @@ def create_user(
     Returns:
         The created user
     """
-    hashed_password = get_password_hash(password)
+    hashed_password = await password_hasher.hash(password)
     db_user = User(
         email=email,
         username=username,
@@ -121,6 +380,6 @@ def create_user(
         is_active=True
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user 
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Device statistics service
+
+This module computes inhaler usage statistics in the database. Usage is
+aggregated by (weekday, hour), so at most 168 rows come back no matter how
+many events a device has recorded. Whole hours are read from the hourly
+rollups maintained by services.rollups.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Integer, and_, cast, extract, func, or_, select
+from sqlalchemy.orm import Session
+
+from ..models.device import DeviceUsageEvent, DeviceUsageRollup
+from .rollups import GRANULARITIES, bucket_start
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def time_of_day(hour: int) -> str:
+    """
+    Map an hour of the day to its usage bucket.
+
+    Args:
+        hour: Hour of the day (0-23)
+
+    Returns:
+        One of "morning", "afternoon", "evening" or "night"
+    """
+    if 6 <= hour < 12:
+        return "morning"    # 6:00-11:59
+    if 12 <= hour < 18:
+        return "afternoon"  # 12:00-17:59
+    if 18 <= hour < 22:
+        return "evening"    # 18:00-21:59
+    return "night"          # 22:00-5:59
+
+def hour_and_weekday(dialect: str, column) -> Tuple[Any, Any]:
+    """
+    Build SQL expressions for the hour and weekday of a timestamp column.
+
+    The weekday expression counts from Sunday = 0 on every dialect.
+
+    Args:
+        dialect: Database dialect name, e.g. "sqlite" or "postgresql"
+        column: Timestamp column
+
+    Returns:
+        Tuple of (hour expression, weekday expression)
+    """
+    if dialect == "sqlite":
+        return (
+            cast(func.strftime("%H", column), Integer),
+            cast(func.strftime("%w", column), Integer),
+        )
+    return (
+        cast(extract("hour", column), Integer),
+        cast(extract("dow", column), Integer),
+    )
+
+def compute_device_usage(
+    db: Session,
+    device_id: str,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Aggregate a device's usage in an optional time window.
+
+    Whole hours inside the window are read from the hourly rollups, so
+    the cost depends on the window length rather than on the number of
+    events. Partial hours at the window edges are aggregated from the raw
+    events.
+
+    Args:
+        db: Database session
+        device_id: ID of the device
+        from_date: Optional start of the window (inclusive)
+        to_date: Optional end of the window (inclusive)
+
+    Returns:
+        Dictionary with total_uses, average_technique_score,
+        average_dose_delivered, usage_by_time_of_day and usage_by_day_of_week
+    """
+    dialect = db.get_bind().dialect.name
+
+    # Whole hours covered by the window: [rollup_start, rollup_end)
+    rollup_start = None
+    if from_date is not None:
+        rollup_start = bucket_start(from_date, "hour")
+        if rollup_start < from_date:
+            rollup_start += GRANULARITIES["hour"]
+    rollup_end = bucket_start(to_date, "hour") if to_date is not None else None
+
+    if rollup_start is not None and rollup_end is not None and rollup_start >= rollup_end:
+        # The window lies within a single hour boundary; use raw events only
+        statement = usage_by_hour_statement(dialect, device_id).where(
+            DeviceUsageEvent.timestamp >= from_date,
+            DeviceUsageEvent.timestamp <= to_date
+        )
+        return fold_usage_rows(db.execute(statement).all())
+
+    hour, weekday = hour_and_weekday(dialect, DeviceUsageRollup.bucket_start)
+    rollup_query = select(
+        weekday,
+        hour,
+        func.sum(DeviceUsageRollup.event_count),
+        func.sum(DeviceUsageRollup.technique_score_sum),
+        func.sum(DeviceUsageRollup.dose_delivered_sum),
+    ).where(
+        DeviceUsageRollup.device_id == device_id,
+        DeviceUsageRollup.granularity == "hour"
+    ).group_by(weekday, hour)
+    if rollup_start is not None:
+        rollup_query = rollup_query.where(DeviceUsageRollup.bucket_start >= rollup_start)
+    if rollup_end is not None:
+        rollup_query = rollup_query.where(DeviceUsageRollup.bucket_start < rollup_end)
+    rows = db.execute(rollup_query).all()
+
+    # Raw events in the partial hours at either edge
+    edges = []
+    if rollup_start is not None:
+        edges.append(and_(
+            DeviceUsageEvent.timestamp >= from_date,
+            DeviceUsageEvent.timestamp < rollup_start
+        ))
+    if rollup_end is not None:
+        edges.append(and_(
+            DeviceUsageEvent.timestamp >= rollup_end,
+            DeviceUsageEvent.timestamp <= to_date
+        ))
+    if edges:
+        edge_query = usage_by_hour_statement(dialect, device_id).where(or_(*edges))
+        rows += db.execute(edge_query).all()
+
+    return fold_usage_rows(rows)
+
+def usage_by_hour_statement(dialect: str, device_id: str):
+    """
+    Build the grouped (weekday, hour) usage query for a device.
+
+    Args:
+        dialect: Database dialect name
+        device_id: ID of the device
+
+    Returns:
+        SQLAlchemy select statement
+    """
+    hour, weekday = hour_and_weekday(dialect, DeviceUsageEvent.timestamp)
+    return select(
+        weekday,
+        hour,
+        func.count(DeviceUsageEvent.id),
+        func.sum(func.coalesce(DeviceUsageEvent.technique_score, 0.0)),
+        func.sum(func.coalesce(DeviceUsageEvent.dose_delivered, 0.0)),
+    ).where(
+        DeviceUsageEvent.device_id == device_id
+    ).group_by(weekday, hour)
+
+def fold_usage_rows(rows: List[Tuple[int, int, int, float, float]]) -> Dict[str, Any]:
+    """
+    Fold (weekday, hour, count, technique_sum, dose_sum) rows into statistics.
+
+    Args:
+        rows: Aggregated rows, weekday counted from Sunday = 0
+
+    Returns:
+        Dictionary of usage statistics (see compute_device_usage)
+    """
+    total_uses = 0
+    technique_total = 0.0
+    dose_total = 0.0
+    time_categories = {"morning": 0, "afternoon": 0, "evening": 0, "night": 0}
+    days_of_week = {day: 0 for day in DAY_NAMES}
+
+    for weekday, hour, count, technique_sum, dose_sum in rows:
+        total_uses += count
+        technique_total += technique_sum or 0.0
+        dose_total += dose_sum or 0.0
+        time_categories[time_of_day(int(hour))] += count
+        # Convert Sunday = 0 to Monday = 0
+        days_of_week[DAY_NAMES[(int(weekday) - 1) % 7]] += count
+
+    if total_uses == 0:
+        return {
+            "total_uses": 0,
+            "average_technique_score": 0.0,
+            "average_dose_delivered": 0.0,
+            "usage_by_time_of_day": {},
+            "usage_by_day_of_week": {},
+        }
+
+    return {
+        "total_uses": total_uses,
+        "average_technique_score": technique_total / total_uses,
+        "average_dose_delivered": dose_total / total_uses,
+        "usage_by_time_of_day": time_categories,
+        "usage_by_day_of_week": days_of_week,
+    }
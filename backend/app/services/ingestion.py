@@ -0,0 +1,145 @@
+"""
+Device event ingestion service
+
+This module handles batch uploads of device usage events from BLE
+gateways. A batch is parsed and validated in one pass, references to
+devices and medications are resolved with one query each, and accepted
+events are written with a single executemany INSERT together with their
+rollup updates.
+"""
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..models.device import Device, DeviceUsageEvent
+from ..models.medication import Medication
+from ..models.user import User, UserRole
+from ..schemas.device import DeviceUsageEventCreate
+from .rollups import add_events_to_rollups
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def is_ndjson(content_type: Optional[str]) -> bool:
+    """Return True if a Content-Type header denotes newline-delimited JSON."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return media_type in NDJSON_CONTENT_TYPES
+
+def parse_event_batch(body: bytes, ndjson: bool) -> List[Tuple[Any, Optional[str]]]:
+    """
+    Split a request body into raw records.
+
+    A JSON body must be an array of objects. An NDJSON body holds one object
+    per line; blank lines are skipped and a line that is not valid JSON
+    rejects only that record.
+
+    Args:
+        body: Raw request body
+        ndjson: Whether the body is newline-delimited JSON
+
+    Returns:
+        List of (record, error) pairs, where record is None if error is set
+
+    Raises:
+        ValueError: If a JSON body is malformed or not an array
+    """
+    if not ndjson:
+        try:
+            records = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of events")
+        return [(record, None) for record in records]
+
+    parsed = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            parsed.append((json.loads(line), None))
+        except json.JSONDecodeError as e:
+            parsed.append((None, f"Invalid JSON: {e}"))
+    return parsed
+
+def _format_validation_error(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+def ingest_device_events(
+    db: Session, user: User, records: List[Tuple[Any, Optional[str]]]
+) -> Tuple[Dict[str, Any], Set[int], List[Dict[str, Any]]]:
+    """
+    Validate and insert a batch of device usage events.
+
+    Invalid records are rejected individually; the remaining events are
+    inserted and folded into the rollups in the caller's transaction.
+    Non-admin users may only upload events for their own devices and
+    medications.
+
+    Args:
+        db: Database session
+        user: User uploading the batch
+        records: Parsed (record, error) pairs from parse_event_batch
+
+    Returns:
+        Tuple of (dictionary matching the DeviceEventBatchResult schema,
+        IDs of the users owning devices that received events, inserted
+        event rows)
+    """
+    errors: List[Optional[str]] = []
+    events: List[Optional[DeviceUsageEventCreate]] = []
+    for record, error in records:
+        event = None
+        if error is None:
+            try:
+                event = DeviceUsageEventCreate.model_validate(record)
+            except ValidationError as e:
+                error = _format_validation_error(e)
+        events.append(event)
+        errors.append(error)
+
+    # Resolve every referenced device and medication with one query each
+    valid = [event for event in events if event is not None]
+    device_owners = dict(db.query(Device.id, Device.user_id).filter(
+        Device.id.in_({event.device_id for event in valid})
+    ).all())
+    medication_ids = {event.medication_id for event in valid if event.medication_id}
+    medication_owners = dict(db.query(Medication.id, Medication.user_id).filter(
+        Medication.id.in_(medication_ids)
+    ).all()) if medication_ids else {}
+
+    is_admin = user.role == UserRole.ADMIN
+    rows = []
+    owners: Set[int] = set()
+    for i, event in enumerate(events):
+        if event is None:
+            continue
+        if event.device_id not in device_owners:
+            errors[i] = f"Unknown device: {event.device_id}"
+        elif not is_admin and device_owners[event.device_id] != user.id:
+            errors[i] = f"Access denied to device: {event.device_id}"
+        elif event.medication_id and (
+            event.medication_id not in medication_owners
+            or (not is_admin and medication_owners[event.medication_id] != user.id)
+        ):
+            errors[i] = f"Unknown medication: {event.medication_id}"
+        else:
+            rows.append(event.model_dump())
+            owners.add(device_owners[event.device_id])
+
+    if rows:
+        db.execute(insert(DeviceUsageEvent), rows)
+        add_events_to_rollups(db, rows)
+
+    results = [
+        {"index": i, "accepted": error is None, "error": error}
+        for i, error in enumerate(errors)
+    ]
+    return {
+        "accepted": len(rows),
+        "rejected": len(results) - len(rows),
+        "results": results,
+    }, owners, rows
@@ -0,0 +1,96 @@
+"""
+Keyset pagination helpers
+
+This module encodes and decodes the opaque cursor tokens used by the
+listing endpoints. A cursor carries the sort key of the last row returned,
+so the next page is fetched with a WHERE clause instead of an OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+# Response header carrying the cursor for the next page of a list endpoint
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode sort key values into an opaque cursor token.
+
+    Args:
+        values: Sort key values of the last row on the page
+
+    Returns:
+        URL-safe cursor token
+    """
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, size: int) -> Tuple[Any, ...]:
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Args:
+        token: Cursor token from the client
+        size: Expected number of sort key values
+
+    Returns:
+        Tuple of sort key values
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values: List[Any] = [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if len(values) != size:
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+def keyset_filter(columns: Tuple[Any, ...], values: Tuple[Any, ...], descending: bool = False):
+    """
+    Build the WHERE clause that selects rows after a cursor position.
+
+    Args:
+        columns: Sort key columns, most significant first
+        values: Sort key values decoded from the cursor
+        descending: Whether the listing is ordered descending
+
+    Returns:
+        SQLAlchemy boolean expression
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < value if descending else column > value
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+def next_cursor(rows: List[Any], limit: int, *keys: str) -> Optional[str]:
+    """
+    Return the cursor for the page after `rows`, if there may be one.
+
+    Args:
+        rows: Rows returned for the current page
+        limit: Requested page size
+        keys: Attribute names forming the sort key
+
+    Returns:
+        Cursor token, or None if this is the last page
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(*(getattr(last, key) for key in keys))
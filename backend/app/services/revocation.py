@@ -0,0 +1,209 @@
+"""
+Token revocation service
+
+This module keeps the deny list of revoked JWTs. Revocations are
+persisted in the revoked_tokens table and mirrored into an in-memory
+Bloom filter, so checking a token that was never revoked (almost every
+request) costs a few hashes and no database access. Only Bloom filter
+hits are confirmed against the table. The filter is periodically synced
+with the table to pick up revocations made by other processes.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.token import RevokedToken
+
+# How long a revocation may take to be committed after its revoked_at is
+# stamped (including clock differences between workers); each sync looks
+# back this far, plus one sync interval, past the latest revocation seen
+REVOCATION_COMMIT_SLACK = timedelta(seconds=60)
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Membership tests never give false negatives; false positives occur at
+    roughly `error_rate` while at most `capacity` keys have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing: derive all k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        """Add a key to the filter."""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class TokenRevocationStore:
+    """
+    Deny list of revoked token IDs backed by the revoked_tokens table.
+
+    The Bloom filter only ever grows; it is rebuilt from the unexpired
+    rows when it fills past its capacity.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._synced_at: Optional[float] = None  # Monotonic time of the last sync
+        self._watermark: Optional[datetime] = None  # Latest revoked_at loaded
+        self.checks = 0
+        self.bloom_hits = 0
+        self.confirmed = 0
+
+    def might_be_revoked(self, jti: str) -> bool:
+        """Return False if the token is definitely not revoked."""
+        with self._lock:
+            self.checks += 1
+            if jti in self._bloom:
+                self.bloom_hits += 1
+                return True
+            return False
+
+    def _remember(self, jti: str, revoked_at: Optional[datetime] = None) -> None:
+        with self._lock:
+            # Syncs overlap, so most rows are seen again; only count new keys
+            if jti not in self._bloom:
+                self._bloom.add(jti)
+            if revoked_at is not None and (self._watermark is None or revoked_at > self._watermark):
+                self._watermark = revoked_at
+
+    async def is_revoked(self, db: AsyncSession, jti: Optional[str]) -> bool:
+        """
+        Check whether a token ID is revoked.
+
+        Args:
+            db: Database session
+            jti: Token ID (tokens without one cannot be revoked)
+
+        Returns:
+            True if the token is on the deny list
+        """
+        if not jti:
+            return False
+        await self.sync(db)
+        if not self.might_be_revoked(jti):
+            return False
+        revoked = await db.scalar(select(RevokedToken.jti).where(RevokedToken.jti == jti)) is not None
+        if revoked:
+            with self._lock:
+                self.confirmed += 1
+        return revoked
+
+    async def revoke(
+        self, db: AsyncSession, jti: str, expires_at: datetime, user_id: Optional[int] = None
+    ) -> None:
+        """
+        Add a token ID to the deny list. The caller commits.
+
+        Args:
+            db: Database session
+            jti: Token ID to revoke
+            expires_at: When the token expires (the entry can be pruned after)
+            user_id: Optional ID of the token's user
+        """
+        if await db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=datetime.utcnow()))
+        self._remember(jti)
+
+    async def sync(self, db: AsyncSession, force: bool = False) -> None:
+        """
+        Load revocations made since the last sync (at most every sync_seconds).
+
+        Another worker may commit a revocation some time after stamping its
+        revoked_at, so the query looks back from the latest revocation seen
+        by one sync interval plus REVOCATION_COMMIT_SLACK.
+
+        Args:
+            db: Database session
+            force: Sync even if the last sync is recent
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+                return
+            self._synced_at = now
+            watermark = self._watermark
+            rebuild = self._bloom.count > self.capacity
+
+        query = select(RevokedToken.jti, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > datetime.utcnow()
+        )
+        if watermark is not None and not rebuild:
+            since = watermark - timedelta(seconds=self.sync_seconds) - REVOCATION_COMMIT_SLACK
+            query = query.where(RevokedToken.revoked_at >= since)
+        rows = (await db.execute(query)).all()
+
+        if rebuild:
+            with self._lock:
+                self._bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+                self._watermark = None
+        for jti, revoked_at in rows:
+            self._remember(jti, revoked_at)
+
+    def reset(self) -> None:
+        """Forget all loaded revocations (they are reloaded on the next sync)."""
+        with self._lock:
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            self._synced_at = None
+            self._watermark = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the filter size and check counters."""
+        with self._lock:
+            return {
+                "entries": self._bloom.count,
+                "capacity": self._bloom.capacity,
+                "checks": self.checks,
+                "bloom_hits": self.bloom_hits,
+                "confirmed_revoked": self.confirmed,
+            }
+
+# Global token revocation store
+revocation_store = TokenRevocationStore(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+    sync_seconds=settings.TOKEN_REVOCATION_SYNC_SECONDS
+)
+
+def prune_revoked_tokens(db: Session) -> int:
+    """
+    Delete deny list entries for tokens that have expired anyway.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of entries deleted
+    """
+    result = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,236 @@
+"""
+Device usage rollup service
+
+This module maintains the per-device hourly and daily usage aggregates in
+the device_usage_rollups table. Rollups are updated incrementally as
+events are inserted, and any time range can be recomputed from the raw
+events with compact_rollups.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from ..models.device import DeviceUsageEvent, DeviceUsageRollup
+
+# Supported rollup granularities and their bucket widths
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Event fields aggregated as sum + non-null count (to derive means)
+MEAN_FIELDS = ("technique_score", "dose_delivered", "temperature", "humidity")
+
+RollupKey = Tuple[str, str, datetime]
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """
+    Return the start of the bucket containing a timestamp.
+
+    Args:
+        timestamp: Event timestamp
+        granularity: "hour" or "day"
+
+    Returns:
+        Start of the bucket
+    """
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def choose_granularity(from_date: datetime, to_date: datetime) -> str:
+    """
+    Pick the coarsest granularity that still gives a useful series.
+
+    Args:
+        from_date: Start of the requested window
+        to_date: End of the requested window
+
+    Returns:
+        "hour" for windows up to a week, "day" otherwise
+    """
+    return "hour" if to_date - from_date <= timedelta(days=7) else "day"
+
+def _empty_state() -> Dict[str, Any]:
+    state: Dict[str, Any] = {"event_count": 0, "flow_rate_min": None, "flow_rate_max": None}
+    for field in MEAN_FIELDS:
+        state[f"{field}_sum"] = 0.0
+        state[f"{field}_count"] = 0
+    return state
+
+def _merge_extreme(current: Optional[float], value: Optional[float], pick) -> Optional[float]:
+    if value is None:
+        return current
+    if current is None:
+        return value
+    return pick(current, value)
+
+def _accumulate(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    state["event_count"] += 1
+    for field in MEAN_FIELDS:
+        value = event.get(field)
+        if value is not None:
+            state[f"{field}_sum"] += value
+            state[f"{field}_count"] += 1
+    flow_rate = event.get("flow_rate")
+    state["flow_rate_min"] = _merge_extreme(state["flow_rate_min"], flow_rate, min)
+    state["flow_rate_max"] = _merge_extreme(state["flow_rate_max"], flow_rate, max)
+
+def _merge(state: Dict[str, Any], other: Dict[str, Any]) -> None:
+    state["event_count"] += other["event_count"]
+    for field in MEAN_FIELDS:
+        state[f"{field}_sum"] += other[f"{field}_sum"]
+        state[f"{field}_count"] += other[f"{field}_count"]
+    state["flow_rate_min"] = _merge_extreme(state["flow_rate_min"], other["flow_rate_min"], min)
+    state["flow_rate_max"] = _merge_extreme(state["flow_rate_max"], other["flow_rate_max"], max)
+
+def _rows(states: Dict[RollupKey, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"device_id": device_id, "granularity": granularity, "bucket_start": start, **state}
+        for (device_id, granularity, start), state in states.items()
+    ]
+
+def _upsert_statement(db: Session):
+    """Build an INSERT ... ON CONFLICT statement that merges into existing buckets."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = DeviceUsageRollup.__table__
+    stmt = insert(table)
+    excluded = stmt.excluded
+    set_ = {"event_count": table.c.event_count + excluded.event_count}
+    for field in MEAN_FIELDS:
+        for suffix in ("sum", "count"):
+            column = f"{field}_{suffix}"
+            set_[column] = table.c[column] + excluded[column]
+    set_["flow_rate_min"] = case(
+        (table.c.flow_rate_min.is_(None), excluded.flow_rate_min),
+        (excluded.flow_rate_min < table.c.flow_rate_min, excluded.flow_rate_min),
+        else_=table.c.flow_rate_min
+    )
+    set_["flow_rate_max"] = case(
+        (table.c.flow_rate_max.is_(None), excluded.flow_rate_max),
+        (excluded.flow_rate_max > table.c.flow_rate_max, excluded.flow_rate_max),
+        else_=table.c.flow_rate_max
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.device_id, table.c.granularity, table.c.bucket_start],
+        set_=set_
+    )
+
+def add_events_to_rollups(db: Session, events: Iterable[Dict[str, Any]]) -> None:
+    """
+    Fold newly inserted events into the hourly and daily rollups.
+
+    Events are pre-aggregated per bucket, then merged into the table with
+    one upsert. The caller commits, so the rollups change in the same
+    transaction as the events.
+
+    Args:
+        db: Database session
+        events: Event dictionaries (DeviceUsageEvent column values)
+    """
+    states: Dict[RollupKey, Dict[str, Any]] = {}
+    for event in events:
+        timestamp = event.get("timestamp") or datetime.utcnow()
+        for granularity in GRANULARITIES:
+            key = (event["device_id"], granularity, bucket_start(timestamp, granularity))
+            if key not in states:
+                states[key] = _empty_state()
+            _accumulate(states[key], event)
+
+    if states:
+        db.execute(_upsert_statement(db), _rows(states))
+
+def _hour_bucket(dialect: str, column):
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    return func.date_trunc("hour", column)
+
+def compact_rollups(
+    db: Session,
+    from_date: datetime,
+    to_date: datetime,
+    device_id: Optional[str] = None
+) -> int:
+    """
+    Recompute the rollups for a time range from the raw events.
+
+    The range is widened to whole days so that both granularities are
+    rebuilt consistently. Devices are processed one at a time to bound
+    memory use.
+
+    Args:
+        db: Database session
+        from_date: Start of the range to recompute
+        to_date: End of the range to recompute
+        device_id: Optional ID of a single device to recompute
+
+    Returns:
+        Number of rollup buckets written
+    """
+    start = bucket_start(from_date, "day")
+    end = bucket_start(to_date, "day")
+    if end <= to_date:
+        end += GRANULARITIES["day"]
+
+    in_range = and_(
+        DeviceUsageEvent.timestamp >= start,
+        DeviceUsageEvent.timestamp < end
+    )
+    if device_id:
+        device_ids = [device_id]
+    else:
+        device_ids = [
+            row[0] for row in db.query(DeviceUsageEvent.device_id).filter(in_range).distinct()
+        ]
+
+    delete_query = db.query(DeviceUsageRollup).filter(
+        DeviceUsageRollup.bucket_start >= start,
+        DeviceUsageRollup.bucket_start < end
+    )
+    if device_id:
+        delete_query = delete_query.filter(DeviceUsageRollup.device_id == device_id)
+    delete_query.delete(synchronize_session=False)
+
+    hour = _hour_bucket(db.get_bind().dialect.name, DeviceUsageEvent.timestamp)
+    aggregates = [func.count(DeviceUsageEvent.id)]
+    for field in MEAN_FIELDS:
+        column = getattr(DeviceUsageEvent, field)
+        aggregates += [func.coalesce(func.sum(column), 0.0), func.count(column)]
+    aggregates += [func.min(DeviceUsageEvent.flow_rate), func.max(DeviceUsageEvent.flow_rate)]
+    state_keys = ["event_count"]
+    for field in MEAN_FIELDS:
+        state_keys += [f"{field}_sum", f"{field}_count"]
+    state_keys += ["flow_rate_min", "flow_rate_max"]
+
+    written = 0
+    table = DeviceUsageRollup.__table__
+    for current_device in device_ids:
+        rows = db.query(hour, *aggregates).filter(
+            DeviceUsageEvent.device_id == current_device,
+            in_range
+        ).group_by(hour).all()
+
+        states: Dict[RollupKey, Dict[str, Any]] = {}
+        for row in rows:
+            hour_start = row[0]
+            if isinstance(hour_start, str):
+                hour_start = datetime.fromisoformat(hour_start)
+            hour_state = dict(zip(state_keys, row[1:]))
+            states[(current_device, "hour", hour_start)] = hour_state
+
+            day_key = (current_device, "day", bucket_start(hour_start, "day"))
+            if day_key not in states:
+                states[day_key] = _empty_state()
+            _merge(states[day_key], hour_state)
+
+        if states:
+            db.execute(table.insert(), _rows(states))
+            written += len(states)
+
+    db.commit()
+    return written
@@ -1,37 +1,166 @@
 """
 Smart Inhaler Simulator Service
 
-This module simulates a Smart Inhaler device for development and testing.
+This module simulates Smart Inhaler devices for development and testing.
 It generates synthetic inhaler usage data to simulate real-world usage
-patterns and allow testing without physical hardware.
+patterns and allow testing without physical hardware. One scheduler
+drives all simulated devices, so thousands can run for load testing.
 """
+import heapq
+import importlib
 import random
 import time
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Callable, Any
+import threading
+from datetime import datetime, timedelta, time as dt_time
+from importlib.metadata import entry_points
+from typing import Dict, Iterable, List, Optional, Callable, Any, Tuple, Type
 from uuid import uuid4
+import numpy as np
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 from ..models.device import Device, DeviceUsageEvent
 from ..models.medication import Medication, DosageUnit
+from ..schemas.medication import AdherenceLogCreate
 from ..core.config import settings
+from ..db.database import SessionLocal
+from .adherence import bulk_record_adherence
+from .analytics import invalidate_user_analytics
+from .rollups import add_events_to_rollups
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("inhaler_simulator")
 
+# Device IDs per IN (...) lookup when starting many simulations
+DEVICE_LOOKUP_CHUNK_SIZE = 500
+
+class DoseSchedule:
+    """Dose schedule of a medication, as followed by scheduled profiles."""
+    
+    def __init__(
+        self,
+        medication_id: str,
+        user_id: Optional[int],
+        scheduled_times: List[Dict[str, int]],
+        weekdays: Optional[List[bool]] = None,
+        dosage: Optional[float] = None
+    ):
+        """
+        Initialize the schedule.
+        
+        Args:
+            medication_id: ID of the medication
+            user_id: ID of the medication's owner
+            scheduled_times: Dose times as {"hour", "minute"} dictionaries
+            weekdays: Active days as booleans [Sun, Mon, ..., Sat] (default: every day)
+            dosage: Dose taken at each scheduled time
+        """
+        self.medication_id = medication_id
+        self.user_id = user_id
+        self.times = sorted((entry["hour"], entry["minute"]) for entry in scheduled_times or [])
+        self.weekdays = list(weekdays) if weekdays else [True] * 7
+        self.dosage = dosage
+    
+    @classmethod
+    def from_medication(cls, medication: Medication) -> "DoseSchedule":
+        """Build the schedule of a medication row."""
+        return cls(
+            medication.id, medication.user_id, medication.scheduled_times,
+            medication.weekdays, medication.dosage
+        )
+    
+    def doses_between(self, start: datetime, end: datetime) -> List[datetime]:
+        """
+        Return the scheduled dose times in (start, end].
+        
+        Args:
+            start: Exclusive start of the window
+            end: Inclusive end of the window
+            
+        Returns:
+            Dose times in chronological order
+        """
+        doses = []
+        day = start.date()
+        while day <= end.date():
+            # weekday() counts from Monday, the stored weekdays from Sunday
+            if self.weekdays[(day.weekday() + 1) % 7]:
+                for hour, minute in self.times:
+                    dose = datetime.combine(day, dt_time(hour, minute))
+                    if start < dose <= end:
+                        doses.append(dose)
+            day += timedelta(days=1)
+        return doses
+
 class SimulationProfile:
     """Base class for different simulation profiles."""
     
-    def __init__(self, device_id: str, medication_id: Optional[str] = None):
+    # Chance of an unscheduled use on each scheduler tick
+    usage_probability = 0.15
+    # Whether the profile follows a medication's dose schedule
+    requires_schedule = False
+    
+    def __init__(
+        self,
+        device_id: str,
+        medication_id: Optional[str] = None,
+        schedule: Optional[DoseSchedule] = None,
+        **options: Any
+    ):
+        """
+        Initialize the profile for one device.
+        
+        Args:
+            device_id: ID of the simulated device
+            medication_id: Optional ID of associated medication
+            schedule: Dose schedule of the medication, if loaded
+            **options: Profile-specific options (ignored by profiles
+                without any)
+        """
         self.device_id = device_id
         self.medication_id = medication_id
+        self.schedule = schedule
         
     def generate_usage_event(self) -> Dict[str, Any]:
         """Generate a simulated usage event."""
         raise NotImplementedError("Subclasses must implement this method")
+    
+    def advance(self, now: datetime) -> Tuple[List[Dict[str, Any]], List[AdherenceLogCreate]]:
+        """
+        Advance the simulated device to `now`; called on every scheduler tick.
+        
+        Args:
+            now: Current time
+            
+        Returns:
+            Tuple of (usage events, adherence logs) produced since the last call
+        """
+        if random.random() < self.usage_probability:
+            return [self.generate_usage_event()], []
+        return [], []
+    
+    @classmethod
+    def generate_usage_batch(cls, rng: np.random.Generator, size: int) -> Dict[str, np.ndarray]:
+        """
+        Generate the sensor columns of `size` events at once.
+        
+        Args:
+            rng: Seeded NumPy random generator
+            size: Number of events
+            
+        Returns:
+            Dictionary of event field name to array of `size` values
+            (timestamps and device/medication IDs are added by the caller)
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+    
+    @classmethod
+    def supports_usage_batch(cls) -> bool:
+        """Whether the profile implements generate_usage_batch (needed for backfills)."""
+        return cls.generate_usage_batch.__func__ is not SimulationProfile.generate_usage_batch.__func__
 
 class DefaultProfile(SimulationProfile):
     """Default simulation profile with realistic inhaler usage patterns."""
@@ -78,6 +207,34 @@ class DefaultProfile(SimulationProfile):
             "technique_score": technique_score,
             "is_valid": True
         }
+    
+    @classmethod
+    def generate_usage_batch(cls, rng: np.random.Generator, size: int) -> Dict[str, np.ndarray]:
+        """
+        Generate realistic sensor columns for `size` events.
+        
+        Args:
+            rng: Seeded NumPy random generator
+            size: Number of events
+            
+        Returns:
+            Dictionary of event field name to array of `size` values
+        """
+        technique_score = rng.uniform(0.7, 0.95, size)
+        return {
+            "pressure_reading": rng.uniform(0.8, 1.2, size),
+            "flow_rate": rng.uniform(30, 60, size),
+            "duration_ms": rng.integers(1500, 3001, size),
+            "acceleration": np.column_stack([
+                rng.uniform(-0.5, 0.5, size),
+                rng.uniform(-0.5, 0.5, size),
+                rng.uniform(0.8, 1.2, size)
+            ]),
+            "temperature": rng.uniform(20, 25, size),
+            "humidity": rng.uniform(40, 60, size),
+            "dose_delivered": 1.0 * technique_score,
+            "technique_score": technique_score,
+        }
 
 class PoorTechniqueProfile(DefaultProfile):
     """Simulation profile with poor inhaler technique."""
@@ -103,39 +260,377 @@ class PoorTechniqueProfile(DefaultProfile):
         event["dose_delivered"] = 1.0 * event["technique_score"]
         
         return event
+    
+    @classmethod
+    def generate_usage_batch(cls, rng: np.random.Generator, size: int) -> Dict[str, np.ndarray]:
+        """
+        Generate sensor columns for `size` events with poor technique.
+        
+        Args:
+            rng: Seeded NumPy random generator
+            size: Number of events
+            
+        Returns:
+            Dictionary of event field name to array of `size` values
+        """
+        columns = super().generate_usage_batch(rng, size)
+        columns["pressure_reading"] = rng.uniform(0.3, 0.7, size)
+        columns["flow_rate"] = rng.uniform(10, 25, size)
+        columns["duration_ms"] = np.where(
+            rng.random(size) < 0.5,
+            rng.integers(300, 801, size),     # Too short
+            rng.integers(4000, 6001, size)    # Too long
+        )
+        columns["technique_score"] = rng.uniform(0.2, 0.5, size)
+        columns["dose_delivered"] = 1.0 * columns["technique_score"]
+        return columns
+
+class ScheduledProfile(DefaultProfile):
+    """
+    Profile following a medication's dose schedule.
+    
+    Each scheduled dose is taken with probability 1 - miss_rate, up to
+    max_delay_minutes late. Every dose produces an adherence log (taken,
+    or missed once its window has passed) and every taken dose a usage
+    event.
+    """
+    
+    usage_probability = 0.0
+    requires_schedule = True
+    miss_rate = 0.05
+    max_delay_minutes = 15.0
+    
+    def __init__(
+        self,
+        device_id: str,
+        medication_id: Optional[str] = None,
+        schedule: Optional[DoseSchedule] = None,
+        miss_rate: Optional[float] = None,
+        max_delay_minutes: Optional[float] = None,
+        **options: Any
+    ):
+        """
+        Initialize the profile for one device.
+        
+        Args:
+            device_id: ID of the simulated device
+            medication_id: Optional ID of associated medication
+            schedule: Dose schedule of the medication
+            miss_rate: Fraction of doses missed (default: the class value)
+            max_delay_minutes: Latest a dose is taken after its scheduled
+                time (default: the class value)
+            **options: Ignored
+        """
+        super().__init__(device_id, medication_id, schedule, **options)
+        if miss_rate is not None:
+            self.miss_rate = miss_rate
+        if max_delay_minutes is not None:
+            self.max_delay_minutes = max_delay_minutes
+        self._checked_until: Optional[datetime] = None
+        # Decided doses not yet due: (due, scheduled time, taken)
+        self._pending: List[Tuple[datetime, datetime, bool]] = []
+    
+    def advance(self, now: datetime) -> Tuple[List[Dict[str, Any]], List[AdherenceLogCreate]]:
+        """
+        Decide the doses scheduled since the last call and emit those now due.
+        
+        Args:
+            now: Current time
+            
+        Returns:
+            Tuple of (usage events, adherence logs) produced since the last call
+        """
+        events, logs = super().advance(now)
+        if self.schedule is None:
+            return events, logs
+        
+        # Only doses scheduled after the simulation started are followed
+        window_start = self._checked_until or now
+        self._checked_until = now
+        window = timedelta(minutes=self.max_delay_minutes)
+        for dose in self.schedule.doses_between(window_start, now):
+            if random.random() < self.miss_rate:
+                self._pending.append((dose + window, dose, False))
+            else:
+                self._pending.append((dose + random.random() * window, dose, True))
+        
+        pending = []
+        for due, dose, taken in self._pending:
+            if due > now:
+                pending.append((due, dose, taken))
+                continue
+            logs.append(AdherenceLogCreate(
+                medication_id=self.schedule.medication_id,
+                timestamp=due if taken else dose,
+                taken=taken,
+                scheduled_time=f"{dose:%H:%M}",
+                dosage_taken=self.schedule.dosage if taken else None
+            ))
+            if taken:
+                event = self.generate_usage_event()
+                event["timestamp"] = due
+                events.append(event)
+        self._pending = pending
+        return events, logs
+
+class IrregularProfile(ScheduledProfile):
+    """
+    Profile of a patient who follows the schedule loosely.
+    
+    A third of the doses are missed, the rest are taken up to three hours
+    late, and the inhaler is also used occasionally outside the schedule.
+    """
+    
+    usage_probability = 0.02
+    miss_rate = 0.35
+    max_delay_minutes = 180.0
+
+# Registered simulation profiles, by name
+PROFILES: Dict[str, Type[SimulationProfile]] = {
+    "default": DefaultProfile,
+    "poor_technique": PoorTechniqueProfile,
+    "regular": ScheduledProfile,
+    "random": IrregularProfile,
+}
+
+# Entry point group third-party packages register profiles under
+PROFILE_ENTRY_POINT_GROUP = "aetherbloom.simulation_profiles"
+
+def register_profile(name: str, profile_class: Type[SimulationProfile]) -> None:
+    """
+    Register a simulation profile, replacing any profile with the same name.
+    
+    Args:
+        name: Name used to select the profile
+        profile_class: SimulationProfile subclass
+        
+    Raises:
+        TypeError: If profile_class is not a SimulationProfile subclass
+    """
+    if not (isinstance(profile_class, type) and issubclass(profile_class, SimulationProfile)):
+        raise TypeError(f"{profile_class!r} is not a SimulationProfile subclass")
+    PROFILES[name] = profile_class
+
+def load_profile_plugins(specs: Iterable[str] = ()) -> None:
+    """
+    Register profiles from installed entry points and configured specs.
+    
+    Profiles published by installed packages in the
+    aetherbloom.simulation_profiles entry point group are registered
+    first (ones that fail to load are logged and skipped), then each
+    "name=module:Class" spec.
+    
+    Args:
+        specs: Profile specs, e.g. settings.SIMULATOR_PROFILES
+        
+    Raises:
+        ValueError: If a spec is malformed
+        ImportError: If a spec's module cannot be imported
+    """
+    for entry_point in entry_points(group=PROFILE_ENTRY_POINT_GROUP):
+        try:
+            register_profile(entry_point.name, entry_point.load())
+        except Exception as e:
+            logger.error(f"Could not load simulation profile {entry_point.name!r}: {e}")
+    
+    for spec in specs:
+        name, _, target = spec.partition("=")
+        module_name, _, attribute = target.partition(":")
+        if not name.strip() or not module_name.strip() or not attribute.strip():
+            raise ValueError(f"Invalid simulation profile {spec!r}; expected name=module:Class")
+        module = importlib.import_module(module_name.strip())
+        register_profile(name.strip(), getattr(module, attribute.strip()))
+
+def ensure_simulated_devices(
+    db: Session, device_ids: List[str], user_id: Optional[int] = None
+) -> Dict[str, Tuple[Optional[int], Optional[float]]]:
+    """
+    Look up devices by ID, creating missing ones as simulated inhalers.
+    
+    Existing devices are looked up with one query per chunk and missing
+    ones are created with one bulk insert and committed.
+    
+    Args:
+        db: Database session
+        device_ids: IDs of the devices
+        user_id: Owner for devices that have to be created
+        
+    Returns:
+        Dictionary mapping each device ID to its (owner ID, battery level)
+    """
+    existing: Dict[str, Tuple[Optional[int], Optional[float]]] = {}
+    for offset in range(0, len(device_ids), DEVICE_LOOKUP_CHUNK_SIZE):
+        chunk = device_ids[offset:offset + DEVICE_LOOKUP_CHUNK_SIZE]
+        rows = db.execute(
+            select(Device.id, Device.user_id, Device.battery_level).where(Device.id.in_(chunk))
+        )
+        existing.update((row.id, (row.user_id, row.battery_level)) for row in rows)
+    
+    missing = [device_id for device_id in dict.fromkeys(device_ids) if device_id not in existing]
+    if missing:
+        db.execute(insert(Device), [
+            {
+                "id": device_id,
+                "name": "Simulated Smart Inhaler",
+                "model": "AetherBloom-Sim-2025",
+                "firmware_version": "1.0.0",
+                "battery_level": 100.0,
+                "is_active": True,
+                "user_id": user_id
+            }
+            for device_id in missing
+        ])
+        existing.update((device_id, (user_id, 100.0)) for device_id in missing)
+        db.commit()
+    return existing
+
+class VirtualDevice:
+    """Scheduling state of one simulated device."""
+
+    __slots__ = (
+        "device_id", "user_id", "profile", "interval_seconds", "battery_level", "next_due", "generation",
+        "unsaved_events", "unsaved_logs", "write_failures"
+    )
+
+    def __init__(
+        self,
+        device_id: str,
+        user_id: Optional[int],
+        profile: SimulationProfile,
+        interval_seconds: float,
+        battery_level: float,
+        next_due: float,
+        generation: int
+    ):
+        self.device_id = device_id
+        self.user_id = user_id
+        self.profile = profile
+        self.interval_seconds = interval_seconds
+        self.battery_level = battery_level
+        self.next_due = next_due
+        self.generation = generation
+        # Output of ticks whose write failed, retried with the next tick
+        self.unsaved_events: List[Dict[str, Any]] = []
+        self.unsaved_logs: List[AdherenceLogCreate] = []
+        self.write_failures = 0
 
 class InhalerSimulator:
     """
     Smart Inhaler simulator that generates synthetic usage data.
     
-    This class can be used to simulate a Bluetooth-connected Smart Inhaler
-    during development, generating realistic usage patterns and data.
+    This class can be used to simulate Bluetooth-connected Smart Inhalers
+    during development and load testing. A single scheduler task drives
+    every simulated device from a heap ordered by next due time; all
+    devices due in the same tick are written with one bulk UPDATE, one
+    bulk INSERT of their events and one commit.
+    
+    The scheduler runs on its own event loop in a dedicated worker thread
+    and opens a session from `session_factory` for each unit of work, so
+    synthetic load never blocks the API's event loop or shares a session
+    with request handlers. Registered callbacks are called from the
+    worker thread.
     """
     
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_window_seconds: float = settings.SIMULATOR_BATCH_WINDOW_SECONDS,
+        max_write_failures: int = settings.SIMULATOR_MAX_WRITE_FAILURES
+    ):
         """
         Initialize the inhaler simulator.
         
         Args:
-            db: Database session for storing simulation data
+            session_factory: Creates the database sessions used to store
+                simulation data
+            batch_window_seconds: Devices due within this window of the
+                earliest due device are processed in the same tick
+            max_write_failures: Consecutive failed writes after which a
+                device's simulation is stopped
         """
-        self.db = db
-        self.devices: Dict[str, Device] = {}
-        self.simulations: Dict[str, asyncio.Task] = {}
+        self.session_factory = session_factory
+        self.batch_window_seconds = batch_window_seconds
+        self.max_write_failures = max_write_failures
+        self.simulations: Dict[str, VirtualDevice] = {}
         self.callbacks: List[Callable[[Dict[str, Any]], None]] = []
         
-        # Available simulation profiles
-        self.profiles = {
-            "default": DefaultProfile,
-            "poor_technique": PoorTechniqueProfile
-        }
+        # Worker thread running the simulator's event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        
+        # Heap of (next_due, generation, device_id); entries whose generation
+        # no longer matches the device's are stale and skipped when popped.
+        # Only touched from the worker thread.
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._generation = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        
+        # Tick counters
+        self.ticks = 0
+        self.device_updates = 0
+        self.events_generated = 0
+        self.adherence_logs = 0
+        self.last_tick_ms = 0.0
+        self.max_tick_ms = 0.0
+        self.failed_ticks = 0
+        self.failed_device_writes = 0
+        self.dropped_devices = 0
         
+        # Available simulation profiles (the shared registry)
+        self.profiles = PROFILES
+    
+    @property
+    def running(self) -> bool:
+        """Whether the worker thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self) -> None:
+        """Start the worker thread (no-op if it is already running)."""
+        with self._lock:
+            if self.running:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run_worker, args=(self._loop,), name="inhaler-simulator", daemon=True
+            )
+            self._thread.start()
+            logger.info("Simulator worker started")
+    
+    async def shutdown(self) -> None:
+        """Stop all simulations and the worker thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if thread is None:
+            return
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._stop_all(), loop))
+        loop.call_soon_threadsafe(loop.stop)
+        await asyncio.to_thread(thread.join)
+        logger.info("Simulator worker stopped")
+    
+    @staticmethod
+    def _run_worker(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+    
+    async def _call(self, coroutine) -> Any:
+        """Run a coroutine on the worker loop and wait for its result."""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        return await asyncio.wrap_future(future)
+    
     async def start_simulation(
         self, 
         device_id: str, 
         medication_id: Optional[str] = None,
         interval_seconds: int = settings.SIMULATOR_INTERVAL_SECONDS,
-        profile_name: str = "default"
+        profile_name: str = "default",
+        profile_options: Optional[Dict[str, Any]] = None
     ) -> None:
         """
         Start a device simulation.
@@ -145,39 +640,46 @@ class InhalerSimulator:
             medication_id: Optional ID of associated medication
             interval_seconds: How often to generate data (seconds)
             profile_name: Which simulation profile to use
+            profile_options: Options for the profile (e.g. miss_rate)
         """
-        # Stop existing simulation if any
-        await self.stop_simulation(device_id)
-        
-        # Get or create device
-        device = self.db.query(Device).filter(Device.id == device_id).first()
-        if device is None:
-            device = Device(
-                id=device_id,
-                name="Simulated Smart Inhaler",
-                model="AetherBloom-Sim-2025",
-                firmware_version="1.0.0",
-                battery_level=100.0,
-                is_active=True
-            )
-            self.db.add(device)
-            self.db.commit()
-            self.db.refresh(device)
-        
-        self.devices[device_id] = device
-        
-        # Create the simulation profile
-        profile_class = self.profiles.get(profile_name, DefaultProfile)
-        profile = profile_class(device_id, medication_id)
-        
-        # Create and start simulation task
-        task = asyncio.create_task(
-            self._run_simulation(device_id, profile, interval_seconds)
+        await self.start_simulations(
+            [device_id], medication_id, interval_seconds, profile_name, profile_options=profile_options
         )
-        self.simulations[device_id] = task
-        
         logger.info(f"Started simulation for device {device_id}")
     
+    async def start_simulations(
+        self,
+        device_ids: List[str],
+        medication_id: Optional[str] = None,
+        interval_seconds: float = settings.SIMULATOR_INTERVAL_SECONDS,
+        profile_name: str = "default",
+        user_id: Optional[int] = None,
+        profile_options: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Start simulating many devices at once.
+        
+        Existing devices are looked up with one query per chunk and missing
+        ones are created with one bulk insert. Devices that are already
+        being simulated are restarted with the new settings.
+        
+        Args:
+            device_ids: IDs of the devices to simulate
+            medication_id: Optional ID of associated medication (its dose
+                schedule is followed by scheduled profiles)
+            interval_seconds: How often each device reports (seconds)
+            profile_name: Which simulation profile to use
+            user_id: Owner for devices that have to be created
+            profile_options: Options for the profile (e.g. miss_rate)
+            
+        Raises:
+            ValueError: If the profile is unknown, or needs a medication
+                schedule and no medication was found
+        """
+        await self._call(self._start_simulations(
+            list(device_ids), medication_id, interval_seconds, profile_name, user_id, profile_options or {}
+        ))
+    
     async def stop_simulation(self, device_id: str) -> None:
         """
         Stop a device simulation.
@@ -185,88 +687,285 @@ class InhalerSimulator:
         Args:
             device_id: ID of the device to stop simulating
         """
-        task = self.simulations.pop(device_id, None)
-        if task:
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
-            logger.info(f"Stopped simulation for device {device_id}")
+        if self.running:
+            await self._call(self._stop(device_id))
     
     async def stop_all_simulations(self) -> None:
         """Stop all active simulations."""
-        for device_id in list(self.simulations.keys()):
-            await self.stop_simulation(device_id)
+        if self.running:
+            await self._call(self._stop_all())
     
     def register_callback(self, callback: Callable[[Dict[str, Any]], None]) -> None:
         """
         Register a callback function to receive simulated data.
         
         Args:
-            callback: Function to call with each simulated event
+            callback: Function to call with each simulated event (from the
+                simulator's worker thread)
         """
         self.callbacks.append(callback)
     
-    async def _run_simulation(
-        self, 
-        device_id: str, 
-        profile: SimulationProfile,
-        interval_seconds: int
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of simulated devices and tick counters."""
+        return {
+            "running": self.running,
+            "devices": len(self.simulations),
+            "ticks": self.ticks,
+            "device_updates": self.device_updates,
+            "events_generated": self.events_generated,
+            "adherence_logs": self.adherence_logs,
+            "last_tick_ms": self.last_tick_ms,
+            "max_tick_ms": self.max_tick_ms,
+            "failed_ticks": self.failed_ticks,
+            "failed_device_writes": self.failed_device_writes,
+            "dropped_devices": self.dropped_devices,
+        }
+    
+    # The methods below run on the worker thread's event loop
+    
+    async def _start_simulations(
+        self,
+        device_ids: List[str],
+        medication_id: Optional[str],
+        interval_seconds: float,
+        profile_name: str,
+        user_id: Optional[int],
+        profile_options: Dict[str, Any]
     ) -> None:
-        """
-        Run the simulation loop for a device.
+        profile_class = self.profiles.get(profile_name)
+        if profile_class is None:
+            raise ValueError(f"Unknown simulation profile {profile_name!r}")
         
-        Args:
-            device_id: ID of the device to simulate
-            profile: Simulation profile to use
-            interval_seconds: How often to generate data
-        """
-        device = self.devices[device_id]
+        with self.session_factory() as db:
+            schedule = None
+            if medication_id is not None:
+                medication = db.get(Medication, medication_id)
+                if medication is not None:
+                    schedule = DoseSchedule.from_medication(medication)
+            if profile_class.requires_schedule and schedule is None:
+                raise ValueError(f"Simulation profile {profile_name!r} needs an existing medication")
+            existing = ensure_simulated_devices(db, device_ids, user_id)
+        
+        # Create the simulation profiles and schedule each device immediately
+        now = asyncio.get_running_loop().time()
+        for device_id in device_ids:
+            owner, battery_level = existing[device_id]
+            self._generation += 1
+            self.simulations[device_id] = VirtualDevice(
+                device_id=device_id,
+                user_id=owner,
+                profile=profile_class(device_id, medication_id, schedule=schedule, **profile_options),
+                interval_seconds=interval_seconds,
+                battery_level=100.0 if battery_level is None else battery_level,
+                next_due=now,
+                generation=self._generation
+            )
+            heapq.heappush(self._schedule, (now, self._generation, device_id))
         
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.create_task(self._run_scheduler())
+        else:
+            # New devices may be due before the scheduler's current sleep ends
+            self._wakeup.set()
+    
+    async def _stop(self, device_id: str) -> None:
+        # Its heap entry becomes stale and is dropped when it comes due
+        if self.simulations.pop(device_id, None) is not None:
+            logger.info(f"Stopped simulation for device {device_id}")
+    
+    async def _stop_all(self) -> None:
+        self.simulations.clear()
+        self._schedule.clear()
+        task, self._scheduler = self._scheduler, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Stopped all simulations")
+    
+    def _pop_due(self, deadline: float) -> List[VirtualDevice]:
+        """Pop every live device due at or before `deadline`."""
+        due = []
+        while self._schedule and self._schedule[0][0] <= deadline:
+            _, generation, device_id = heapq.heappop(self._schedule)
+            device = self.simulations.get(device_id)
+            if device is not None and device.generation == generation:
+                due.append(device)
+        return due
+    
+    async def _run_scheduler(self) -> None:
+        """Sleep until the next device is due, then process every due device in one tick."""
+        loop = asyncio.get_running_loop()
         try:
-            while True:
-                # Update device
-                device.last_connected = datetime.utcnow()
-                device.battery_level = max(0.0, device.battery_level - 0.1)
-                self.db.commit()
+            while self.simulations:
+                self._wakeup.clear()
+                if not self._schedule:
+                    await self._wakeup.wait()
+                    continue
+                delay = self._schedule[0][0] - loop.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
                 
-                # Generate event with 15% probability
-                if random.random() < 0.15:
-                    event_data = profile.generate_usage_event()
-                    event = DeviceUsageEvent(**event_data)
-                    self.db.add(event)
-                    self.db.commit()
-                    self.db.refresh(event)
-                    
-                    # Call registered callbacks
-                    for callback in self.callbacks:
-                        try:
-                            callback(event_data)
-                        except Exception as e:
-                            logger.error(f"Error in callback: {e}")
+                now = loop.time()
+                due = self._pop_due(now + self.batch_window_seconds)
+                if due:
+                    self._tick(due)
                 
-                # Wait for next interval
-                await asyncio.sleep(interval_seconds)
+                # Reschedule, skipping intervals missed while the tick ran
+                for device in due:
+                    device.next_due += device.interval_seconds
+                    if device.next_due <= now:
+                        device.next_due = now + device.interval_seconds
+                    heapq.heappush(self._schedule, (device.next_due, device.generation, device.device_id))
                 
+                # Let start/stop requests run between large ticks
+                await asyncio.sleep(0)
         except asyncio.CancelledError:
-            logger.info(f"Simulation for device {device_id} was cancelled")
+            logger.info("Simulation scheduler was cancelled")
             raise
+    
+    def _tick(self, due: List[VirtualDevice]) -> None:
+        """
+        Update every due device and store their events and adherence logs
+        in one transaction.
+        
+        If that transaction fails, each device is written on its own, so
+        one bad row (e.g. a log for a medication deleted mid-run) only
+        affects its device. A device whose write fails keeps its output and
+        retries it with its next tick; after max_write_failures consecutive
+        failures its simulation is stopped.
+        
+        Args:
+            due: Devices due in this tick
+        """
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        batches = []
+        for device in due:
+            device.battery_level = max(0.0, device.battery_level - 0.1)
+            update_row = {"id": device.device_id, "battery_level": device.battery_level, "last_connected": now}
+            
+            device_events, device_logs = device.profile.advance(now)
+            batches.append((
+                device, update_row,
+                device.unsaved_events + device_events, device.unsaved_logs + device_logs
+            ))
+        
+        try:
+            self._store(batches)
+            stored = batches
+        except Exception:
+            self.failed_ticks += 1
+            logger.exception(f"Simulation tick for {len(due)} devices failed; storing devices one by one")
+            stored = []
+            for batch in batches:
+                try:
+                    self._store([batch])
+                    stored.append(batch)
+                except Exception:
+                    self._write_failed(*batch)
+        
+        events = []
+        adherence_logs = []
+        owners = set()
+        for device, _, device_events, device_logs in stored:
+            device.unsaved_events = []
+            device.unsaved_logs = []
+            device.write_failures = 0
+            events.extend(device_events)
+            adherence_logs.extend(device_logs)
+            if device_events:
+                owners.add(device.user_id)
+            if device_logs:
+                owners.add(device.profile.schedule.user_id)
+        
+        for owner in owners:
+            invalidate_user_analytics(owner)
+        
+        # Call registered callbacks
+        for event_data in events:
+            for callback in self.callbacks:
+                try:
+                    callback(event_data)
+                except Exception as e:
+                    logger.error(f"Error in callback: {e}")
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.ticks += 1
+        self.device_updates += len(stored)
+        self.events_generated += len(events)
+        self.adherence_logs += len(adherence_logs)
+        self.last_tick_ms = elapsed_ms
+        self.max_tick_ms = max(self.max_tick_ms, elapsed_ms)
+    
+    def _store(
+        self,
+        batches: List[Tuple[VirtualDevice, Dict[str, Any], List[Dict[str, Any]], List[AdherenceLogCreate]]]
+    ) -> None:
+        """Write the updates, events and adherence logs of some devices in one transaction."""
+        updates = [update_row for _, update_row, _, _ in batches]
+        events = [event for _, _, device_events, _ in batches for event in device_events]
+        adherence_logs = [log for _, _, _, device_logs in batches for log in device_logs]
+        with self.session_factory() as db:
+            try:
+                # ORM bulk UPDATE by primary key: one executemany statement
+                db.execute(update(Device), updates)
+                if events:
+                    db.execute(insert(DeviceUsageEvent), events)
+                    add_events_to_rollups(db, events)
+                if adherence_logs:
+                    bulk_record_adherence(db, adherence_logs)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+    
+    def _write_failed(
+        self,
+        device: VirtualDevice,
+        update_row: Dict[str, Any],
+        events: List[Dict[str, Any]],
+        adherence_logs: List[AdherenceLogCreate]
+    ) -> None:
+        """Keep a device's unsaved output for its next tick, or stop it after too many failures."""
+        self.failed_device_writes += 1
+        device.write_failures += 1
+        if device.write_failures >= self.max_write_failures:
+            self.dropped_devices += 1
+            self.simulations.pop(device.device_id, None)
+            logger.exception(
+                f"Stopped simulation for device {device.device_id} after {device.write_failures} failed writes; "
+                f"discarded {len(events)} events and {len(adherence_logs)} adherence logs"
+            )
+            return
+        device.unsaved_events = events
+        device.unsaved_logs = adherence_logs
+        logger.exception(f"Storing simulation data for device {device.device_id} failed; retrying next tick")
 
 # Global simulator instance
 _simulator: Optional[InhalerSimulator] = None
 
-def get_simulator(db: Session) -> InhalerSimulator:
+def get_simulator() -> InhalerSimulator:
     """
     Get the global inhaler simulator instance.
     
-    Args:
-        db: Database session
-        
+    The simulator opens its own sessions from SessionLocal; its worker
+    thread is started by the application lifespan (or on first use).
+    Profile plugins are loaded when the simulator is first created.
+    
     Returns:
         InhalerSimulator instance
     """
     global _simulator
     if _simulator is None:
-        _simulator = InhalerSimulator(db)
-    return _simulator 
\ No newline at end of file
+        load_profile_plugins(settings.SIMULATOR_PROFILES)
+        _simulator = InhalerSimulator(SessionLocal)
+    return _simulator
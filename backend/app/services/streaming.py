@@ -0,0 +1,215 @@
+"""
+Device event streaming service
+
+This module fans device usage events out to streaming clients (the SSE
+and WebSocket endpoints) from an in-process publish/subscribe broker, so
+new readings are pushed as they are stored instead of being polled from
+the database. Each subscriber has a bounded queue: a slow client loses
+its oldest events (and is told how many) rather than slowing down
+publishers or other subscribers, and everything queued while it was
+busy is coalesced into one frame.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from ..core.config import settings
+
+class Subscription:
+    """
+    One streaming client's view of the broker.
+
+    Only used from the broker's event loop.
+    """
+
+    def __init__(self, broker: "EventBroker", device_ids: Set[str], maxsize: int):
+        self.broker = broker
+        self.device_ids = device_ids
+        self.maxsize = maxsize
+        self.delivered = 0
+        self.dropped = 0
+        self._pending: Deque[str] = deque()
+        self._dropped_since_frame = 0
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def offer(self, message: str) -> None:
+        """Queue a serialized event, dropping the oldest if the queue is full."""
+        if len(self._pending) >= self.maxsize:
+            self._pending.popleft()
+            self.dropped += 1
+            self._dropped_since_frame += 1
+        self._pending.append(message)
+        self._ready.set()
+
+    def close(self) -> None:
+        """Wake the client so it can end its stream."""
+        self.closed = True
+        self._ready.set()
+
+    async def next_frame(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Wait for queued events and return them as one JSON frame.
+
+        Args:
+            timeout: Seconds to wait before returning None (default: no limit)
+
+        Returns:
+            JSON object with "events" and "dropped" (events lost since the
+            previous frame), or None on timeout or once the broker closes
+        """
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._ready.clear()
+        if self.closed and not self._pending:
+            return None
+
+        count = min(len(self._pending), settings.STREAM_MAX_FRAME_EVENTS)
+        events = [self._pending.popleft() for _ in range(count)]
+        if self._pending:
+            self._ready.set()
+        dropped, self._dropped_since_frame = self._dropped_since_frame, 0
+        self.delivered += count
+        return f'{{"events":[{",".join(events)}],"dropped":{dropped}}}'
+
+class EventBroker:
+    """
+    In-process fan-out of device usage events to subscriptions.
+
+    Subscriptions live on one event loop (the API's, bound at startup).
+    Events may be published from any thread: publishes from other
+    threads are buffered and handed to the loop in one callback per
+    burst. Each event is serialized once, however many clients receive it.
+    """
+
+    def __init__(self, max_subscribers: int, queue_size: int):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._by_device: Dict[str, Set[Subscription]] = {}
+        self._subscriptions: Set[Subscription] = set()
+        self._inbox: Deque[Dict[str, Any]] = deque()
+        self._inbox_lock = threading.Lock()
+        self._drain_scheduled = False
+        self.published = 0
+        self.fanned_out = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Bind the broker to the event loop serving its subscribers."""
+        self._loop = loop
+
+    def subscribe(self, device_ids: Iterable[str]) -> Subscription:
+        """
+        Subscribe to the events of some devices. Call from the bound loop.
+
+        Args:
+            device_ids: IDs of the devices to receive events for
+
+        Returns:
+            New subscription (pass it to unsubscribe when done)
+
+        Raises:
+            RuntimeError: If the subscriber limit is reached
+        """
+        if len(self._subscriptions) >= self.max_subscribers:
+            raise RuntimeError("Too many streaming subscribers")
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, set(device_ids), self.queue_size)
+        for device_id in subscription.device_ids:
+            self._by_device.setdefault(device_id, set()).add(subscription)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription. Call from the bound loop."""
+        for device_id in subscription.device_ids:
+            subscribers = self._by_device.get(device_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_device[device_id]
+        self._subscriptions.discard(subscription)
+        subscription.close()
+
+    def publish(self, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        Publish stored events to their devices' subscribers.
+
+        Safe to call from any thread; never blocks on subscribers.
+
+        Args:
+            events: Event dictionaries (DeviceUsageEvent column values)
+        """
+        if not self._subscriptions or self._loop is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._fan_out(events)
+            return
+
+        with self._inbox_lock:
+            self._inbox.extend(events)
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+        try:
+            self._loop.call_soon_threadsafe(self._drain_inbox)
+        except RuntimeError:
+            # The loop has been closed
+            with self._inbox_lock:
+                self._inbox.clear()
+                self._drain_scheduled = False
+
+    def publish_one(self, event: Dict[str, Any]) -> None:
+        """Publish a single event (usable as a simulator callback)."""
+        self.publish((event,))
+
+    def _drain_inbox(self) -> None:
+        with self._inbox_lock:
+            events = list(self._inbox)
+            self._inbox.clear()
+            self._drain_scheduled = False
+        self._fan_out(events)
+
+    def _fan_out(self, events: Iterable[Dict[str, Any]]) -> None:
+        for event in events:
+            self.published += 1
+            subscribers = self._by_device.get(event.get("device_id"))
+            if not subscribers:
+                continue
+            message = json.dumps(jsonable_encoder(event))
+            for subscription in subscribers:
+                subscription.offer(message)
+            self.fanned_out += len(subscribers)
+
+    def close(self) -> None:
+        """End every subscription's stream (on shutdown)."""
+        for subscription in self._subscriptions:
+            subscription.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return subscriber and delivery counters."""
+        return {
+            "subscribers": len(self._subscriptions),
+            "devices": len(self._by_device),
+            "dropped": sum(subscription.dropped for subscription in self._subscriptions),
+            "published": self.published,
+            "fanned_out": self.fanned_out,
+        }
+
+# Global event broker
+event_broker = EventBroker(
+    max_subscribers=settings.STREAM_MAX_SUBSCRIBERS,
+    queue_size=settings.STREAM_QUEUE_SIZE
+)
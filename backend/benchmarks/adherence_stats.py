@@ -0,0 +1,104 @@
+"""
+Adherence stats benchmark
+
+Compares the legacy per-medication adherence stats computation with the
+single grouped query in app.services.adherence at 10k/100k/1M log rows.
+
+Usage (from the backend directory):
+    python -m benchmarks.adherence_stats [--rows 10000 100000 1000000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import User, Medication, AdherenceLog, DosageUnit, MedicationFrequency
+from app.services.adherence import compute_adherence_stats
+
+MEDICATIONS_PER_USER = 5
+
+def legacy_stats(db, user_id):
+    """Original N+1 implementation, kept here for comparison."""
+    total_doses = 0
+    taken_doses = 0
+    medication_rates = {}
+    for medication in db.query(Medication).filter(Medication.user_id == user_id).all():
+        logs = db.query(AdherenceLog).filter(
+            AdherenceLog.medication_id == medication.id
+        ).all()
+        if logs:
+            med_taken = sum(1 for log in logs if log.taken)
+            total_doses += len(logs)
+            taken_doses += med_taken
+            medication_rates[medication.name] = med_taken / len(logs)
+    overall_rate = taken_doses / total_doses if total_doses > 0 else 0.0
+    return {
+        "overall_rate": overall_rate,
+        "total_doses": total_doses,
+        "taken_doses": taken_doses,
+        "medication_rates": medication_rates
+    }
+
+def build_database(rows: int):
+    """Create an in-memory SQLite database seeded with `rows` adherence logs."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+
+    db.add(User(id=1, email="bench@example.com", username="bench", hashed_password="x"))
+    for i in range(MEDICATIONS_PER_USER):
+        db.add(Medication(
+            id=f"med-{i}", name=f"Medication {i}", dosage=1.0,
+            unit=DosageUnit.PUFF, current_quantity=200, refill_threshold=20,
+            frequency=MedicationFrequency.DAILY, scheduled_times=[],
+            weekdays=[True] * 7, refill_amount=200, color=0, user_id=1
+        ))
+    db.commit()
+
+    start = datetime(2020, 1, 1)
+    batch = []
+    for n in range(rows):
+        batch.append({
+            "medication_id": f"med-{n % MEDICATIONS_PER_USER}",
+            "timestamp": start + timedelta(minutes=n),
+            "taken": random.random() < 0.8,
+            "scheduled_time": "08:00",
+        })
+        if len(batch) == 50000:
+            db.execute(insert(AdherenceLog), batch)
+            batch = []
+    if batch:
+        db.execute(insert(AdherenceLog), batch)
+    db.commit()
+    return db
+
+def time_call(fn, repeat: int = 3) -> float:
+    """Return the best wall-clock time of `repeat` calls in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Adherence stats benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy (ms)':>14} {'grouped (ms)':>14}")
+    for rows in args.rows:
+        db = build_database(rows)
+        assert legacy_stats(db, 1)["total_doses"] == compute_adherence_stats(db, 1)["total_doses"]
+        legacy_ms = time_call(lambda: legacy_stats(db, 1))
+        grouped_ms = time_call(lambda: compute_adherence_stats(db, 1))
+        print(f"{rows:>10} {legacy_ms:>14.1f} {grouped_ms:>14.1f}")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Authentication overhead benchmark
+
+Measures the per-request cost of get_current_user by timing GET
+/api/auth/me with the user cache disabled (one database lookup per
+request) and enabled, against the unauthenticated root endpoint.
+
+Usage (from the backend directory):
+    python -m benchmarks.auth_overhead [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, get_db
+from app.main import app
+from app.models import User
+from app.services.auth import create_access_token, user_cache
+
+def build_database(path: str) -> None:
+    """Create a SQLite database file with one active user."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="bench@example.com", username="bench", hashed_password="x", is_active=True))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+async def time_requests(client: httpx.AsyncClient, path: str, headers: dict, requests: int) -> float:
+    """Return the mean latency of `requests` sequential GETs in milliseconds."""
+    await client.get(path, headers=headers)  # Warm up
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / requests * 1000
+
+async def run(path: str, requests: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def bench_db():
+        async with Session() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = bench_db
+    headers = {"Authorization": f"Bearer {create_access_token(subject=1)}"}
+    maxsize = user_cache.maxsize
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        baseline = await time_requests(client, "/", {}, requests)
+
+        user_cache.maxsize = 0
+        user_cache.clear()
+        uncached = await time_requests(client, "/api/auth/me", headers, requests)
+
+        user_cache.maxsize = maxsize
+        user_cache.clear()
+        cached = await time_requests(client, "/api/auth/me", headers, requests)
+        stats = user_cache.stats()
+
+    await engine.dispose()
+
+    print(f"{'endpoint':>24} {'mean (ms)':>10} {'auth overhead (ms)':>20}")
+    print(f"{'/ (no auth)':>24} {baseline:>10.3f} {'-':>20}")
+    print(f"{'/api/auth/me (no cache)':>24} {uncached:>10.3f} {uncached - baseline:>20.3f}")
+    print(f"{'/api/auth/me (cached)':>24} {cached:>10.3f} {cached - baseline:>20.3f}")
+    print(f"cache hits={stats['hits']} misses={stats['misses']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Authentication overhead benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    build_database(path)
+    asyncio.run(run(path, args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Concurrent request benchmark
+
+Compares request throughput of the legacy pattern (async routes calling a
+synchronous Session, which blocks the event loop) with the asyncio
+session now behind app.db.database.get_db. While the load runs, a probe
+requests the root endpoint on a fixed interval; its lag (completion time
+past the scheduled start) shows how long the event loop was blocked.
+
+Usage (from the backend directory):
+    python -m benchmarks.concurrent_requests [--rows 100000] [--requests 200] [--concurrency 1 10 50]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, get_db
+from app.main import app as async_app
+from app.models import User, Medication, AdherenceLog, DosageUnit, MedicationFrequency
+from app.routers.auth import get_current_user
+from app.services.adherence import compute_adherence_stats
+
+STATS_PATH = "/api/medications/adherence/stats"
+WINDOW_START = datetime(2020, 1, 2)
+PROBE_INTERVAL_SECONDS = 0.01
+
+def build_database(path: str, rows: int) -> None:
+    """Create a SQLite database file with one user and `rows` adherence logs."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="bench@example.com", username="bench", hashed_password="x"))
+    db.add(Medication(
+        id="med-0", name="Medication 0", dosage=1.0,
+        unit=DosageUnit.PUFF, current_quantity=200, refill_threshold=20,
+        frequency=MedicationFrequency.DAILY, scheduled_times=[],
+        weekdays=[True] * 7, refill_amount=200, color=0, user_id=1
+    ))
+    db.commit()
+    start = datetime(2020, 1, 1)
+    db.execute(insert(AdherenceLog), [
+        {"medication_id": "med-0", "timestamp": start + timedelta(minutes=n), "taken": n % 5 != 0}
+        for n in range(rows)
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+def legacy_app(path: str) -> FastAPI:
+    """Build an app serving the stats route the old way: sync Session in an async route."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"status": "online"}
+
+    @app.get(STATS_PATH)
+    async def stats(from_date: datetime):
+        db = Session()
+        try:
+            return compute_adherence_stats(db, user_id=1, from_date=from_date)
+        finally:
+            db.close()
+
+    return app
+
+def ported_app(path: str) -> FastAPI:
+    """Point the real application at the benchmark database via its asyncio session."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def bench_db():
+        async with Session() as db:
+            yield db
+
+    async def bench_user(db=Depends(get_db)):
+        return await db.get(User, 1)
+
+    async_app.dependency_overrides[get_db] = bench_db
+    async_app.dependency_overrides[get_current_user] = bench_user
+    return async_app
+
+async def run_load(app: FastAPI, requests: int, concurrency: int):
+    """
+    Issue `requests` stats requests with `concurrency` in flight.
+
+    Returns:
+        Tuple of (requests per second, probe lags in milliseconds)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    probe_lags = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def one_request():
+            async with semaphore:
+                response = await client.get(STATS_PATH, params={"from_date": WINDOW_START.isoformat()})
+                response.raise_for_status()
+
+        async def probe():
+            while not done.is_set():
+                scheduled = time.perf_counter() + PROBE_INTERVAL_SECONDS
+                await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+                await client.get("/")
+                probe_lags.append((time.perf_counter() - scheduled) * 1000)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return requests / elapsed, probe_lags
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent request benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    build_database(path, args.rows)
+    apps = {"sync session": legacy_app(path), "async session": ported_app(path)}
+
+    print(f"{'session':>14} {'concurrency':>12} {'req/s':>10} {'lag p50 (ms)':>14} {'lag max (ms)':>14}")
+    for concurrency in args.concurrency:
+        for name, app in apps.items():
+            throughput, lags = asyncio.run(run_load(app, args.requests, concurrency))
+            print(
+                f"{name:>14} {concurrency:>12} {throughput:>10.1f} "
+                f"{statistics.median(lags) if lags else 0.0:>14.1f} "
+                f"{max(lags, default=0.0):>14.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
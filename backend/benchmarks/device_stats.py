@@ -0,0 +1,80 @@
+"""
+Device stats benchmark
+
+Compares the legacy in-Python device statistics loop with
+app.services.device_stats (hourly rollups) as a device accumulates events.
+
+Usage (from the backend directory):
+    python -m benchmarks.device_stats [--rows 10000 100000 500000]
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import Device, DeviceUsageEvent
+from app.services.device_stats import compute_device_usage
+from app.services.rollups import compact_rollups
+
+from .adherence_stats import time_call
+
+def legacy_stats(db, device_id):
+    """Original implementation: load every event and loop in Python."""
+    events = db.query(DeviceUsageEvent).filter(DeviceUsageEvent.device_id == device_id).all()
+    total_uses = len(events)
+    avg_technique = sum(e.technique_score or 0 for e in events) / total_uses
+    avg_dose = sum(e.dose_delivered or 0 for e in events) / total_uses
+    by_hour = {}
+    by_day = {}
+    for event in events:
+        by_hour[event.timestamp.hour] = by_hour.get(event.timestamp.hour, 0) + 1
+    for event in events:
+        by_day[event.timestamp.weekday()] = by_day.get(event.timestamp.weekday(), 0) + 1
+    return total_uses, avg_technique, avg_dose, by_hour, by_day
+
+def build_database(rows: int):
+    """Create an in-memory SQLite database with `rows` events for one device."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Device(id="bench-device", name="Bench", model="Bench"))
+    db.commit()
+
+    start = datetime(2020, 1, 1)
+    batch = []
+    for n in range(rows):
+        score = random.uniform(0.2, 0.95)
+        batch.append({
+            "device_id": "bench-device",
+            "timestamp": start + timedelta(minutes=7 * n),
+            "technique_score": score,
+            "dose_delivered": score,
+            "flow_rate": random.uniform(10, 60),
+        })
+        if len(batch) == 50000:
+            db.execute(insert(DeviceUsageEvent), batch)
+            batch = []
+    if batch:
+        db.execute(insert(DeviceUsageEvent), batch)
+    db.commit()
+    compact_rollups(db, start, start + timedelta(minutes=7 * rows))
+    return db
+
+def main():
+    parser = argparse.ArgumentParser(description="Device stats benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy (ms)':>14} {'rollups (ms)':>14}")
+    for rows in args.rows:
+        db = build_database(rows)
+        legacy_ms = time_call(lambda: legacy_stats(db, "bench-device"))
+        rollup_ms = time_call(lambda: compute_device_usage(db, "bench-device"))
+        print(f"{rows:>10} {legacy_ms:>14.1f} {rollup_ms:>14.1f}")
+        db.close()
+
+if __name__ == "__main__":
+    main()
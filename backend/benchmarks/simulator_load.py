@@ -0,0 +1,71 @@
+"""
+Simulator load benchmark
+
+Runs the shared simulator scheduler with thousands of virtual devices
+against a SQLite database file and reports how long each tick (one bulk
+UPDATE, one bulk INSERT and one commit for every due device) takes, and
+how far the scheduler fell behind the configured interval.
+
+Usage (from the backend directory):
+    python -m benchmarks.simulator_load [--devices 10000] [--interval 1] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.db.pool import configure_engine
+from app.models import User, DeviceUsageEvent
+from app.services.simulator import InhalerSimulator
+
+def build_database(path: str):
+    """Create a SQLite database file with one user and return a session factory."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    configure_engine(engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="bench@example.com", username="bench", hashed_password="x"))
+        db.commit()
+    return engine, Session
+
+async def run(Session, devices: int, interval: float, seconds: float) -> None:
+    simulator = InhalerSimulator(Session)
+    device_ids = [f"sim-{n:06d}" for n in range(devices)]
+
+    started = time.perf_counter()
+    await simulator.start_simulations(device_ids, interval_seconds=interval, user_id=1)
+    startup = time.perf_counter() - started
+
+    await asyncio.sleep(seconds)
+    await simulator.shutdown()
+    stats = simulator.stats()
+    with Session() as db:
+        stored = db.scalar(select(func.count()).select_from(DeviceUsageEvent))
+
+    expected = devices * seconds / interval
+    print(f"devices={devices} interval={interval}s duration={seconds}s startup={startup * 1000:.0f} ms")
+    print(f"ticks={stats['ticks']} device updates={stats['device_updates']} (expected ~{expected:.0f})")
+    print(f"events generated={stats['events_generated']} stored={stored}")
+    print(f"tick duration last={stats['last_tick_ms']:.1f} ms max={stats['max_tick_ms']:.1f} ms")
+    print(f"updates/s={stats['device_updates'] / seconds:.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator load benchmark")
+    parser.add_argument("--devices", type=int, default=10_000)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine, Session = build_database(path)
+    asyncio.run(run(Session, args.devices, args.interval, args.seconds))
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
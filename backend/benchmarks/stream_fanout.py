@@ -0,0 +1,97 @@
+"""
+Event stream fan-out benchmark
+
+Subscribes thousands of in-process consumers to the event broker behind
+the SSE/WebSocket endpoints and publishes simulated events from another
+thread, as the simulator does. Reports the publish-to-delivery latency
+seen by prompt consumers, how many events slow consumers dropped, and
+how many frames the coalescing saved.
+
+Usage (from the backend directory):
+    python -m benchmarks.stream_fanout [--subscribers 5000] [--devices 100] [--events 20000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.services.streaming import EventBroker
+
+async def consume(subscription, latencies, slow: bool) -> int:
+    """Drain frames until the broker closes; returns the number of frames received."""
+    frames = 0
+    while True:
+        frame = await subscription.next_frame()
+        if frame is None:
+            return frames
+        frames += 1
+        received = time.perf_counter()
+        if not slow:
+            # Events carry their publish time in "sent"
+            start = frame.find('"sent": ') + 8
+            latencies.append((received - float(frame[start:frame.find(",", start)])) * 1000)
+        else:
+            await asyncio.sleep(0.05)
+
+def publisher(broker: EventBroker, devices: int, events: int, rate: float) -> None:
+    """Publish `events` events at roughly `rate` per second in bursts of 100."""
+    interval = 100 / rate
+    for first in range(0, events, 100):
+        now = time.perf_counter()
+        broker.publish([
+            {"device_id": f"dev-{random.randrange(devices)}", "sent": now, "technique_score": 0.8}
+            for _ in range(min(100, events - first))
+        ])
+        time.sleep(interval)
+
+async def run(
+    subscribers: int, devices: int, events: int, rate: float, slow_fraction: float, queue_size: int
+) -> None:
+    broker = EventBroker(max_subscribers=subscribers, queue_size=queue_size)
+    broker.bind(asyncio.get_running_loop())
+    latencies = []
+    slow_flags = [n < subscribers * slow_fraction for n in range(subscribers)]
+    subscriptions = [
+        broker.subscribe([f"dev-{n % devices}", f"dev-{(n * 7 + 3) % devices}"])
+        for n in range(subscribers)
+    ]
+    consumers = [
+        asyncio.create_task(consume(subscription, latencies, slow))
+        for subscription, slow in zip(subscriptions, slow_flags)
+    ]
+
+    started = time.perf_counter()
+    await asyncio.to_thread(publisher, broker, devices, events, rate)
+    await asyncio.sleep(0.5)
+    elapsed = time.perf_counter() - started
+    broker.close()
+    frames = await asyncio.gather(*consumers)
+
+    stats = broker.stats()
+    delivered = sum(subscription.delivered for subscription in subscriptions)
+    slow_dropped = sum(s.dropped for s, slow in zip(subscriptions, slow_flags) if slow)
+    print(f"subscribers={subscribers} devices={devices} events={events} in {elapsed:.1f}s")
+    print(f"fanned out={stats['fanned_out']} delivered={delivered} frames={sum(frames)} "
+          f"(events per frame {delivered / max(sum(frames), 1):.1f})")
+    print(f"dropped: slow consumers={slow_dropped} prompt consumers={stats['dropped'] - slow_dropped}")
+    if latencies:
+        latencies.sort()
+        print(f"latency p50={statistics.median(latencies):.1f} ms "
+              f"p99={latencies[int(len(latencies) * 0.99)]:.1f} ms max={latencies[-1]:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Event stream fan-out benchmark")
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=5000, help="Events published per second")
+    parser.add_argument("--slow-fraction", type=float, default=0.1, help="Share of slow consumers")
+    parser.add_argument("--queue-size", type=int, default=16, help="Queued events per subscriber")
+    args = parser.parse_args()
+    asyncio.run(run(
+        args.subscribers, args.devices, args.events, args.rate, args.slow_fraction, args.queue_size
+    ))
+
+if __name__ == "__main__":
+    main()
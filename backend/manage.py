@@ -0,0 +1,313 @@
+"""
+Management commands for AetherBloom API
+
+This script provides maintenance commands that operate directly on the
+configured database, outside of the request cycle.
+
+Usage:
+    python manage.py rebuild-counters [--medication-id ID]
+    python manage.py check-query-plans [--database-url URL]
+    python manage.py compact-rollups [--from DATE] [--to DATE] [--device-id ID]
+    python manage.py prune-revoked-tokens
+    python manage.py simulate --devices N [--interval S] [--user-id ID]
+    python manage.py backfill-events --devices N --from DATE --to DATE [--events-per-day N] [--seed N]
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from app.db.database import SessionLocal
+
+def rebuild_counters(args):
+    """Rebuild the denormalized adherence counters from the raw logs."""
+    from app.services.adherence import rebuild_adherence_counters
+
+    db = SessionLocal()
+    try:
+        updated = rebuild_adherence_counters(db, medication_id=args.medication_id)
+    finally:
+        db.close()
+    print(f"Rebuilt adherence counters for {updated} medication(s)")
+
+def check_query_plans(args):
+    """Verify that the hot router queries are served by their indexes."""
+    from sqlalchemy import create_engine
+    from app.db.database import engine
+    from app.db.query_plans import check_query_plans as run_checks
+
+    target = create_engine(args.database_url) if args.database_url else engine
+    results = run_checks(target)
+    for result in results:
+        status = "ok" if result.uses_index else "FAIL"
+        print(f"[{status}] {result.name} (expects {result.expected_index})")
+        if not result.uses_index or args.verbose:
+            for line in result.plan.splitlines():
+                print(f"    {line}")
+    if not all(result.uses_index for result in results):
+        sys.exit(1)
+
+def compact_rollups(args):
+    """Recompute device usage rollups from the raw events."""
+    from sqlalchemy import func
+    from app.models.device import DeviceUsageEvent
+    from app.services.rollups import compact_rollups as run_compaction
+
+    db = SessionLocal()
+    try:
+        from_date, to_date = args.from_date, args.to_date
+        if from_date is None or to_date is None:
+            first, last = db.query(
+                func.min(DeviceUsageEvent.timestamp), func.max(DeviceUsageEvent.timestamp)
+            ).one()
+            if first is None:
+                print("No device usage events to roll up")
+                return
+            from_date = from_date or first
+            to_date = to_date or last
+        written = run_compaction(db, from_date, to_date, device_id=args.device_id)
+    finally:
+        db.close()
+    print(f"Wrote {written} rollup bucket(s) for {from_date:%Y-%m-%d} to {to_date:%Y-%m-%d}")
+
+def prune_revoked_tokens(args):
+    """Delete deny list entries for tokens that have expired."""
+    from app.services.revocation import prune_revoked_tokens as run_prune
+
+    db = SessionLocal()
+    try:
+        deleted = run_prune(db)
+    finally:
+        db.close()
+    print(f"Pruned {deleted} expired revoked token(s)")
+
+def simulate(args):
+    """Run simulated devices in this process until interrupted."""
+    import asyncio
+    from app.core.config import settings
+    from app.services.simulator import InhalerSimulator, load_profile_plugins
+
+    load_profile_plugins(settings.SIMULATOR_PROFILES)
+    profile_options = {"miss_rate": args.miss_rate} if args.miss_rate is not None else {}
+
+    async def run():
+        simulator = InhalerSimulator(SessionLocal)
+        device_ids = [f"{args.prefix}{n:06d}" for n in range(args.devices)]
+        await simulator.start_simulations(
+            device_ids,
+            medication_id=args.medication_id,
+            interval_seconds=args.interval,
+            profile_name=args.profile,
+            user_id=args.user_id,
+            profile_options=profile_options
+        )
+        print(f"Simulating {len(device_ids)} device(s) every {args.interval}s; press Ctrl+C to stop")
+        try:
+            while True:
+                await asyncio.sleep(args.report_seconds)
+                stats = simulator.stats()
+                print(
+                    f"ticks={stats['ticks']} updates={stats['device_updates']} "
+                    f"events={stats['events_generated']} adherence logs={stats['adherence_logs']} last tick={stats['last_tick_ms']:.1f} ms"
+                )
+        finally:
+            await simulator.shutdown()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except ValueError as e:
+        sys.exit(str(e))
+
+def backfill_events(args):
+    """Generate historical usage events for simulated devices."""
+    import time
+    from app.core.config import settings
+    from app.services.backfill import backfill_device_events, day_range
+    from app.services.simulator import PROFILES, load_profile_plugins
+
+    load_profile_plugins(settings.SIMULATOR_PROFILES)
+    if args.profile not in PROFILES:
+        sys.exit(f"Unknown profile {args.profile!r} (choose from {', '.join(PROFILES)})")
+    if not PROFILES[args.profile].supports_usage_batch():
+        usable = [name for name, profile_class in PROFILES.items() if profile_class.supports_usage_batch()]
+        sys.exit(f"Profile {args.profile!r} cannot generate events in bulk (it does not implement "
+                 f"generate_usage_batch); choose from {', '.join(usable)}")
+    start, end = day_range(args.from_date, args.to_date)
+    device_ids = [f"{args.prefix}{n:06d}" for n in range(args.devices)]
+    count = round(args.devices * (end - start).days * args.events_per_day)
+    started = time.perf_counter()
+
+    def report(inserted):
+        elapsed = time.perf_counter() - started
+        print(f"\r{inserted}/{count} events ({inserted / elapsed:,.0f}/s)", end="", flush=True)
+
+    db = SessionLocal()
+    try:
+        inserted = backfill_device_events(
+            db, device_ids, start, end, count,
+            seed=args.seed,
+            profile_class=PROFILES[args.profile],
+            medication_id=args.medication_id,
+            user_id=args.user_id,
+            chunk_size=args.chunk_size,
+            progress=report
+        )
+    finally:
+        db.close()
+    print(f"\nInserted {inserted} event(s) for {len(device_ids)} device(s) "
+          f"in {time.perf_counter() - started:.1f}s (rollups included)")
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description="AetherBloom management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild-counters",
+        help="Rebuild medication adherence counters from adherence logs"
+    )
+    rebuild_parser.add_argument(
+        "--medication-id",
+        type=str,
+        default=None,
+        help="Only repair this medication (default: all medications)"
+    )
+    rebuild_parser.set_defaults(func=rebuild_counters)
+
+    plans_parser = subparsers.add_parser(
+        "check-query-plans",
+        help="Check that hot queries use index scans (SQLite and PostgreSQL)"
+    )
+    plans_parser.add_argument(
+        "--database-url",
+        type=str,
+        default=None,
+        help="Migrated database to check (default: DATABASE_URL)"
+    )
+    plans_parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print the plan of every query, not just failing ones"
+    )
+    plans_parser.set_defaults(func=check_query_plans)
+
+    rollups_parser = subparsers.add_parser(
+        "compact-rollups",
+        help="Recompute hourly/daily device usage rollups for a time range"
+    )
+    rollups_parser.add_argument(
+        "--from",
+        dest="from_date",
+        type=datetime.fromisoformat,
+        default=None,
+        help="Start of the range, ISO format (default: first event)"
+    )
+    rollups_parser.add_argument(
+        "--to",
+        dest="to_date",
+        type=datetime.fromisoformat,
+        default=None,
+        help="End of the range, ISO format (default: last event)"
+    )
+    rollups_parser.add_argument(
+        "--device-id",
+        type=str,
+        default=None,
+        help="Only recompute this device (default: all devices)"
+    )
+    rollups_parser.set_defaults(func=compact_rollups)
+
+    prune_parser = subparsers.add_parser(
+        "prune-revoked-tokens",
+        help="Delete revoked token entries whose tokens have expired"
+    )
+    prune_parser.set_defaults(func=prune_revoked_tokens)
+
+    simulate_parser = subparsers.add_parser(
+        "simulate",
+        help="Run simulated inhalers in a dedicated process (for load testing)"
+    )
+    simulate_parser.add_argument("--devices", type=int, default=100, help="Number of devices to simulate")
+    simulate_parser.add_argument(
+        "--interval",
+        type=float,
+        default=10.0,
+        help="Seconds between updates from each device"
+    )
+    simulate_parser.add_argument("--user-id", type=int, default=None, help="Owner of newly created devices")
+    simulate_parser.add_argument(
+        "--medication-id",
+        type=str,
+        default=None,
+        help="Medication for generated events (regular/random profiles follow its schedule)"
+    )
+    simulate_parser.add_argument(
+        "--profile",
+        type=str,
+        default="default",
+        help="Simulation profile (default, poor_technique, regular, random or a plugin)"
+    )
+    simulate_parser.add_argument(
+        "--miss-rate",
+        type=float,
+        default=None,
+        help="Fraction of scheduled doses missed (regular/random profiles; needs --medication-id)"
+    )
+    simulate_parser.add_argument("--prefix", type=str, default="sim-", help="Device ID prefix")
+    simulate_parser.add_argument(
+        "--report-seconds",
+        type=float,
+        default=10.0,
+        help="Seconds between progress reports"
+    )
+    simulate_parser.set_defaults(func=simulate)
+
+    backfill_parser = subparsers.add_parser(
+        "backfill-events",
+        help="Generate seeded historical usage events for simulated devices"
+    )
+    backfill_parser.add_argument("--devices", type=int, required=True, help="Number of devices")
+    backfill_parser.add_argument(
+        "--from",
+        dest="from_date",
+        type=datetime.fromisoformat,
+        required=True,
+        help="Start of the history, ISO format"
+    )
+    backfill_parser.add_argument(
+        "--to",
+        dest="to_date",
+        type=datetime.fromisoformat,
+        required=True,
+        help="End of the history, ISO format"
+    )
+    backfill_parser.add_argument(
+        "--events-per-day",
+        type=float,
+        default=3.0,
+        help="Average events per device per day"
+    )
+    backfill_parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    backfill_parser.add_argument("--user-id", type=int, default=None, help="Owner of newly created devices")
+    backfill_parser.add_argument("--medication-id", type=str, default=None, help="Medication for generated events")
+    backfill_parser.add_argument(
+        "--profile",
+        type=str,
+        default="default",
+        help="Simulation profile (default, poor_technique)"
+    )
+    backfill_parser.add_argument("--prefix", type=str, default="sim-", help="Device ID prefix")
+    backfill_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=50_000,
+        help="Events per transaction"
+    )
+    backfill_parser.set_defaults(func=backfill_events)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,9 @@ if not exist "venv" (
     call venv\Scripts\activate.bat
 )
 
+REM Apply database migrations
+alembic upgrade head
+
 REM Start the server with reload for development
 python server.py --reload
 
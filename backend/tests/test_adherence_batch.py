@@ -0,0 +1,69 @@
+"""
+Tests for the adherence batch endpoint
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, get_db
+from app.models import AdherenceLog, DosageUnit, Medication, MedicationFrequency, User, UserRole
+from app.routers import adherence, auth
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "test.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(id=1, email="patient@example.com", username="patient",
+                    hashed_password="x", role=UserRole.PATIENT))
+        db.add(Medication(
+            id="m1", name="Inhaler", dosage=1, unit=DosageUnit.PUFF, current_quantity=10,
+            refill_threshold=2, frequency=MedicationFrequency.DAILY,
+            scheduled_times=[{"hour": 8, "minute": 0}], weekdays=[True] * 7,
+            refill_amount=10, color=0, user_id=1,
+        ))
+        db.commit()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_db():
+        async with AsyncSession() as session:
+            yield session
+
+    async def override_user(db=Depends(get_db)):
+        return await db.get(User, 1)
+
+    app = FastAPI()
+    app.include_router(adherence.router, prefix="/api/adherence")
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[auth.get_current_user] = override_user
+    with TestClient(app) as test_client:
+        yield test_client, sessionmaker(bind=engine)
+    engine.dispose()
+
+def test_batch_mixing_naive_and_aware_timestamps(client):
+    test_client, Session = client
+    response = test_client.post("/api/adherence/batch", json=[
+        {"medication_id": "m1", "timestamp": "2026-10-01T08:00:00", "taken": True},
+        {"medication_id": "m1", "timestamp": "2026-10-01T09:00:00Z", "taken": True},
+        {"medication_id": "m1", "timestamp": "2026-10-01T12:30:00+02:00", "taken": True},
+    ])
+    assert response.status_code == 201, response.text
+    assert response.json()["inserted"] == 3
+
+    with Session() as db:
+        timestamps = sorted(db.scalars(select(AdherenceLog.timestamp)))
+        medication = db.get(Medication, "m1")
+        # Stored as naive UTC, like every other writer
+        assert timestamps == [
+            datetime(2026, 10, 1, 8, 0), datetime(2026, 10, 1, 9, 0), datetime(2026, 10, 1, 10, 30),
+        ]
+        assert medication.last_taken_at == datetime(2026, 10, 1, 10, 30)
+        assert medication.taken_logs == 3
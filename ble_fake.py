@@ -0,0 +1,176 @@
+"""
+Fake BLE transport for radio-free runs
+
+FakeBleakClient implements the part of bleak's BleakClient that the BLE
+scripts and ble_gateway.py use (connect/disconnect, start_notify,
+write_gatt_char, services, "async with"). Each client is backed by a
+FakeDevice on a FakeRadio, which emits "PUFF,<n>\\r\\n" lines split into
+random notification-sized chunks, can refuse a number of connection
+attempts and can drop the link periodically, so reconnect and framing
+logic can be exercised without hardware.
+
+Usage:
+    radio = FakeRadio(seed=1)
+    radio.add("FA:KE:00:00:00:01", puff_interval=0.5, drop_every=30)
+    client = radio.client("FA:KE:00:00:00:01", disconnected_callback=on_disconnect)
+"""
+import asyncio
+import random
+from collections import namedtuple
+
+UART_SERVICE_UUID = "0000ffe0-0000-1000-8000-00805f9b34fb"
+UART_CHAR_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
+
+FakeService = namedtuple("FakeService", "uuid characteristics")
+FakeCharacteristic = namedtuple("FakeCharacteristic", "uuid properties descriptors handle")
+
+class FakeBleakError(Exception):
+    """Raised where bleak would raise BleakError."""
+
+class FakeDevice:
+    """Simulated BT05-equipped inhaler."""
+
+    def __init__(self, address, puff_interval=1.0, start_count=200, max_chunk=20,
+                 connect_failures=0, drop_every=None, rng=None):
+        """
+        Parameters:
+        - address (str): MAC address the device answers to
+        - puff_interval (float): Average seconds between puffs
+        - start_count (int): First counter value (counts down)
+        - max_chunk (int): Largest notification payload in bytes
+        - connect_failures (int): Connection attempts to refuse first
+        - drop_every (float): Drop the link after this many connected seconds
+        - rng (random.Random): Source of randomness
+        """
+        self.address = address
+        self.puff_interval = puff_interval
+        self.count = start_count
+        self.max_chunk = max_chunk
+        self.connect_failures = connect_failures
+        self.drop_every = drop_every
+        self.rng = rng or random.Random()
+        self.services = [FakeService(UART_SERVICE_UUID, [
+            FakeCharacteristic(UART_CHAR_UUID, ["read", "write-without-response", "write", "notify"], [], 13),
+        ])]
+        self.written = []
+        self.connects = 0
+        self.puffs = 0
+
+class FakeRadio:
+    """Registry of fake devices; radio.client is a drop-in for BleakClient."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.devices = {}
+
+    def add(self, address, **options):
+        """Add a device (options as for FakeDevice) and return it."""
+        options.setdefault("rng", random.Random(self.rng.random()))
+        device = FakeDevice(address, **options)
+        self.devices[address] = device
+        return device
+
+    def client(self, address, disconnected_callback=None, **kwargs):
+        """Create a client for an address, like BleakClient(address, ...)."""
+        return FakeBleakClient(self, address, disconnected_callback=disconnected_callback, **kwargs)
+
+class FakeBleakClient:
+    """bleak.BleakClient look-alike talking to a FakeRadio."""
+
+    def __init__(self, radio, address, disconnected_callback=None, timeout=10.0, **kwargs):
+        self.radio = radio
+        self.address = address
+        self.timeout = timeout
+        self._disconnected_callback = disconnected_callback
+        self._device = None
+        self._tasks = []
+        self.is_connected = False
+
+    @property
+    def services(self):
+        if not self.is_connected:
+            raise FakeBleakError("Service discovery has not been performed yet")
+        return self._device.services
+
+    async def get_services(self):
+        return self.services
+
+    async def connect(self, **kwargs):
+        device = self.radio.devices.get(self.address)
+        await asyncio.sleep(0.01)
+        if device is None:
+            raise FakeBleakError(f"Device with address {self.address} was not found")
+        if device.connect_failures > 0:
+            device.connect_failures -= 1
+            raise FakeBleakError(f"Could not connect to {self.address}")
+        self._device = device
+        self.is_connected = True
+        device.connects += 1
+        if device.drop_every:
+            self._tasks.append(asyncio.create_task(self._drop_later(device.drop_every)))
+        return True
+
+    async def disconnect(self):
+        self._close()
+        return True
+
+    async def start_notify(self, char_specifier, callback, **kwargs):
+        characteristic = self._characteristic(char_specifier)
+        if "notify" not in characteristic.properties:
+            raise FakeBleakError(f"Characteristic {characteristic.uuid} does not support notifications")
+        self._tasks.append(asyncio.create_task(self._stream(characteristic, callback)))
+
+    async def stop_notify(self, char_specifier):
+        self._characteristic(char_specifier)
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def write_gatt_char(self, char_specifier, data, response=None):
+        self._characteristic(char_specifier)
+        self._device.written.append(bytes(data))
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    def _characteristic(self, char_specifier):
+        if not self.is_connected:
+            raise FakeBleakError("Not connected")
+        uuid = getattr(char_specifier, "uuid", char_specifier)
+        for service in self._device.services:
+            for characteristic in service.characteristics:
+                if characteristic.uuid == uuid:
+                    return characteristic
+        raise FakeBleakError(f"Characteristic {uuid} was not found")
+
+    async def _stream(self, characteristic, callback):
+        # Emit each PUFF line as soon as it happens, cut at random points
+        # so lines are split across notifications
+        device = self._device
+        while True:
+            await asyncio.sleep(device.rng.expovariate(1 / device.puff_interval))
+            device.count -= 1
+            device.puffs += 1
+            pending = b"PUFF,%d\r\n" % device.count
+            while pending:
+                size = device.rng.randint(1, device.max_chunk)
+                chunk, pending = pending[:size], pending[size:]
+                callback(characteristic, bytearray(chunk))
+
+    async def _drop_later(self, delay):
+        await asyncio.sleep(delay)
+        self._close()
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+
+    def _close(self):
+        self.is_connected = False
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+        self._tasks = []
@@ -0,0 +1,428 @@
+"""
+BLE gateway daemon
+
+Connects to a fleet of BT05-equipped inhalers from one process. Every
+device gets its own connection loop on a shared asyncio event loop, with
+exponential backoff (plus jitter) between reconnect attempts. Notifications
+are reassembled into lines by bt05_protocol.FrameParser, and every PUFF
+line becomes a usage event that is forwarded to the backend's
+POST /api/devices/events/batch in batches (when batch_size events are
+waiting or every flush_seconds). Events wait in a bounded buffer while the
+backend is unreachable.
+
+Configuration (JSON):
+    {
+        "backend": {"url": "http://localhost:8000", "username": "...", "password": "..."},
+        "devices": [
+            {"address": "98:7B:F3:6E:92:43", "device_id": "inhaler-1", "medication_id": null}
+        ],
+        "batch_size": 200,
+        "flush_seconds": 2.0
+    }
+"backend" may give a "token" instead of a username and password. Device
+entries may set "notify_uuid" (default: the BT05's ffe1 characteristic).
+Device profiles are cached (ble_profiles.ProfileCache), so reconnects
+subscribe without walking the GATT services.
+
+Usage:
+    python ble_gateway.py --config gateway.json
+    python ble_gateway.py --fake 20 --dry-run    # simulated devices, print batches
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from datetime import datetime
+
+from ble_profiles import DEFAULT_PATH as DEFAULT_PROFILES_PATH, ProfileCache, subscribe
+from bt05_protocol import FrameParser, PuffEvent
+
+DEFAULT_NOTIFY_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
+BATCH_PATH = "/api/devices/events/batch"
+LOGIN_PATH = "/api/auth/login"
+MAX_BATCH = 5000  # The backend's DEVICE_EVENT_BATCH_MAX_SIZE
+
+logger = logging.getLogger("ble_gateway")
+
+class DeviceConfig:
+    """One inhaler the gateway should stay connected to."""
+
+    def __init__(self, address, device_id=None, notify_uuid=DEFAULT_NOTIFY_UUID, medication_id=None):
+        self.address = address
+        self.device_id = device_id or address
+        self.notify_uuid = notify_uuid
+        self.medication_id = medication_id
+
+class EventForwarder:
+    """Buffers usage events and posts them to the backend in batches."""
+
+    def __init__(self, url, token=None, username=None, password=None, batch_size=200,
+                 flush_seconds=2.0, max_pending=100000, max_backoff=60.0, dry_run=False):
+        """
+        Parameters:
+        - url (str): Backend base URL
+        - token (str): Access token (or give username and password)
+        - username, password (str): Credentials for /api/auth/login
+        - batch_size (int): Post as soon as this many events are waiting
+        - flush_seconds (float): Post waiting events at least this often
+        - max_pending (int): Events buffered before the oldest are dropped
+        - max_backoff (float): Longest wait between failed posts (seconds)
+        - dry_run (bool): Log batches instead of posting them
+        """
+        self.url = url.rstrip("/")
+        self.token = token
+        self.username = username
+        self.password = password
+        self.batch_size = min(batch_size, MAX_BATCH)
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.dry_run = dry_run
+        self._pending = deque()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+
+        # Counters
+        self.submitted = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+
+    def submit(self, event):
+        """Queue one event (never blocks; drops the oldest when full)."""
+        self._pending.append(event)
+        self.submitted += 1
+        if len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        if len(self._pending) >= self.batch_size:
+            self._ready.set()
+
+    async def run(self):
+        """Post batches until close() is called, then make a last attempt."""
+        backoff = 1.0
+        while not self._closing.is_set():
+            await _wait_event(self._ready, self.flush_seconds)
+            self._ready.clear()
+            if await self.flush():
+                backoff = 1.0
+            else:
+                # Backend unreachable: keep the events and wait before retrying
+                await _wait_event(self._closing, backoff * random.uniform(0.8, 1.2))
+                backoff = min(backoff * 2, self.max_backoff)
+        if not await self.flush():
+            logger.error("Backend unreachable; %d events were not delivered", len(self._pending))
+
+    async def flush(self):
+        """
+        Post everything waiting, one batch at a time.
+
+        Returns:
+        - bool: False if the backend could not be reached (events are kept)
+        """
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if not await self._send(batch):
+                self._pending.extendleft(reversed(batch))
+                return False
+        return True
+
+    def close(self):
+        """Ask the run loop to post what is still waiting and return."""
+        self._closing.set()
+        self._ready.set()
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "failures": self.failures,
+        }
+
+    async def _send(self, batch):
+        if self.dry_run:
+            logger.info("Batch of %d events: %s ...", len(batch), batch[0])
+            self.batches += 1
+            self.accepted += len(batch)
+            return True
+
+        body = json.dumps(batch).encode()
+        for attempt in range(2):
+            if self.token is None and not await self._login():
+                return False
+            status, result = await asyncio.to_thread(
+                _request, self.url + BATCH_PATH, body, "application/json", self.token
+            )
+            if status == 401 and attempt == 0 and self.username:
+                # Access token expired: log in again and retry once
+                self.token = None
+                continue
+            break
+
+        if status == 200:
+            self.batches += 1
+            self.accepted += result["accepted"]
+            self.rejected += result["rejected"]
+            if result["rejected"]:
+                first = next(r for r in result["results"] if not r["accepted"])
+                logger.warning("Backend rejected %d of %d events (e.g. %s)",
+                               result["rejected"], len(batch), first["error"])
+            return True
+        if status is not None and 400 <= status < 500 and status not in (401, 408, 429):
+            # The batch itself is unacceptable; retrying would not help
+            self.rejected += len(batch)
+            logger.error("Backend refused a batch of %d events (HTTP %d): %s", len(batch), status, result)
+            return True
+        self.failures += 1
+        logger.warning("Could not post events (%s); %d waiting", status or result, len(self._pending) + len(batch))
+        return False
+
+    async def _login(self):
+        if not self.username:
+            logger.error("No backend token or credentials configured")
+            return False
+        form = urllib.parse.urlencode({"username": self.username, "password": self.password}).encode()
+        status, result = await asyncio.to_thread(
+            _request, self.url + LOGIN_PATH, form, "application/x-www-form-urlencoded", None
+        )
+        if status != 200:
+            self.failures += 1
+            logger.warning("Backend login failed (%s)", status or result)
+            return False
+        self.token = result["access_token"]
+        return True
+
+def _request(url, body, content_type, token, timeout=15):
+    # Blocking POST (run in a worker thread); returns (status, parsed JSON or error)
+    headers = {"Content-Type": content_type}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode(errors="replace")
+    except (urllib.error.URLError, OSError) as e:
+        return None, str(e)
+
+class DeviceLink:
+    """Keeps one device connected and turns its notifications into events."""
+
+    def __init__(self, config, forwarder, client_factory, profiles=None, initial_backoff=1.0,
+                 max_backoff=60.0, connect_timeout=20.0):
+        self.config = config
+        self.profiles = profiles
+        self.forwarder = forwarder
+        self.client_factory = client_factory
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self.parser = FrameParser()
+
+        # Status
+        self.connected = False
+        self.connects = 0
+        self.failures = 0
+        self.puffs = 0
+        self.last_count = None
+        self.last_seen = None
+
+    async def run(self, stopping):
+        """Connect, listen and reconnect until the stopping event is set."""
+        backoff = self.initial_backoff
+        while not stopping.is_set():
+            disconnected = asyncio.Event()
+            options = self.profiles.client_options(self.config.address) if self.profiles else {}
+            client = self.client_factory(
+                self.config.address,
+                disconnected_callback=lambda client, event=disconnected: event.set(),
+                **options
+            )
+            try:
+                await asyncio.wait_for(client.connect(), self.connect_timeout)
+                try:
+                    self.parser.reset()
+                    discovered = True
+                    if self.profiles is not None:
+                        _, discovered = await subscribe(
+                            client, self.profiles, self._handle_data, self.config.notify_uuid
+                        )
+                    else:
+                        await client.start_notify(self.config.notify_uuid, self._handle_data)
+                    self.connected = True
+                    self.connects += 1
+                    backoff = self.initial_backoff
+                    logger.info("%s connected%s", self.config.device_id,
+                                "" if discovered else " (cached profile)")
+                    await _wait_any(disconnected, stopping)
+                finally:
+                    self.connected = False
+                    await _disconnect(client)
+                if not stopping.is_set():
+                    logger.warning("%s disconnected", self.config.device_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning("%s: connection failed (%s); retrying in %.0fs",
+                               self.config.device_id, e or type(e).__name__, backoff)
+            if stopping.is_set():
+                break
+            await _wait_event(stopping, backoff * random.uniform(0.8, 1.2))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _handle_data(self, sender, data):
+        for record in self.parser.feed(data):
+            if not isinstance(record, PuffEvent):
+                continue
+            self.puffs += 1
+            self.last_count = record.count
+            self.last_seen = time.time()
+            event = {"device_id": self.config.device_id, "timestamp": datetime.utcnow().isoformat()}
+            if self.config.medication_id:
+                event["medication_id"] = self.config.medication_id
+            self.forwarder.submit(event)
+
+    def status(self):
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "failures": self.failures,
+            "puffs": self.puffs,
+            "last_count": self.last_count,
+        }
+
+async def _wait_event(event, timeout):
+    # Wait for an event for up to timeout seconds; returns whether it is set
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return event.is_set()
+
+async def _wait_any(*events):
+    waiters = [asyncio.create_task(event.wait()) for event in events]
+    try:
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+async def _disconnect(client):
+    try:
+        if client.is_connected:
+            await client.disconnect()
+    except Exception as e:
+        logger.debug("Disconnect failed: %s", e)
+
+class Gateway:
+    """Runs a DeviceLink per configured device plus the event forwarder."""
+
+    def __init__(self, devices, forwarder, client_factory, profiles=None, report_seconds=60.0,
+                 **link_options):
+        self.forwarder = forwarder
+        self.report_seconds = report_seconds
+        self.links = [
+            DeviceLink(device, forwarder, client_factory, profiles=profiles, **link_options)
+            for device in devices
+        ]
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        """Run until stop() is called or the task is cancelled."""
+        forwarding = asyncio.create_task(self.forwarder.run())
+        links = [asyncio.create_task(link.run(self.stopping)) for link in self.links]
+        try:
+            while not await _wait_event(self.stopping, self.report_seconds):
+                self.report()
+        finally:
+            self.stopping.set()
+            await asyncio.gather(*links, return_exceptions=True)
+            self.forwarder.close()
+            await asyncio.gather(forwarding, return_exceptions=True)
+            self.report()
+
+    def stop(self):
+        self.stopping.set()
+
+    def report(self):
+        connected = sum(link.connected for link in self.links)
+        puffs = sum(link.puffs for link in self.links)
+        logger.info("%d/%d devices connected, %d puffs, forwarder %s",
+                    connected, len(self.links), puffs, self.forwarder.stats())
+
+def load_config(path):
+    """Read a gateway configuration file; returns (devices, backend, options)."""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    devices = [DeviceConfig(**device) for device in config["devices"]]
+    options = {key: config[key] for key in ("batch_size", "flush_seconds") if key in config}
+    return devices, config.get("backend", {}), options
+
+def main():
+    parser = argparse.ArgumentParser(description="BLE gateway for a fleet of inhalers")
+    parser.add_argument("--config", help="Gateway configuration file (JSON)")
+    parser.add_argument("--fake", type=int, metavar="N", help="Use N simulated devices instead of radios")
+    parser.add_argument("--dry-run", action="store_true", help="Log batches instead of posting them")
+    parser.add_argument("--profiles", help=f"Device profile cache (default: {DEFAULT_PROFILES_PATH}; "
+                                           "none with --fake)")
+    parser.add_argument("--report-seconds", type=float, default=60.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if not args.config and not args.fake:
+        parser.error("give --config or --fake")
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    devices, backend, options = load_config(args.config) if args.config else ([], {}, {})
+
+    async def run():
+        if args.fake:
+            from ble_fake import FakeRadio
+
+            radio = FakeRadio()
+            if not devices:
+                devices.extend(
+                    DeviceConfig(f"FA:KE:00:00:{n // 256:02X}:{n % 256:02X}", f"sim-{n:04d}")
+                    for n in range(args.fake)
+                )
+            for device in devices:
+                radio.add(device.address, puff_interval=5.0, drop_every=random.uniform(60, 300))
+            client_factory = radio.client
+        else:
+            from bleak import BleakClient
+
+            client_factory = BleakClient
+
+        forwarder = EventForwarder(
+            backend.get("url", "http://localhost:8000"), token=backend.get("token"),
+            username=backend.get("username"), password=backend.get("password"),
+            dry_run=args.dry_run, **options
+        )
+        profiles_path = args.profiles or (None if args.fake else DEFAULT_PROFILES_PATH)
+        profiles = ProfileCache(profiles_path) if profiles_path else None
+        gateway = Gateway(devices, forwarder, client_factory, profiles=profiles,
+                          report_seconds=args.report_seconds)
+        logger.info("Gateway starting with %d devices", len(devices))
+        await gateway.run()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Cached BLE device profiles
+
+Walking client.services, printing every characteristic and scanning
+before each connect makes reconnects slow. The first successful connect
+to a device records a profile (notify and write characteristic UUIDs, the
+service list) in a small JSON file, together with the AT configuration
+applied by configure_ble.py. Later connects subscribe to the cached notify
+characteristic straight away. If that subscribe fails, the GATT part of the
+entry is dropped and discovery runs again.
+
+Usage:
+    cache = ProfileCache()
+    async with BleakClient(ADDRESS, **cache.client_options(ADDRESS)) as client:
+        profile, discovered = await subscribe(client, cache, handle_data)
+"""
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+DEFAULT_PATH = "ble_profiles.json"
+BT05_UART_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
+
+DeviceProfile = namedtuple("DeviceProfile", "address notify_uuid write_uuid services discovered_at")
+
+class ProfileCache:
+    """Per-device profiles and AT configuration state, persisted as JSON."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                # A damaged cache only costs a rediscovery
+                self._entries = {}
+
+    def get(self, address):
+        """Return the cached profile of a device, or None."""
+        entry = self._entries.get(address.upper(), {})
+        if not entry.get("notify_uuid"):
+            return None
+        return DeviceProfile(
+            address, entry["notify_uuid"], entry.get("write_uuid"),
+            entry.get("services", []), entry.get("discovered_at"),
+        )
+
+    def put(self, profile):
+        """Store a device profile (keeps its AT configuration state)."""
+        entry = self._entries.setdefault(profile.address.upper(), {})
+        entry.update(
+            notify_uuid=profile.notify_uuid, write_uuid=profile.write_uuid,
+            services=profile.services, discovered_at=profile.discovered_at,
+        )
+        self.save()
+
+    def invalidate(self, address):
+        """Forget a device's GATT profile, e.g. after a failed subscribe."""
+        entry = self._entries.get(address.upper())
+        if entry and entry.get("notify_uuid"):
+            for key in ("notify_uuid", "write_uuid", "services", "discovered_at"):
+                entry.pop(key, None)
+            self.save()
+
+    def at_config(self, address):
+        """Return the AT commands last applied to a device (list of str)."""
+        return self._entries.get(address.upper(), {}).get("at_config", [])
+
+    def record_at_config(self, address, commands):
+        """Remember the AT commands that were applied to a device."""
+        entry = self._entries.setdefault(address.upper(), {})
+        entry["at_config"] = list(commands)
+        entry["configured_at"] = time.time()
+        self.save()
+
+    def client_options(self, address):
+        """
+        Extra BleakClient arguments for a device.
+
+        With a cached profile on Windows, ask bleak to reuse the OS's
+        service cache instead of re-reading the GATT table.
+        """
+        if sys.platform == "win32" and self.get(address) is not None:
+            return {"winrt": {"use_cached_services": True}}
+        return {}
+
+    def save(self):
+        # Write to a temporary file first so a crash never leaves half a cache
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+def discover_profile(address, services, notify_uuid=None):
+    """
+    Build a profile from a connected client's services.
+
+    The notify characteristic is notify_uuid if given and present, else the
+    BT05 UART characteristic (ffe1), else the first one that can notify.
+    The write characteristic is chosen the same way among writable ones.
+
+    Parameters:
+    - address (str): Device address
+    - services: client.services of a connected BleakClient
+    - notify_uuid (str): Preferred notify characteristic
+
+    Returns:
+    - DeviceProfile
+
+    Raises:
+    - LookupError: If the device has no characteristic that can notify
+    """
+    notify = []
+    write = []
+    service_uuids = []
+    for service in services:
+        service_uuids.append(service.uuid)
+        for char in service.characteristics:
+            if "notify" in char.properties:
+                notify.append(char.uuid)
+            if "write" in char.properties or "write-without-response" in char.properties:
+                write.append(char.uuid)
+    if not notify:
+        raise LookupError(f"{address} has no characteristic that supports notifications")
+    return DeviceProfile(
+        address, _pick(notify, notify_uuid), _pick(write, notify_uuid) if write else None,
+        service_uuids, time.time(),
+    )
+
+def _pick(uuids, preferred):
+    for uuid in (preferred, BT05_UART_UUID):
+        if uuid in uuids:
+            return uuid
+    return uuids[0]
+
+async def subscribe(client, cache, callback, notify_uuid=None):
+    """
+    Start notifications on a connected client, using the cached profile.
+
+    Parameters:
+    - client (BleakClient): Connected client
+    - cache (ProfileCache): Profile cache
+    - callback: Notification handler, as for client.start_notify
+    - notify_uuid (str): Preferred notify characteristic for discovery
+
+    Returns:
+    - tuple: (DeviceProfile, True if services had to be discovered)
+    """
+    profile = cache.get(client.address)
+    if profile is not None:
+        try:
+            await client.start_notify(profile.notify_uuid, callback)
+            return profile, False
+        except Exception:
+            cache.invalidate(client.address)
+
+    profile = discover_profile(client.address, client.services, notify_uuid)
+    await client.start_notify(profile.notify_uuid, callback)
+    cache.put(profile)
+    return profile, True
@@ -1,14 +1,22 @@
 import asyncio
 from bleak import BleakClient, BleakScanner
+from ble_profiles import ProfileCache, discover_profile
+
+ADDRESS = "04:A3:16:A8:94:D2"
 
 async def run():
-    print("Scanning for BT05...")
-    device = await BleakScanner.find_device_by_address("04:A3:16:A8:94:D2")
-    if not device:
-        print("BT05 not found! Make sure it's powered on.")
-        return
-    
-    print(f"Found device: {device.name or 'Unknown'} ({device.address})")
+    cache = ProfileCache()
+    if cache.get(ADDRESS) is None:
+        print("Scanning for BT05...")
+        device = await BleakScanner.find_device_by_address(ADDRESS)
+        if not device:
+            print("BT05 not found! Make sure it's powered on.")
+            return
+        print(f"Found device: {device.name or 'Unknown'} ({device.address})")
+    else:
+        # Known device: connect directly instead of scanning
+        device = ADDRESS
+        print(f"Known device {ADDRESS} (cached profile), skipping scan")
     print("Connecting...")
     
     async with BleakClient(device) as client:
@@ -34,6 +42,7 @@ async def run():
         # Try to send AT command to all writable characteristics
         print("\nTesting writable characteristics...")
         test_cmd = b"AT\r\n"
+        working_char = None
         
         for service in client.services:
             for char in service.characteristics:
@@ -44,9 +53,20 @@ async def run():
                         print(f"  ✓ Success!")
                         # Remember this characteristic
                         print(f"\n*** WORKING CHARACTERISTIC: {char.uuid} ***\n")
+                        working_char = working_char or char.uuid
                     except Exception as e:
                         print(f"  ✗ Failed: {str(e)}")
         
+        # Save the results so the other scripts can skip discovery
+        try:
+            profile = discover_profile(ADDRESS, client.services)
+            if working_char:
+                profile = profile._replace(write_uuid=working_char)
+            cache.put(profile)
+            print(f"Saved device profile to {cache.path}")
+        except LookupError as e:
+            print(f"Not caching a profile: {e}")
+        
         print("Discovery complete. Waiting for notifications (10 seconds)...")
         await asyncio.sleep(10)
 
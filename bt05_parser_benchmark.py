@@ -0,0 +1,53 @@
+"""
+BT05 frame parser benchmark
+
+Feeds a synthetic "PUFF,<n>\\r\\n" stream to bt05_protocol.FrameParser in
+notification-sized chunks that split and merge lines at random, the way
+the BT05 delivers them, and checks that every frame comes out intact.
+
+Usage:
+    python bt05_parser_benchmark.py [--frames 200000] [--max-chunk 20]
+"""
+import argparse
+import random
+import time
+
+from bt05_protocol import FrameParser, PuffEvent
+
+def make_chunks(frames, max_chunk, seed):
+    """Split the stream for `frames` PUFF lines into random 1..max_chunk byte chunks."""
+    rng = random.Random(seed)
+    stream = b"".join(b"PUFF,%d\r\n" % (n % 200) for n in range(frames))
+    chunks = []
+    position = 0
+    while position < len(stream):
+        size = rng.randint(1, max_chunk)
+        chunks.append(stream[position:position + size])
+        position += size
+    return chunks
+
+def main():
+    parser = argparse.ArgumentParser(description="BT05 frame parser benchmark")
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument("--max-chunk", type=int, default=20, help="Largest notification size in bytes")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.frames, args.max_chunk, args.seed)
+    frame_parser = FrameParser()
+    started = time.perf_counter()
+    records = []
+    for chunk in chunks:
+        records.extend(frame_parser.feed(chunk))
+    elapsed = time.perf_counter() - started
+
+    intact = all(
+        isinstance(record, PuffEvent) and record.count == n % 200
+        for n, record in enumerate(records)
+    )
+    print(f"{len(chunks)} notifications -> {len(records)} frames in {elapsed:.3f}s "
+          f"({len(records) / elapsed:,.0f} frames/s, {len(chunks) / elapsed:,.0f} notifications/s)")
+    print(f"all frames intact: {intact and len(records) == args.frames}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+BT05 UART line protocol
+
+The sensor writes lines such as "PUFF,183\\r\\n" to the BT05's UART, and the
+module forwards them as notifications on characteristic ffe1. Notifications
+do not follow line boundaries: one line can arrive split over several
+notifications, and one notification can carry several lines. FrameParser
+reassembles the byte stream into complete lines and decodes them into
+typed records:
+
+    PuffEvent(count, raw)  "PUFF,<n>" lines with their counter value
+    TextLine(text, raw)    anything else (AT responses, status messages)
+
+Usage:
+    parser = FrameParser()
+
+    def handle_data(sender, data):
+        for record in parser.feed(data):
+            if isinstance(record, PuffEvent):
+                print(f"Puff count: {record.count}")
+"""
+from collections import namedtuple
+
+PuffEvent = namedtuple("PuffEvent", "count raw")
+TextLine = namedtuple("TextLine", "text raw")
+
+PUFF_PREFIX = b"PUFF,"
+MAX_LINE = 256
+
+def parse_line(raw):
+    """
+    Decode one complete line (with or without its line ending).
+
+    Parameters:
+    - raw (bytes): Line bytes, e.g. b"PUFF,183\\r\\n"
+
+    Returns:
+    - PuffEvent for valid "PUFF,<n>" lines, otherwise TextLine
+    """
+    if raw.startswith(PUFF_PREFIX):
+        try:
+            # int() ignores the surrounding whitespace, including "\r\n"
+            return PuffEvent(int(raw[len(PUFF_PREFIX):]), raw)
+        except ValueError:
+            pass
+    return TextLine(raw.decode("utf-8", errors="replace").strip(), raw)
+
+class FrameParser:
+    """
+    Incremental parser for the notification byte stream of one device.
+
+    Received bytes are appended to a single bytearray. A read offset marks
+    the consumed part, and consumed bytes are only discarded once they make
+    up more than half of the buffer, so feeding a notification never copies
+    the unparsed tail. Lines longer than max_line bytes without a line
+    ending are discarded (counted in overflows) to resynchronize on the
+    next "\\n".
+    """
+
+    def __init__(self, max_line=MAX_LINE):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        self._start = 0
+        self._discarding = False
+
+        # Counters
+        self.bytes_received = 0
+        self.frames = 0
+        self.puffs = 0
+        self.overflows = 0
+
+    def feed(self, data):
+        """
+        Add one notification's bytes and return the records it completes.
+
+        Parameters:
+        - data (bytes): Notification payload (any length, any split)
+
+        Returns:
+        - list of PuffEvent/TextLine, in stream order
+        """
+        buffer = self._buffer
+        buffer += data
+        self.bytes_received += len(data)
+        records = []
+        start = self._start
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            end += 1
+            if self._discarding:
+                # Tail of an over-long line
+                self._discarding = False
+            else:
+                records.append(parse_line(bytes(buffer[start:end])))
+            start = end
+
+        if len(buffer) - start > self.max_line:
+            self.overflows += 1
+            self._discarding = True
+            start = len(buffer)
+        if start == len(buffer):
+            buffer.clear()
+            start = 0
+        elif start > len(buffer) // 2:
+            del buffer[:start]
+            start = 0
+        self._start = start
+
+        self.frames += len(records)
+        for record in records:
+            if type(record) is PuffEvent:
+                self.puffs += 1
+        return records
+
+    @property
+    def pending(self):
+        """Number of buffered bytes still waiting for a line ending."""
+        return len(self._buffer) - self._start
+
+    def flush(self):
+        """
+        Return the buffered partial line as a TextLine and clear the buffer.
+
+        Use this where the stream ends (shutdown, end of a log file) so
+        bytes that never got a line ending, such as an AT response or a
+        line cut off by a disconnect, are not lost.
+
+        Returns:
+        - TextLine, or None if nothing is buffered
+        """
+        record = None
+        if self.pending and not self._discarding:
+            raw = bytes(self._buffer[self._start:])
+            record = TextLine(raw.decode("utf-8", errors="replace").strip(), raw)
+            self.frames += 1
+        self.reset()
+        return record
+
+    def reset(self):
+        """Forget any partial line (e.g. after a reconnect)."""
+        self._buffer.clear()
+        self._start = 0
+        self._discarding = False
+
+    def stats(self):
+        """Return the parser's counters as a dictionary."""
+        return {
+            "bytes": self.bytes_received,
+            "frames": self.frames,
+            "puffs": self.puffs,
+            "overflows": self.overflows,
+            "pending": self.pending,
+        }
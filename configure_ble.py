@@ -1,6 +1,7 @@
 import asyncio
 import sys
 from bleak import BleakClient
+from ble_profiles import ProfileCache
 
 ADDRESS = "04:A3:16:A8:94:D2"
 UART_TX_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
@@ -13,16 +14,26 @@ AT_COMMANDS = [
     b"AT+RESET\r\n"     # Reboot module
 ]
 
-async def configure_device():
-    async with BleakClient(ADDRESS) as client:
+async def configure_device(force=False):
+    cache = ProfileCache()
+    commands = [cmd.decode().strip() for cmd in AT_COMMANDS]
+    if not force and cache.at_config(ADDRESS) == commands:
+        # The module keeps its settings, so there is nothing to redo
+        print(f"{ADDRESS} is already configured (run with --force to reapply)")
+        return
+
+    profile = cache.get(ADDRESS)
+    write_uuid = profile.write_uuid if profile and profile.write_uuid else UART_TX_UUID
+    async with BleakClient(ADDRESS, **cache.client_options(ADDRESS)) as client:
         print(f"Connected to {ADDRESS}")
         
         # Send configuration commands
         for cmd in AT_COMMANDS:
             print(f"Sending: {cmd.decode().strip()}")
-            await client.write_gatt_char(UART_TX_UUID, cmd)
+            await client.write_gatt_char(write_uuid, cmd)
             await asyncio.sleep(1)  # Wait for response
             
+        cache.record_at_config(ADDRESS, commands)
         print("Configuration complete. Monitoring for responses...")
         
         # Monitor for 10 seconds
@@ -30,6 +41,6 @@ async def configure_device():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(configure_device())
+        asyncio.run(configure_device(force="--force" in sys.argv[1:]))
     except Exception as e:
         print(f"Error: {e}") 
\ No newline at end of file
@@ -1,6 +1,8 @@
 import asyncio
 import sys
 from bleak import BleakClient
+from ble_profiles import ProfileCache, subscribe
+from bt05_protocol import FrameParser, PuffEvent
 
 # Default MAC address
 ADDRESS = "04:A3:16:A8:94:D2"
@@ -11,45 +13,44 @@ if len(sys.argv) > 1:
 UART_SERVICE_UUID = "0000ffe0-0000-1000-8000-00805f9b34fb"
 UART_RX_CHAR_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
 
+# Reassemble UART lines split or merged across notifications
+# (one parser per characteristic, as the fallback may subscribe to several)
+parsers = {}
+
 def handle_data(sender, data):
     print(f"Received data: {data.hex(' ')}")
-    try:
-        print(f"ASCII: {data.decode('utf-8')}")
-    except:
-        pass  # Not valid UTF-8
+    parser = parsers.setdefault(sender, FrameParser())
+    for record in parser.feed(data):
+        if isinstance(record, PuffEvent):
+            print(f"Puff count: {record.count}")
+        else:
+            print(f"ASCII: {record.text}")
 
 async def main():
     print(f"Connecting to {ADDRESS}...")
-    async with BleakClient(ADDRESS) as client:
+    cache = ProfileCache()
+    async with BleakClient(ADDRESS, **cache.client_options(ADDRESS)) as client:
         print(f"Connected: {client.is_connected}")
         
-        # Get all services
-        services = await client.get_services()
-        print("Services:")
-        for service in services:
-            print(f"Service: {service.uuid}")
-            for char in service.characteristics:
-                print(f"  Characteristic: {char.uuid}")
-                print(f"    Properties: {', '.join(char.properties)}")
-        
-        # Try to subscribe to the UART characteristic
+        # Subscribe using the cached profile. On a first connect, or when the
+        # cached characteristic stops working, the services are discovered and
+        # the UART characteristic (or else any notify characteristic) is used
+        print(f"\nSubscribing to notifications...")
         try:
-            print(f"\nSubscribing to notifications on {UART_RX_CHAR_UUID}...")
-            await client.start_notify(UART_RX_CHAR_UUID, handle_data)
+            profile, discovered = await subscribe(client, cache, handle_data, UART_RX_CHAR_UUID)
         except Exception as e:
             print(f"Error subscribing to notifications: {e}")
-            # Try to find a characteristic with notify property
-            print("Searching for characteristics with notify property...")
-            for service in services:
+            return
+        if discovered:
+            print("Services:")
+            for service in client.services:
+                print(f"Service: {service.uuid}")
                 for char in service.characteristics:
-                    if "notify" in char.properties:
-                        print(f"Found notify characteristic: {char.uuid}")
-                        try:
-                            print(f"Subscribing to {char.uuid}...")
-                            await client.start_notify(char.uuid, handle_data)
-                            print(f"Successfully subscribed to {char.uuid}")
-                        except Exception as e2:
-                            print(f"Error subscribing to {char.uuid}: {e2}")
+                    print(f"  Characteristic: {char.uuid}")
+                    print(f"    Properties: {', '.join(char.properties)}")
+            print(f"Subscribed to {profile.notify_uuid} (profile cached)")
+        else:
+            print(f"Subscribed to {profile.notify_uuid} (cached profile)")
         
         print("Waiting for data (press Ctrl+C to exit)...")
         try:
@@ -59,7 +60,7 @@ async def main():
             pass
         finally:
             try:
-                await client.stop_notify(UART_RX_CHAR_UUID)
+                await client.stop_notify(profile.notify_uuid)
             except:
                 pass
             print("Notifications stopped")
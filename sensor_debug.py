@@ -1,11 +1,16 @@
 import asyncio
 import time
 from bleak import BleakClient, BleakScanner
+from ble_profiles import ProfileCache, subscribe
+from bt05_protocol import FrameParser, PuffEvent
 
 # BT05 device details
 ADDRESS = "04:A3:16:A8:94:D2"
 NOTIFY_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
 
+# Reassembles UART lines split or merged across notifications
+parser = FrameParser()
+
 # Test commands to potentially trigger data flow
 TEST_COMMANDS = [
     b"AT\r\n",
@@ -24,45 +29,53 @@ def handle_data(sender, data):
         print(f"ASCII: {ascii_data}")
     except:
         pass
+    for record in parser.feed(data):
+        if isinstance(record, PuffEvent):
+            print(f"  -> PUFF count {record.count}")
+        else:
+            print(f"  -> Line: {record.text!r}")
+    if parser.pending:
+        print(f"  ({parser.pending} bytes waiting for end of line)")
 
 async def run():
-    # First scan to make sure device is available
-    print("Scanning for BT05...")
-    scanner = BleakScanner()
-    devices = await scanner.discover()
-    bt05_found = False
-    
-    for device in devices:
-        if device.address == ADDRESS:
-            bt05_found = True
-            print(f"Found BT05: {device.name or 'Unknown'} ({device.address})")
-    
-    if not bt05_found:
-        print(f"WARNING: BT05 device with address {ADDRESS} not found in scan")
-        print("Will try to connect anyway...")
+    cache = ProfileCache()
+    if cache.get(ADDRESS) is None:
+        # Unknown device: scan first to make sure it is available
+        print("Scanning for BT05...")
+        scanner = BleakScanner()
+        devices = await scanner.discover()
+        bt05_found = False
+        
+        for device in devices:
+            if device.address == ADDRESS:
+                bt05_found = True
+                print(f"Found BT05: {device.name or 'Unknown'} ({device.address})")
+        
+        if not bt05_found:
+            print(f"WARNING: BT05 device with address {ADDRESS} not found in scan")
+            print("Will try to connect anyway...")
+    else:
+        print("Using cached device profile (skipping scan)")
     
     print(f"\nConnecting to BT05 at {ADDRESS}...")
     try:
-        async with BleakClient(ADDRESS) as client:
-            print("Connected! Checking services...")
+        async with BleakClient(ADDRESS, **cache.client_options(ADDRESS)) as client:
+            print("Connected!")
             
-            # Check for all notify characteristics
-            notify_chars = []
-            for service in client.services:
-                for char in service.characteristics:
-                    props = char.properties
-                    if "notify" in props:
-                        notify_chars.append(char.uuid)
-                        print(f"Found notify characteristic: {char.uuid}")
-            
-            if not notify_chars:
+            # Set up notification on the primary characteristic (services are
+            # only discovered when there is no working cached profile)
+            try:
+                profile, discovered = await subscribe(client, cache, handle_data, NOTIFY_UUID)
+            except LookupError:
                 print("No notify characteristics found!")
                 return
-                
-            # Set up notification on primary characteristic
-            print(f"\nSetting up notification on {NOTIFY_UUID}...")
-            await client.start_notify(NOTIFY_UUID, handle_data)
-            print("Notification setup complete")
+            if discovered:
+                for service in client.services:
+                    for char in service.characteristics:
+                        if "notify" in char.properties:
+                            print(f"Found notify characteristic: {char.uuid}")
+            print(f"Notification setup complete on {profile.notify_uuid}")
+            write_uuid = profile.write_uuid or profile.notify_uuid
             
             # Send test commands to potentially trigger responses
             print("\nSending test commands to trigger data...")
@@ -70,7 +83,7 @@ async def run():
                 cmd_hex = ' '.join(f'{b:02x}' for b in cmd)
                 print(f"Sending: {cmd_hex}")
                 try:
-                    await client.write_gatt_char(NOTIFY_UUID, cmd)
+                    await client.write_gatt_char(write_uuid, cmd)
                 except Exception as e:
                     print(f"  Failed: {e}")
                 await asyncio.sleep(2)
@@ -79,7 +92,7 @@ async def run():
             print("\nChecking for other writable characteristics...")
             for service in client.services:
                 for char in service.characteristics:
-                    if "write" in char.properties and char.uuid != NOTIFY_UUID:
+                    if "write" in char.properties and char.uuid != write_uuid:
                         print(f"Found alternative writable characteristic: {char.uuid}")
                         try:
                             await client.write_gatt_char(char.uuid, b"\x01")
@@ -104,7 +117,7 @@ async def run():
             except KeyboardInterrupt:
                 pass
             finally:
-                await client.stop_notify(NOTIFY_UUID)
+                await client.stop_notify(profile.notify_uuid)
                 print("Monitoring stopped.")
     except Exception as e:
         print(f"Error: {e}")
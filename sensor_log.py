@@ -0,0 +1,190 @@
+"""
+Buffered sensor log writer
+
+BLE notification callbacks must return quickly, so they should not open,
+write and close the log file for every packet. SensorLogSink.write() only
+stamps the packet and appends it to a bounded in-memory queue; a
+background task formats queued packets and writes them in batches (when
+batch_size packets are waiting or flush_interval seconds have passed),
+from a worker thread, to a file that stays open. The file is fsynced only
+at checkpoints: every checkpoint_interval seconds, on checkpoint() and on
+close. When the queue is full, new packets are dropped and counted rather
+than blocking the callback.
+
+Given a sensor_segment.SegmentWriter, the sink also appends each batch to
+that binary segment (same packets, epoch-microsecond timestamps).
+
+Usage:
+    sink = SensorLogSink("sensor_data.log")
+    async with sink:
+        await client.start_notify(NOTIFY_UUID, lambda sender, data: sink.write(data))
+        ...
+"""
+import asyncio
+import os
+import time
+
+class SensorLogSink:
+    """Batched, bounded writer of "HH:MM:SS,<hex bytes>" log lines."""
+
+    def __init__(self, path="sensor_data.log", max_queue=10000, batch_size=256,
+                 flush_interval=0.5, checkpoint_interval=30.0, segment=None):
+        """
+        Create a sink (call start() or use "async with" before writing).
+
+        Parameters:
+        - path (str): Log file to append to
+        - max_queue (int): Packets held in memory before new ones are dropped
+        - batch_size (int): Write as soon as this many packets are queued
+        - flush_interval (float): Write queued packets at least this often (seconds)
+        - checkpoint_interval (float): fsync the file at least this often (seconds)
+        - segment (SegmentWriter): Optional binary segment to write as well
+        """
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.segment = segment
+        self._queue = None
+        self._task = None
+        self._file = None
+        self._last_checkpoint = 0.0
+        self._checkpoint_requested = False
+        self._closing = False
+
+        # Counters
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.max_depth = 0
+
+    async def start(self):
+        """Open the log file and start the writer task."""
+        self._queue = asyncio.Queue(self.max_queue)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self.segment is not None:
+            self.segment.open()
+        self._last_checkpoint = time.monotonic()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    def write(self, data, timestamp=None):
+        """
+        Queue one packet for logging; never blocks or touches the file.
+
+        Call from the event loop thread (bleak runs notification callbacks there).
+
+        Parameters:
+        - data (bytes): Packet payload
+        - timestamp (float): Receive time as time.time() (default: now)
+
+        Returns:
+        - bool: False if the queue was full and the packet was dropped
+        """
+        try:
+            self._queue.put_nowait((timestamp or time.time(), bytes(data)))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.queued += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    def checkpoint(self):
+        """Request an fsync after the packets queued so far are written."""
+        self._checkpoint_requested = True
+
+    async def close(self):
+        """Write everything still queued, fsync and close the file."""
+        if self._task is None:
+            return
+        # Let the writer finish its current batch rather than cancelling it
+        self._closing = True
+        await self._task
+        self._task = None
+        batch = self._take(self._queue.qsize())
+        await asyncio.to_thread(self._write_batch, batch, True)
+        self._file.close()
+        self._file = None
+        if self.segment is not None:
+            self.segment.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def stats(self):
+        """Return the sink's counters as a dictionary."""
+        return {
+            "queued": self.queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_depth": self.max_depth,
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+        }
+
+    def _take(self, count):
+        batch = []
+        while len(batch) < count and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while not self._closing:
+            # Wait for the first packet of a batch, then give the batch up
+            # to flush_interval to fill
+            try:
+                first = await asyncio.wait_for(self._queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                first = None
+            batch = [first] if first else []
+            deadline = time.monotonic() + self.flush_interval
+            while batch and not self._closing and self._queue.qsize() < self.batch_size - 1:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, 0.05))
+            batch += self._take(self.batch_size - len(batch))
+
+            checkpoint = (
+                self._checkpoint_requested
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+            )
+            # Clear the request here, on the loop: a checkpoint() made while
+            # the batch below is being written then gets a checkpoint of its own
+            self._checkpoint_requested = False
+            if batch or checkpoint:
+                await asyncio.to_thread(self._write_batch, batch, checkpoint)
+
+    def _write_batch(self, batch, checkpoint):
+        # Runs in a worker thread
+        if batch:
+            self._file.write("".join(
+                f"{time.strftime('%H:%M:%S', time.localtime(timestamp))},{data.hex(' ')}\n"
+                for timestamp, data in batch
+            ))
+            self._file.flush()
+            if self.segment is not None:
+                self.segment.append_many(
+                    (int(timestamp * 1_000_000), data) for timestamp, data in batch
+                )
+                self.segment.flush()
+            self.written += len(batch)
+            self.batches += 1
+        if checkpoint:
+            if self.written:
+                os.fsync(self._file.fileno())
+                if self.segment is not None:
+                    self.segment.flush(sync=True)
+                self.fsyncs += 1
+            self._last_checkpoint = time.monotonic()
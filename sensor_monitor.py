@@ -1,53 +1,83 @@
 import asyncio
 import time
 from bleak import BleakClient
+from ble_profiles import ProfileCache, subscribe
+from bt05_protocol import FrameParser, PuffEvent
+from sensor_log import SensorLogSink
+from sensor_segment import SegmentWriter
 
 # BT05 device details
 ADDRESS = "98:7B:F3:6E:92:43"
 NOTIFY_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
 
+# Batched writer for sensor_data.log and its binary copy sensor_data.seg
+# (keeps file I/O out of the callback)
+log_sink = SensorLogSink("sensor_data.log", segment=SegmentWriter("sensor_data.seg"))
+CHECKPOINT_SECONDS = 10
+
+# Reassembles UART lines split or merged across notifications
+parser = FrameParser()
+
 def handle_data(sender, data):
-    timestamp = time.strftime("%H:%M:%S")
+    received = time.time()
+    timestamp = time.strftime("%H:%M:%S", time.localtime(received))
     print(f"[{timestamp}] Received data: {data.hex(' ')}")
-    try:
-        print(f"ASCII: {data.decode('utf-8')}")
-    except:
-        pass
-    
-    # Log to file for later analysis
-    with open("sensor_data.log", "a") as f:
-        f.write(f"{timestamp},{data.hex(' ')}\n")
+
+    for record in parser.feed(data):
+        if isinstance(record, PuffEvent):
+            print(f"Puff count: {record.count}")
+        else:
+            print(f"ASCII: {record.text}")
+        # Queue complete lines for the log files (written in batches by log_sink)
+        log_sink.write(record.raw, received)
 
 async def run():
     print(f"Connecting to BT05 at {ADDRESS}...")
-    async with BleakClient(ADDRESS) as client:
+    cache = ProfileCache()
+    async with log_sink, BleakClient(ADDRESS, **cache.client_options(ADDRESS)) as client:
         print("Connected!")
-        
-        print("\nDiscovering services and characteristics...")
-        for service in client.services:
-            print(f"[Service] {service.uuid}")
-            for char in service.characteristics:
-                print(f"  [Characteristic] {char.uuid} | Properties: {', '.join(char.properties)}")
-                for descriptor in char.descriptors:
-                    print(f"    [Descriptor] {descriptor.uuid} ({descriptor.handle})")
-        print("Service discovery complete.\n")
-
-        print(f"Attempting to start notifications on {NOTIFY_UUID}...")
-        # Set up notification handler
-        await client.start_notify(NOTIFY_UUID, handle_data)
+
+        # Set up notification handler, using the cached profile when there is one
+        profile, discovered = await subscribe(client, cache, handle_data, NOTIFY_UUID)
+        if discovered:
+            print("\nDiscovered services and characteristics:")
+            for service in client.services:
+                print(f"[Service] {service.uuid}")
+                for char in service.characteristics:
+                    print(f"  [Characteristic] {char.uuid} | Properties: {', '.join(char.properties)}")
+                    for descriptor in char.descriptors:
+                        print(f"    [Descriptor] {descriptor.uuid} ({descriptor.handle})")
+            print("Service discovery complete (profile cached).\n")
+        else:
+            print("Using cached device profile.")
+        print(f"Notifications started on {profile.notify_uuid}")
         
         print("Monitoring started. Press Ctrl+C to stop.")
         print("Waiting for sensor data...")
         
         try:
-            # Keep running until interrupted
+            # Keep running until interrupted, syncing the log to disk now and then
+            elapsed = 0
             while True:
                 await asyncio.sleep(1)
+                elapsed += 1
+                if elapsed % CHECKPOINT_SECONDS == 0:
+                    log_sink.checkpoint()
         except KeyboardInterrupt:
             pass
         finally:
-            await client.stop_notify(NOTIFY_UUID)
+            # Log bytes still waiting for a line ending (e.g. an AT response
+            # or a line cut off by a disconnect) before anything can fail
+            tail = parser.flush()
+            if tail is not None:
+                print(f"ASCII: {tail.text}")
+                log_sink.write(tail.raw, time.time())
+            await client.stop_notify(profile.notify_uuid)
             print("Monitoring stopped.")
+            stats = log_sink.stats()
+            print(f"Logged {stats['written'] + stats['pending']} lines "
+                  f"({stats['dropped']} dropped, peak queue {stats['max_depth']}, "
+                  f"{parser.overflows} over-long lines discarded)")
 
 if __name__ == "__main__":
     asyncio.run(run()) 
\ No newline at end of file
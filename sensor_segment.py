@@ -0,0 +1,307 @@
+"""
+Binary sensor log segments
+
+sensor_data.log stores each packet as "HH:MM:SS,<hex bytes>": no date,
+one-second resolution, and about three text bytes per payload byte that
+must be parsed back. A segment file stores the same packets as fixed-width
+32-byte records after a 16-byte header, so a reader can memory-map the
+file and index or bisect it without parsing:
+
+    header  8s magic "AEBSEG01", u16 version, u16 record size, 4 bytes reserved
+    record  i64 timestamp (microseconds since the Unix epoch, UTC)
+            i32 value (the count from "PUFF,<n>", else 0)
+            u8  kind (KIND_RAW or KIND_PUFF)
+            u8  payload length (bytes beyond PAYLOAD_SIZE are cut off)
+            18s payload (raw line bytes, zero padded)
+
+Segments are append-only and records are expected in time order. A record
+cut short by a crash is ignored by readers and trimmed by the next writer.
+
+Usage:
+    python sensor_segment.py convert sensor_data.log sensor_data.seg --date 2024-11-02
+    python sensor_segment.py dump sensor_data.seg [--limit 20]
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from bt05_protocol import FrameParser, PuffEvent, parse_line
+
+MAGIC = b"AEBSEG01"
+VERSION = 1
+HEADER = struct.Struct("<8sHH4x")
+RECORD = struct.Struct("<qiBB18s")
+PAYLOAD_SIZE = 18
+
+KIND_RAW = 0
+KIND_PUFF = 1
+
+SensorRecord = namedtuple("SensorRecord", "timestamp_us value kind payload")
+
+def decode_payload(payload):
+    """
+    Decode a notification payload into (kind, value).
+
+    Parameters:
+    - payload (bytes): Raw notification bytes
+
+    Returns:
+    - tuple: (KIND_PUFF, count) for "PUFF,<n>" packets, else (KIND_RAW, 0)
+    """
+    record = parse_line(payload)
+    if isinstance(record, PuffEvent) and -2**31 <= record.count < 2**31:
+        return KIND_PUFF, record.count
+    return KIND_RAW, 0
+
+def pack_record(timestamp_us, payload):
+    """Encode one packet as a fixed-width record."""
+    kind, value = decode_payload(payload)
+    return RECORD.pack(timestamp_us, value, kind, min(len(payload), 255), payload[:PAYLOAD_SIZE])
+
+class SegmentWriter:
+    """Appends packets to a segment file, creating it if needed."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def open(self):
+        """Open the segment for appending (validates an existing header)."""
+        self._file = open(self.path, "a+b")
+        size = self._file.seek(0, os.SEEK_END)
+        if size == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            self._file.flush()
+            return self
+        self._file.seek(0)
+        _read_header(self._file.read(HEADER.size), self.path)
+        # Drop a partial record left by an interrupted write
+        extra = (size - HEADER.size) % RECORD.size
+        if extra:
+            self._file.truncate(size - extra)
+        self._file.seek(0, os.SEEK_END)
+        return self
+
+    def append(self, timestamp_us, payload):
+        """Append one packet (timestamp in epoch microseconds)."""
+        self._file.write(pack_record(timestamp_us, payload))
+
+    def append_many(self, packets):
+        """Append (timestamp_us, payload) pairs with a single write."""
+        self._file.write(b"".join(pack_record(ts, payload) for ts, payload in packets))
+
+    def flush(self, sync=False):
+        """Flush buffered records; with sync=True also fsync the file."""
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class SegmentReader:
+    """Memory-mapped, random-access view of a segment file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        _read_header(self._file.read(HEADER.size), path)
+        self.count = (size - HEADER.size) // RECORD.size
+        self._map = None
+        if self.count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("record index out of range")
+        return self._record(RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size))
+
+    def __iter__(self):
+        return self.scan()
+
+    def timestamp(self, index):
+        """Return the timestamp of one record without decoding the rest."""
+        return struct.unpack_from("<q", self._map, HEADER.size + index * RECORD.size)[0]
+
+    def scan(self, start_us=None, end_us=None):
+        """
+        Iterate over records, optionally limited to a time range.
+
+        Parameters:
+        - start_us (int): First timestamp to include (epoch microseconds)
+        - end_us (int): Stop before this timestamp (epoch microseconds)
+
+        Returns:
+        - iterator of SensorRecord
+        """
+        first = self.find(start_us) if start_us is not None else 0
+        last = self.find(end_us) if end_us is not None else self.count
+        if first >= last:
+            return
+        view = memoryview(self._map)[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size]
+        try:
+            for fields in RECORD.iter_unpack(view):
+                yield self._record(fields)
+        finally:
+            view.release()
+
+    def find(self, timestamp_us):
+        """Return the index of the first record at or after timestamp_us."""
+        return bisect_left(range(self.count), timestamp_us, key=self.timestamp)
+
+    def columns(self):
+        """
+        Return the records as a numpy structured array (needs numpy).
+
+        The array is a separate read-only memory map of the file, so fields
+        such as columns()["timestamp_us"] can be scanned without copying.
+        """
+        import numpy as np
+
+        dtype = np.dtype([
+            ("timestamp_us", "<i8"), ("value", "<i4"), ("kind", "u1"),
+            ("length", "u1"), ("payload", f"S{PAYLOAD_SIZE}"),
+        ])
+        if not self.count:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=HEADER.size, shape=(self.count,))
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _record(fields):
+        timestamp_us, value, kind, length, payload = fields
+        return SensorRecord(timestamp_us, value, kind, payload[:min(length, PAYLOAD_SIZE)])
+
+def _read_header(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: not a sensor segment (file too short)")
+    magic, version, record_size = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a sensor segment")
+    if version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path}: unsupported segment version {version} (record size {record_size})")
+
+def iter_hex_log(path, first_date):
+    """
+    Read a "HH:MM:SS,<hex bytes>" log as (timestamp_us, payload) pairs.
+
+    The log has no dates, so lines are dated from first_date onwards, moving
+    to the next day whenever the clock goes backwards (midnight rollover).
+    Times are local time, as written by sensor_monitor.py. Older logs hold
+    raw notifications, which can split UART lines, so payloads are
+    reassembled into complete lines, each stamped with the time its last
+    piece arrived. Bytes left without a line ending at the end of the file
+    are yielded as a final packet.
+
+    Parameters:
+    - path (str): Hex log file
+    - first_date (date): Date of the first line
+
+    Returns:
+    - iterator of (int, bytes); malformed lines are skipped
+    """
+    day = first_date
+    previous = None
+    parser = FrameParser()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            clock, _, hex_bytes = line.strip().partition(",")
+            try:
+                moment = datetime.strptime(clock, "%H:%M:%S").time()
+                payload = bytes.fromhex(hex_bytes)
+            except ValueError:
+                continue
+            if previous is not None and moment < previous:
+                day += timedelta(days=1)
+            previous = moment
+            timestamp_us = int(datetime.combine(day, moment).timestamp()) * 1_000_000
+            for record in parser.feed(payload):
+                yield timestamp_us, record.raw
+    tail = parser.flush()
+    if tail is not None:
+        yield timestamp_us, tail.raw
+
+def convert_hex_log(log_path, segment_path, first_date, batch_size=10000):
+    """
+    Append the packets of a hex log to a segment file.
+
+    Returns:
+    - int: Number of records written
+    """
+    written = 0
+    batch = []
+    with SegmentWriter(segment_path) as writer:
+        for packet in iter_hex_log(log_path, first_date):
+            batch.append(packet)
+            if len(batch) >= batch_size:
+                writer.append_many(batch)
+                written += len(batch)
+                batch = []
+        writer.append_many(batch)
+        written += len(batch)
+        writer.flush(sync=True)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary sensor log segments")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="Convert a hex sensor log to a segment")
+    convert.add_argument("log", help="Hex log, e.g. sensor_data.log")
+    convert.add_argument("segment", help="Segment file to create or append to")
+    convert.add_argument("--date", type=date.fromisoformat, required=True,
+                         help="Date of the log's first line (YYYY-MM-DD)")
+
+    dump = commands.add_parser("dump", help="Print the records of a segment")
+    dump.add_argument("segment")
+    dump.add_argument("--limit", type=int, default=None, help="Print at most this many records")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        count = convert_hex_log(args.log, args.segment, args.date)
+        print(f"Wrote {count} records to {args.segment}")
+        return
+
+    with SegmentReader(args.segment) as reader:
+        puffs = 0
+        for index, record in enumerate(reader.scan()):
+            puffs += record.kind == KIND_PUFF
+            if args.limit is None or index < args.limit:
+                moment = datetime.fromtimestamp(record.timestamp_us / 1_000_000)
+                value = record.value if record.kind == KIND_PUFF else record.payload.hex(" ")
+                print(f"{moment.isoformat(sep=' ')},{value}")
+        print(f"{len(reader)} records ({puffs} PUFF)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()